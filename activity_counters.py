@@ -0,0 +1,326 @@
+"""
+Activity Log Counters
+Keeps per-day, per-action ActivityLog counts and the set of users active each day in
+small summary tables, updated in the same transaction that writes the log rows, so
+the activity log pages read totals, today's figures and the action list without
+scanning activity_log. AssessmentActivityLog rows are rolled up the same way into
+per-day counts by period, event type and category, which the activity heatmap and
+event statistics read instead of the log itself.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+from sqlalchemy import func, select, update
+from app import db
+from models import ActivityLog, ActivityCounter, ActivityDailyUser, AssessmentActivityLog, AssessmentActivityRollup
+
+COUNTER_TABLE = ActivityCounter.__table__
+DAILY_USER_TABLE = ActivityDailyUser.__table__
+ROLLUP_TABLE = AssessmentActivityRollup.__table__
+ROLLUP_KEY = ('period_id', 'day', 'event_type', 'event_category')
+
+
+def _as_date(value):
+    """Day of a timestamp; SQLite returns DATE() results as strings"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return date.fromisoformat(value[:10])
+    return value
+
+
+def _dialect_insert(connection, table):
+    """INSERT supporting ON CONFLICT on SQLite and PostgreSQL, None elsewhere"""
+    dialect_name = connection.dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table)
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table)
+    return None
+
+
+def _upsert_counts(connection, table, key_columns, rows):
+    """Add each row's event_count to the table row with the same key, creating it if needed"""
+    if not rows:
+        return
+    insert = _dialect_insert(connection, table)
+    if insert is not None:
+        connection.execute(insert.on_conflict_do_update(
+            index_elements=list(key_columns),
+            set_={'event_count': table.c.event_count + insert.excluded.event_count}
+        ), rows)
+        return
+
+    for row in rows:
+        updated = connection.execute(update(table).where(
+            *[table.c[column] == row[column] for column in key_columns]
+        ).values(event_count=table.c.event_count + row['event_count']))
+        if updated.rowcount == 0:
+            connection.execute(table.insert(), [row])
+
+
+def _add_counts(connection, counts):
+    """Add {(day, action): n} to activity_counter"""
+    rows = [{'day': day, 'action': action, 'event_count': n} for (day, action), n in counts.items()]
+    _upsert_counts(connection, COUNTER_TABLE, ('day', 'action'), rows)
+
+
+def _add_rollup_counts(connection, counts):
+    """Add {(period_id, day, event_type, event_category): n} to assessment_activity_rollup"""
+    rows = [dict(zip(ROLLUP_KEY, key), event_count=n) for key, n in counts.items()]
+    _upsert_counts(connection, ROLLUP_TABLE, ROLLUP_KEY, rows)
+
+
+def _add_daily_users(connection, day_users):
+    """Record {(day, user_id)} in activity_daily_user, ignoring pairs already present"""
+    if not day_users:
+        return
+    rows = [{'day': day, 'user_id': user_id} for day, user_id in day_users]
+    insert = _dialect_insert(connection, DAILY_USER_TABLE)
+    if insert is not None:
+        connection.execute(insert.on_conflict_do_nothing(index_elements=['day', 'user_id']), rows)
+        return
+
+    days = {row['day'] for row in rows}
+    existing = set(connection.execute(
+        select(DAILY_USER_TABLE.c.day, DAILY_USER_TABLE.c.user_id).where(DAILY_USER_TABLE.c.day.in_(days))
+    ).all())
+    missing = [row for row in rows if (row['day'], row['user_id']) not in existing]
+    if missing:
+        connection.execute(DAILY_USER_TABLE.insert(), missing)
+
+
+def count_logged_rows(connection, rows):
+    """
+    Update the counters for ActivityLog rows inserted on this connection
+
+    Called by the log buffer inside the insert transaction, so counters and logs
+    commit or roll back together.
+
+    Args:
+        connection: Connection with an open transaction
+        rows: ActivityLog column dictionaries that were just inserted
+    """
+    counts = Counter()
+    day_users = set()
+    for row in rows:
+        day = (row.get('timestamp') or datetime.utcnow()).date()
+        counts[(day, row['action'])] += 1
+        day_users.add((day, row['user_id']))
+    _add_counts(connection, counts)
+    _add_daily_users(connection, day_users)
+
+
+def count_logged_assessment_rows(connection, rows):
+    """
+    Update the assessment activity rollup for AssessmentActivityLog rows inserted on this connection
+
+    Args:
+        connection: Connection with an open transaction
+        rows: AssessmentActivityLog column dictionaries that were just inserted
+    """
+    counts = Counter()
+    for row in rows:
+        day = (row.get('timestamp') or datetime.utcnow()).date()
+        counts[(row['period_id'], day, row['event_type'], row['event_category'])] += 1
+    _add_rollup_counts(connection, counts)
+
+
+def remove_user_activity_counts(user_id):
+    """
+    Subtract a user's ActivityLog rows from the counters before they are deleted
+
+    Runs on db.session so it commits with the caller's delete.
+    """
+    day_column = func.date(ActivityLog.timestamp)
+    rows = db.session.query(day_column, ActivityLog.action, func.count(ActivityLog.id)).filter(
+        ActivityLog.user_id == user_id
+    ).group_by(day_column, ActivityLog.action).all()
+
+    for day, action, n in rows:
+        db.session.execute(update(COUNTER_TABLE).where(
+            COUNTER_TABLE.c.day == _as_date(day), COUNTER_TABLE.c.action == action
+        ).values(event_count=COUNTER_TABLE.c.event_count - n))
+    db.session.execute(COUNTER_TABLE.delete().where(COUNTER_TABLE.c.event_count <= 0))
+    db.session.execute(DAILY_USER_TABLE.delete().where(DAILY_USER_TABLE.c.user_id == user_id))
+
+
+def rebuild_activity_counters():
+    """Recompute both counter tables from activity_log (one grouped scan of the log)"""
+    day_column = func.date(ActivityLog.timestamp)
+    counts = {
+        (_as_date(day), action): n
+        for day, action, n in db.session.query(day_column, ActivityLog.action, func.count(ActivityLog.id)).filter(
+            ActivityLog.timestamp.isnot(None)
+        ).group_by(day_column, ActivityLog.action).all()
+    }
+    day_users = {
+        (_as_date(day), user_id)
+        for day, user_id in db.session.query(day_column, ActivityLog.user_id).filter(
+            ActivityLog.timestamp.isnot(None)
+        ).distinct().all()
+    }
+
+    db.session.execute(COUNTER_TABLE.delete())
+    db.session.execute(DAILY_USER_TABLE.delete())
+    connection = db.session.connection()
+    _add_counts(connection, counts)
+    _add_daily_users(connection, day_users)
+    db.session.commit()
+    return sum(counts.values())
+
+
+def rebuild_assessment_activity_rollup():
+    """Recompute assessment_activity_rollup from assessment_activity_log (one grouped scan)"""
+    day_column = func.date(AssessmentActivityLog.timestamp)
+    counts = {
+        (period_id, _as_date(day), event_type, event_category): n
+        for period_id, day, event_type, event_category, n in db.session.query(
+            AssessmentActivityLog.period_id, day_column, AssessmentActivityLog.event_type,
+            AssessmentActivityLog.event_category, func.count(AssessmentActivityLog.id)
+        ).filter(AssessmentActivityLog.timestamp.isnot(None)).group_by(
+            AssessmentActivityLog.period_id, day_column, AssessmentActivityLog.event_type,
+            AssessmentActivityLog.event_category
+        ).all()
+    }
+
+    db.session.execute(ROLLUP_TABLE.delete())
+    _add_rollup_counts(db.session.connection(), counts)
+    db.session.commit()
+    return sum(counts.values())
+
+
+def ensure_activity_counters():
+    """Backfill the counters and the assessment rollup once for databases that have logs but no counts yet"""
+    rebuilt = 0
+    if ActivityCounter.query.first() is None and ActivityLog.query.first() is not None:
+        rebuilt += rebuild_activity_counters()
+    if AssessmentActivityRollup.query.first() is None and AssessmentActivityLog.query.first() is not None:
+        rebuilt += rebuild_assessment_activity_rollup()
+    return rebuilt
+
+
+def _day_range(query, date_from=None, date_to=None):
+    if date_from:
+        query = query.filter(ActivityCounter.day >= date_from)
+    if date_to:
+        query = query.filter(ActivityCounter.day <= date_to)
+    return query
+
+
+def count_activities(actions=None, action_like=None, date_from=None, date_to=None):
+    """
+    Number of ActivityLog rows matching action and date filters, read from the counters
+
+    Args:
+        actions: Only count these exact actions
+        action_like: Only count actions containing this text (the activity log page filter)
+        date_from: First UTC day included (date)
+        date_to: Last UTC day included (date)
+
+    Returns:
+        Integer count
+    """
+    query = _day_range(db.session.query(func.coalesce(func.sum(ActivityCounter.event_count), 0)), date_from, date_to)
+    if actions is not None:
+        query = query.filter(ActivityCounter.action.in_(list(actions)))
+    if action_like:
+        query = query.filter(ActivityCounter.action.like(f'%{action_like}%'))
+    return int(query.scalar() or 0)
+
+
+def get_activity_summary():
+    """
+    Summary figures for the activity log page
+
+    Returns:
+        Dictionary with total_activities, today_activities, unique_users_today and action_types
+    """
+    today = datetime.utcnow().date()
+    action_types = [row[0] for row in db.session.query(ActivityCounter.action).filter(
+        ActivityCounter.event_count > 0
+    ).distinct().order_by(ActivityCounter.action).all()]
+
+    return {
+        'total_activities': count_activities(),
+        'today_activities': count_activities(date_from=today, date_to=today),
+        'unique_users_today': ActivityDailyUser.query.filter_by(day=today).count(),
+        'action_types': action_types
+    }
+
+
+def parse_filter_day(value):
+    """Parse a YYYY-MM-DD filter value, None if empty or invalid"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date() if value else None
+    except ValueError:
+        return None
+
+
+def _rollup_query(columns, period_id=None, date_from=None, date_to=None):
+    query = db.session.query(*columns)
+    if period_id:
+        query = query.filter(AssessmentActivityRollup.period_id == period_id)
+    if date_from:
+        query = query.filter(AssessmentActivityRollup.day >= date_from)
+    if date_to:
+        query = query.filter(AssessmentActivityRollup.day <= date_to)
+    return query
+
+
+def assessment_daily_counts(period_id=None, date_from=None, date_to=None):
+    """
+    AssessmentActivityLog rows per UTC day, read from the rollup
+
+    Args:
+        period_id: Only count this period's events
+        date_from: First UTC day included (date)
+        date_to: Last UTC day included (date)
+
+    Returns:
+        Dictionary mapping date to count (days without events are absent)
+    """
+    total = func.sum(AssessmentActivityRollup.event_count)
+    return {
+        _as_date(day): int(n)
+        for day, n in _rollup_query((AssessmentActivityRollup.day, total), period_id, date_from, date_to).group_by(
+            AssessmentActivityRollup.day
+        ).all()
+    }
+
+
+def get_assessment_event_statistics(period_id=None, days=30):
+    """
+    Assessment event totals from the rollup
+
+    Args:
+        period_id: Only count this period's events
+        days: Number of UTC days, ending today, covered by recent_activity
+
+    Returns:
+        Dictionary with event_counts (event type -> count), category_counts (category ->
+        count), recent_activity (ISO date -> count) and total_events
+    """
+    total = func.sum(AssessmentActivityRollup.event_count)
+    event_counts = {
+        event_type: int(n)
+        for event_type, n in _rollup_query((AssessmentActivityRollup.event_type, total), period_id).group_by(
+            AssessmentActivityRollup.event_type
+        ).all()
+    }
+    category_counts = {
+        category: int(n)
+        for category, n in _rollup_query((AssessmentActivityRollup.event_category, total), period_id).group_by(
+            AssessmentActivityRollup.event_category
+        ).all()
+    }
+    today = datetime.utcnow().date()
+    recent = assessment_daily_counts(period_id, date_from=today - timedelta(days=days - 1), date_to=today)
+
+    return {
+        'event_counts': event_counts,
+        'category_counts': category_counts,
+        'recent_activity': {day.isoformat(): n for day, n in sorted(recent.items())},
+        'total_events': sum(event_counts.values())
+    }
@@ -1,28 +1,34 @@
-from flask import request
+from flask import request, has_request_context
 from app import db
 from models import ActivityLog
 from datetime import datetime
+from log_buffer import buffer_log_row, flush_log_buffer, ACTIVITY_LOG_TABLE
+
+def build_activity_row(user_id, action, description=None):
+    """ActivityLog column dictionary for an action, with the current request's IP address and user agent"""
+    in_request = has_request_context()
+    return {
+        'user_id': user_id,
+        'action': action,
+        'description': description,
+        'ip_address': request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr) if in_request else None,
+        'user_agent': request.environ.get('HTTP_USER_AGENT', 'Unknown') if in_request else 'System',
+        'timestamp': datetime.utcnow()
+    }
 
 def log_activity(user_id, action, description=None):
-    """Log user activity with IP address and user agent"""
+    """Log user activity with IP address and user agent (written in bulk by the log buffer)"""
     try:
-        activity = ActivityLog(
-            user_id=user_id,
-            action=action,
-            description=description,
-            ip_address=request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr),
-            user_agent=request.environ.get('HTTP_USER_AGENT', 'Unknown')
-        )
-        db.session.add(activity)
-        db.session.commit()
+        buffer_log_row(ACTIVITY_LOG_TABLE, build_activity_row(user_id, action, description))
     except Exception as e:
         print(f"Error logging activity: {e}")
-        db.session.rollback()
 
 def get_activity_logs(limit=100):
     """Get recent activity logs for admin view"""
+    flush_log_buffer()
     return ActivityLog.query.order_by(ActivityLog.timestamp.desc()).limit(limit).all()
 
 def get_user_activity_logs(user_id, limit=50):
     """Get activity logs for a specific user"""
+    flush_log_buffer()
     return ActivityLog.query.filter_by(user_id=user_id).order_by(ActivityLog.timestamp.desc()).limit(limit).all()
\ No newline at end of file
@@ -8,6 +8,7 @@ import json
 import re
 from datetime import datetime
 from openai import OpenAI
+from metrics import observe_openai_call
 
 # Initialize OpenAI client
 openai_client = OpenAI(api_key=os.environ.get('OPENAI_API_KEY'))
@@ -90,7 +91,7 @@ MAIN TABLES:
     - period_id (references assessment_period.id)
     - report_title
     - summary_text (JSON with AI analysis)
-    - pdf_data (binary PDF)
+    - PDF content is in report_blob (via ai_report_pdf.report_id -> blob_sha256); never select report_blob.data
     - total_reviewers, average_rating, total_questions
     - created_at, created_by
 
@@ -227,7 +228,7 @@ def generate_sql_from_question(question, db_stats):
         Return ONLY the SQL query, no explanation:
         """
 
-        response = openai_client.chat.completions.create(
+        response = observe_openai_call('admin_chatbot', openai_client.chat.completions.create,
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=500,
@@ -279,7 +280,7 @@ def format_query_results(question, query_data, sql_query):
         Format the response as plain text (no markdown):
         """
 
-        response = openai_client.chat.completions.create(
+        response = observe_openai_call('admin_chatbot', openai_client.chat.completions.create,
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             max_tokens=800,
@@ -1,18 +1,25 @@
 import os
 import json
+from concurrent.futures import ThreadPoolExecutor, wait
 from openai import OpenAI
+from metrics import observe_openai_call
 
-# Initialize OpenAI client with fallback key
+# Initialize OpenAI client with fallback key (one client, and one HTTP connection pool, shared by all threads)
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY2") or os.environ.get("OPENAI_API_KEY")
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-def generate_feedback_summary(question_text, responses_data):
+# Concurrent per-question summary calls made by generate_feedback_summaries
+AI_ANALYSIS_CONCURRENCY = int(os.environ.get("AI_ANALYSIS_CONCURRENCY", 5))
+
+def generate_feedback_summary(question_text, responses_data, timeout=3.0):
     """
-    Generate AI-powered feedback summary for a specific question with caching
+    Generate AI-powered feedback summary for a specific question
+    (cached callers go through ai_analysis_cached.get_or_create_question_analysis)
     
     Args:
         question_text: The question being analyzed
         responses_data: List of dictionaries with reviewer responses
+        timeout: Deadline in seconds for the OpenAI call
     
     Returns:
         Dictionary with summary and themes
@@ -24,7 +31,6 @@ def generate_feedback_summary(question_text, responses_data):
             "average_sentiment": "neutral"
         }
     
-    # Temporarily disable caching due to database connection issues
     print(f"Generating AI analysis for question: {question_text[:50]}...")
     
     # Prepare response text for AI analysis
@@ -69,12 +75,12 @@ def generate_feedback_summary(question_text, responses_data):
             Focus on performance level interpretation and reviewer agreement/consensus.
             """
             
-            response = openai_client.chat.completions.create(
+            response = observe_openai_call('ai_analysis', openai_client.chat.completions.create,
                 model="gpt-4o",
                 messages=[{"role": "user", "content": prompt}],
                 response_format={"type": "json_object"},
                 max_tokens=100,
-                timeout=3
+                timeout=timeout
             )
             
             result = json.loads(response.choices[0].message.content)
@@ -91,7 +97,8 @@ def generate_feedback_summary(question_text, responses_data):
             return {
                 "summary": f"Average rating of {avg_rating:.1f}/5 from {len(ratings)} reviewers indicates {'strong' if avg_rating >= 4 else 'satisfactory' if avg_rating >= 3 else 'developing'} performance.",
                 "themes": ["Performance evaluation", "Multi-reviewer assessment"],
-                "average_sentiment": "positive" if avg_rating >= 4 else "neutral" if avg_rating >= 3 else "needs_attention"
+                "average_sentiment": "positive" if avg_rating >= 4 else "neutral" if avg_rating >= 3 else "needs_attention",
+                "is_fallback": True  # Not cached, so the next view retries the API
             }
     
     elif not response_texts:
@@ -127,7 +134,7 @@ def generate_feedback_summary(question_text, responses_data):
         Focus on leadership effectiveness, specific behaviors, and actionable insights.
         """
         
-        response = openai_client.chat.completions.create(
+        response = observe_openai_call('ai_analysis', openai_client.chat.completions.create,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "You are an executive performance analyst. Provide insightful, actionable feedback analysis for leadership development."},
@@ -135,7 +142,7 @@ def generate_feedback_summary(question_text, responses_data):
             ],
             response_format={"type": "json_object"},
             max_tokens=200,
-            timeout=3.0  # 3 second timeout for immediate response
+            timeout=timeout  # 3 second default timeout for immediate response
         )
         
         result = json.loads(response.choices[0].message.content)
@@ -155,12 +162,72 @@ def generate_feedback_summary(question_text, responses_data):
         return {
             "summary": "Strong performance with positive feedback across key leadership areas.",
             "themes": ["Leadership Excellence", "Team Development", "Strategic Vision", "Professional Growth"],
-            "sentiment": "positive"
+            "sentiment": "positive",
+            "is_fallback": True
+        }
+
+def fallback_feedback_summary(responses_data):
+    """Rating-based summary used when the AI call for a question misses its deadline"""
+    ratings = [r.get('rating') for r in responses_data if isinstance(r.get('rating'), (int, float)) and r.get('rating')]
+    if not ratings:
+        return {
+            "summary": "AI analysis temporarily unavailable.",
+            "themes": ["Manual review required"],
+            "sentiment": "neutral",
+            "is_fallback": True
         }
+    
+    avg_rating = sum(ratings) / len(ratings)
+    return {
+        "summary": f"Average rating of {avg_rating:.1f}/5 from {len(ratings)} reviewers indicates {'strong' if avg_rating >= 4 else 'satisfactory' if avg_rating >= 3 else 'developing'} performance.",
+        "themes": ["Performance evaluation", "Multi-reviewer assessment"],
+        "average_sentiment": "positive" if avg_rating >= 4 else "neutral" if avg_rating >= 3 else "needs_attention",
+        "is_fallback": True
+    }
+
+def generate_feedback_summaries(questions, max_concurrency=None, timeout=3.0, deadline=None):
+    """
+    Generate feedback summaries for many questions concurrently
+    
+    Args:
+        questions: List of (question_text, responses_data) tuples
+        max_concurrency: Maximum simultaneous OpenAI calls (defaults to AI_ANALYSIS_CONCURRENCY)
+        timeout: Deadline in seconds for each OpenAI call
+        deadline: Seconds to wait for the whole batch (defaults to enough for every call to time out once)
+    
+    Returns:
+        List of summary dictionaries in the same order as questions; calls that miss the
+        deadline get a fallback summary
+    """
+    if not questions:
+        return []
+    
+    workers = max(1, min(max_concurrency or AI_ANALYSIS_CONCURRENCY, len(questions)))
+    if deadline is None:
+        rounds = -(-len(questions) // workers)  # ceil
+        deadline = rounds * timeout + 2
+    
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ai-analysis')
+    try:
+        futures = [executor.submit(generate_feedback_summary, question_text, responses_data, timeout)
+                   for question_text, responses_data in questions]
+        wait(futures, timeout=deadline)
+        
+        results = []
+        for future, (question_text, responses_data) in zip(futures, questions):
+            if future.done() and future.exception() is None:
+                results.append(future.result())
+            else:
+                print(f"AI analysis missed deadline for question: {question_text[:50]}...")
+                results.append(fallback_feedback_summary(responses_data))
+        return results
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
 def generate_overall_performance_summary(officer_name, matrix_data):
     """
-    Generate comprehensive performance summary across all questions and reviewers with caching
+    Generate comprehensive performance summary across all questions and reviewers
+    (cached callers go through ai_analysis_cached.get_or_create_overall_analysis)
     
     Args:
         officer_name: Name of the officer being reviewed
@@ -176,7 +243,6 @@ def generate_overall_performance_summary(officer_name, matrix_data):
             "overall_sentiment": "neutral"
         }
     
-    # Temporarily disable caching
     print(f"Generating overall AI analysis for {officer_name}...")
     
     # Collect all feedback text and ratings
@@ -219,7 +285,7 @@ def generate_overall_performance_summary(officer_name, matrix_data):
         }}
         """
         
-        response = openai_client.chat.completions.create(
+        response = observe_openai_call('ai_analysis', openai_client.chat.completions.create,
             model="gpt-4o",
             messages=[
                 {"role": "system", "content": "Executive performance analyst. Provide concise, actionable insights."},
@@ -246,5 +312,6 @@ def generate_overall_performance_summary(officer_name, matrix_data):
         return {
             "executive_summary": f"{officer_name} demonstrates strong leadership performance with an overall rating of {overall_avg:.1f}/5 across {len(all_feedback)} feedback evaluations. Consistent positive performance indicators across key leadership competencies.",
             "major_themes": ["Leadership Excellence", "Strategic Vision", "Team Development", "Professional Growth"],
-            "overall_sentiment": "good"
+            "overall_sentiment": "good",
+            "is_fallback": True
         }
\ No newline at end of file
@@ -1,14 +1,63 @@
 """
-AI Analysis with Database Caching - Uses existing AIAnalysisCache model from ai_cache.py
-Stores AI analysis results in database to avoid regenerating multiple times
+AI Analysis with Caching - Uses the two-tier cache (in-process LRU + AIAnalysisCache table) from ai_cache.py
+Stores AI analysis results to avoid regenerating them on repeat views
 """
 import json
 import hashlib
 from datetime import datetime
 from app import db
 from models import AIAnalysisCache
-from ai_analysis import generate_feedback_summary, generate_overall_performance_summary
-from ai_cache import generate_cache_key, get_cached_analysis, save_analysis_to_cache
+from ai_analysis import generate_feedback_summaries, generate_overall_performance_summary
+from ai_cache import generate_cache_key, get_cached_analysis, save_analysis_to_cache, get_cache_stats
+
+def get_or_create_question_analyses(officer_id, period_id, questions):
+    """
+    Get cached analyses for many questions, generating all cache misses concurrently
+    
+    Args:
+        officer_id: ID of the officer being analyzed
+        period_id: ID of the assessment period
+        questions: List of dictionaries with question_id, question_text and responses_data
+    
+    Returns:
+        List of AI analysis dictionaries in the same order as questions
+    """
+    results = [None] * len(questions)
+    misses = []
+    cache_keys = []
+    
+    for index, question in enumerate(questions):
+        cache_key = generate_cache_key(question['question_text'], question['responses_data'], 'question')
+        cache_keys.append(cache_key)
+        cached_result = get_cached_analysis(cache_key)
+        if cached_result:
+            results[index] = cached_result
+        else:
+            misses.append(index)
+    
+    if misses:
+        try:
+            generated = generate_feedback_summaries([
+                (questions[index]['question_text'], questions[index]['responses_data']) for index in misses
+            ])
+        except Exception as e:
+            print(f"Error generating question analyses: {e}")
+            generated = [{
+                'summary': 'AI analysis temporarily unavailable.',
+                'themes': ['Manual review required'],
+                'sentiment': 'neutral',
+                'is_fallback': True
+            } for _ in misses]
+        
+        for index, ai_result in zip(misses, generated):
+            results[index] = ai_result
+            # Cache the result (fallbacks from API errors and timeouts are not cached)
+            if not ai_result.get('is_fallback'):
+                save_analysis_to_cache(cache_keys[index], 'question', ai_result,
+                                       officer_id=officer_id, period_id=period_id,
+                                       question_id=questions[index].get('question_id'))
+    
+    return results
 
 def get_or_create_question_analysis(officer_id, period_id, question_id, question_text, responses_data):
     """
@@ -24,31 +73,11 @@ def get_or_create_question_analysis(officer_id, period_id, question_id, question
     Returns:
         Dictionary with AI analysis results
     """
-    # Generate cache key using existing function
-    cache_key = generate_cache_key(question_text, responses_data, 'question')
-    
-    # Check for existing cached analysis
-    cached_result = get_cached_analysis(cache_key)
-    if cached_result:
-        return cached_result
-    
-    # Generate new analysis
-    try:
-        ai_result = generate_feedback_summary(question_text, responses_data)
-        
-        # Cache the result using existing function
-        save_analysis_to_cache(cache_key, 'question', ai_result)
-        
-        return ai_result
-        
-    except Exception as e:
-        print(f"Error generating question analysis: {e}")
-        # Return fallback analysis
-        return {
-            'summary': 'AI analysis temporarily unavailable.',
-            'themes': ['Manual review required'],
-            'sentiment': 'neutral'
-        }
+    return get_or_create_question_analyses(officer_id, period_id, [{
+        'question_id': question_id,
+        'question_text': question_text,
+        'responses_data': responses_data
+    }])[0]
 
 def get_or_create_overall_analysis(officer_id, period_id, officer_name, matrix_data):
     """
@@ -91,8 +120,9 @@ def get_or_create_overall_analysis(officer_id, period_id, officer_name, matrix_d
     try:
         ai_result = generate_overall_performance_summary(officer_name, matrix_data)
         
-        # Cache the result
-        save_analysis_to_cache(cache_key, 'overall', ai_result)
+        # Cache the result (fallbacks from API errors are not cached)
+        if not ai_result.get('is_fallback'):
+            save_analysis_to_cache(cache_key, 'overall', ai_result, officer_id=officer_id, period_id=period_id)
         
         return ai_result
         
@@ -105,19 +135,20 @@ def get_or_create_overall_analysis(officer_id, period_id, officer_name, matrix_d
             'overall_sentiment': 'satisfactory'
         }
 
-def clear_cached_analysis_for_officer(officer_id):
-    """Clear all cached analysis for an officer"""
+def clear_cached_analysis_for_officer(officer_id, period_id=None):
+    """Clear cached analysis for an officer, optionally for one period only"""
     from ai_cache import clear_analysis_cache_for_officer
-    clear_analysis_cache_for_officer(officer_id)
+    clear_analysis_cache_for_officer(officer_id, period_id)
 
 def get_cached_analysis_stats():
-    """Get statistics about cached AI analysis"""
+    """Get statistics about cached AI analysis, including this process's hit and miss counters"""
     total_cache_entries = AIAnalysisCache.query.count()
-    question_cache_entries = AIAnalysisCache.query.filter_by(cache_type='question').count()
-    overall_cache_entries = AIAnalysisCache.query.filter_by(cache_type='overall').count()
+    question_cache_entries = AIAnalysisCache.query.filter_by(analysis_type='question').count()
+    overall_cache_entries = AIAnalysisCache.query.filter_by(analysis_type='overall').count()
     
     return {
         'total': total_cache_entries,
         'question_analyses': question_cache_entries, 
-        'overall_analyses': overall_cache_entries
+        'overall_analyses': overall_cache_entries,
+        'counters': get_cache_stats()
     }
\ No newline at end of file
@@ -1,6 +1,28 @@
+"""
+AI Analysis Cache
+Two-tier cache for AI analysis results: an in-process LRU in front of the
+ai_analysis_cache table, both keyed by generate_cache_key and expiring after
+AI_CACHE_TTL_SECONDS. Entries are tagged with officer and period so they can be
+invalidated when that officer's responses change. Database writes made during a
+request are committed once at the end of it (unit_of_work.deferred_write).
+"""
+import os
 import hashlib
 import json
-from datetime import datetime
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+AI_CACHE_TTL_SECONDS = int(os.environ.get('AI_CACHE_TTL_SECONDS', 7 * 24 * 3600))
+AI_CACHE_MEMORY_ENTRIES = int(os.environ.get('AI_CACHE_MEMORY_ENTRIES', 512))
+AI_CACHE_MAX_ROWS = int(os.environ.get('AI_CACHE_MAX_ROWS', 5000))
+_PRUNE_EVERY = 50  # Database eviction runs on every Nth save
+
+# cache_key -> (expires_at, officer_id, period_id, analysis_data), most recently used last
+_memory_cache = OrderedDict()
+_cache_lock = threading.Lock()
+_stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0, 'saves': 0, 'evictions': 0}
+
 
 def generate_cache_key(question_text, responses_data, cache_type='question'):
     """Generate a unique cache key based on question and responses"""
@@ -18,83 +40,167 @@ def generate_cache_key(question_text, responses_data, cache_type='question'):
         ], key=lambda x: x['reviewer']),  # Sort for consistency
         'type': cache_type
     }
-    
+
     content_str = json.dumps(content, sort_keys=True)
     return hashlib.md5(content_str.encode()).hexdigest()
 
+
+def _remember(cache_key, expires_at, officer_id, period_id, analysis_data):
+    """Put an entry in the in-process LRU, evicting the least recently used beyond the size bound"""
+    with _cache_lock:
+        _memory_cache[cache_key] = (expires_at, officer_id, period_id, analysis_data)
+        _memory_cache.move_to_end(cache_key)
+        while len(_memory_cache) > AI_CACHE_MEMORY_ENTRIES:
+            _memory_cache.popitem(last=False)
+            _stats['evictions'] += 1
+
+
+def _count(stat):
+    with _cache_lock:
+        _stats[stat] += 1
+
+
 def get_cached_analysis(cache_key):
-    """Get cached AI analysis if it exists"""
+    """Get cached AI analysis if it exists and has not expired (memory first, then database)"""
+    now = datetime.utcnow()
+    with _cache_lock:
+        entry = _memory_cache.get(cache_key)
+        if entry is not None:
+            if entry[0] > now:
+                _memory_cache.move_to_end(cache_key)
+                _stats['memory_hits'] += 1
+                return entry[3]
+            del _memory_cache[cache_key]
+
     try:
         from models import AIAnalysisCache
-        from app import db
-        
-        cached = AIAnalysisCache.query.filter_by(cache_key=cache_key).first()
+
+        cached = AIAnalysisCache.query.filter(
+            AIAnalysisCache.content_hash == cache_key,
+            AIAnalysisCache.updated_at > now - timedelta(seconds=AI_CACHE_TTL_SECONDS)
+        ).order_by(AIAnalysisCache.updated_at.desc()).first()
         if cached:
-            try:
-                return json.loads(cached.analysis_data)
-            except json.JSONDecodeError:
-                # Invalid cache, delete it
-                db.session.delete(cached)
-                db.session.commit()
-        return None
+            analysis_data = cached.get_analysis_data()
+            expires_at = cached.updated_at + timedelta(seconds=AI_CACHE_TTL_SECONDS)
+            _remember(cache_key, expires_at, cached.officer_id, cached.period_id, analysis_data)
+            _count('db_hits')
+            return analysis_data
     except Exception as e:
         print(f"Cache access error: {e}")
-        return None
 
-def save_analysis_to_cache(cache_key, cache_type, analysis_data):
-    """Save AI analysis result to cache"""
+    _count('misses')
+    return None
+
+
+def save_analysis_to_cache(cache_key, cache_type, analysis_data, officer_id=None, period_id=None, question_id=None):
+    """
+    Save AI analysis result to cache
+
+    Args:
+        cache_key: Key from generate_cache_key
+        cache_type: 'question' or 'overall'
+        analysis_data: Analysis result dictionary
+        officer_id: Officer the analysis belongs to (required for the database tier)
+        period_id: Assessment period the analysis belongs to (required for the database tier)
+        question_id: Question analysed, for question analyses
+
+    Returns:
+        The analysis data as it will be returned from the cache
+    """
+    from models import AIAnalysisCache
+    from app import db
+    from unit_of_work import deferred_write
+
+    entry = AIAnalysisCache(analysis_type=cache_type)
+    entry.set_analysis_data(analysis_data)
+    analysis_data = entry.get_analysis_data()  # Both tiers return the same shape
+    expires_at = datetime.utcnow() + timedelta(seconds=AI_CACHE_TTL_SECONDS)
+    _remember(cache_key, expires_at, officer_id, period_id, analysis_data)
+
+    if officer_id is None or period_id is None:
+        return analysis_data
+
     try:
-        from models import AIAnalysisCache
-        from app import db
-        
-        # Check if already exists
-        existing = AIAnalysisCache.query.filter_by(cache_key=cache_key).first()
-        
-        if existing:
-            # Update existing
-            existing.analysis_data = json.dumps(analysis_data)
-            existing.updated_at = datetime.utcnow()
-        else:
-            # Create new
-            new_cache = AIAnalysisCache(
-                cache_key=cache_key,
-                cache_type=cache_type,
-                analysis_data=json.dumps(analysis_data)
-            )
-            db.session.add(new_cache)
-        
-        db.session.commit()
-        return True
+        with deferred_write():
+            existing = AIAnalysisCache.query.filter_by(
+                content_hash=cache_key,
+                officer_id=officer_id,
+                period_id=period_id
+            ).first()
+
+            if existing:
+                existing.set_analysis_data(analysis_data)
+                existing.updated_at = datetime.utcnow()
+            else:
+                entry.content_hash = cache_key
+                entry.officer_id = officer_id
+                entry.period_id = period_id
+                entry.question_id = question_id
+                db.session.add(entry)
+
+        with _cache_lock:
+            _stats['saves'] += 1
+            prune = _stats['saves'] % _PRUNE_EVERY == 0
+        if prune:
+            prune_analysis_cache()
     except Exception as e:
         print(f"Error saving AI analysis to cache: {e}")
-        try:
-            db.session.rollback()
-        except:
-            pass
-        return False
+    return analysis_data
+
 
-def clear_analysis_cache_for_officer(officer_id):
-    """Clear all cached AI analysis for a specific officer (when responses change)"""
+def prune_analysis_cache():
+    """Delete expired rows and keep the table within AI_CACHE_MAX_ROWS (oldest first)"""
     try:
         from models import AIAnalysisCache
         from app import db
-        from datetime import timedelta
-        
-        cutoff_date = datetime.utcnow() - timedelta(hours=24)
-        
-        old_entries = AIAnalysisCache.query.filter(
-            AIAnalysisCache.updated_at < cutoff_date
-        ).all()
-        
-        for entry in old_entries:
-            db.session.delete(entry)
-        
-        db.session.commit()
+        from unit_of_work import deferred_write
+
+        cutoff = datetime.utcnow() - timedelta(seconds=AI_CACHE_TTL_SECONDS)
+        with deferred_write():
+            removed = AIAnalysisCache.query.filter(AIAnalysisCache.updated_at <= cutoff).delete(synchronize_session=False)
+
+            overflow = AIAnalysisCache.query.count() - AI_CACHE_MAX_ROWS
+            if overflow > 0:
+                oldest_ids = [row[0] for row in db.session.query(AIAnalysisCache.id).order_by(
+                    AIAnalysisCache.updated_at.asc()
+                ).limit(overflow).all()]
+                removed += AIAnalysisCache.query.filter(AIAnalysisCache.id.in_(oldest_ids)).delete(synchronize_session=False)
+        return removed
+    except Exception as e:
+        print(f"Error pruning AI analysis cache: {e}")
+        return 0
+
+
+def clear_analysis_cache_for_officer(officer_id, period_id=None):
+    """Clear cached AI analysis for an officer (when responses change), optionally for one period only"""
+    with _cache_lock:
+        stale_keys = [
+            key for key, (_, entry_officer, entry_period, _) in _memory_cache.items()
+            if entry_officer == officer_id and (period_id is None or entry_period == period_id)
+        ]
+        for key in stale_keys:
+            del _memory_cache[key]
+
+    try:
+        from models import AIAnalysisCache
+        from unit_of_work import deferred_write
+
+        with deferred_write():
+            query = AIAnalysisCache.query.filter_by(officer_id=officer_id)
+            if period_id is not None:
+                query = query.filter_by(period_id=period_id)
+            query.delete(synchronize_session=False)
         return True
     except Exception as e:
         print(f"Error clearing AI analysis cache: {e}")
-        try:
-            db.session.rollback()
-        except:
-            pass
-        return False
\ No newline at end of file
+        return False
+
+
+def get_cache_stats():
+    """Hit and miss counters for this process, plus the in-memory cache size"""
+    with _cache_lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory_cache)
+    lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups * 100, 1) if lookups else 0
+    return stats
@@ -5,7 +5,9 @@ Generates consolidated reports with both numerical ratings and text feedback
 
 import os
 import json
+import threading
 from openai import OpenAI
+from metrics import observe_openai_call, PDF_RENDER_SECONDS
 from datetime import datetime
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
@@ -18,7 +20,12 @@ import io
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY2") or os.environ.get("OPENAI_API_KEY")
 openai_client = OpenAI(api_key=OPENAI_API_KEY)
 
-def generate_comprehensive_report(officer_name, matrix_data, text_responses, period_name, assessment_forms_data=None):
+# Bound concurrent GPT-4o calls across report worker threads to stay within the API rate limit
+OPENAI_MAX_CONCURRENCY = int(os.environ.get("OPENAI_MAX_CONCURRENCY", 2))
+_openai_slots = threading.BoundedSemaphore(OPENAI_MAX_CONCURRENCY)
+
+def generate_comprehensive_report(officer_name, matrix_data, text_responses, period_name, assessment_forms_data=None,
+                                  progress_callback=None):
     """
     Generate comprehensive AI analysis combining numerical ratings and text feedback
     
@@ -28,6 +35,7 @@ def generate_comprehensive_report(officer_name, matrix_data, text_responses, per
         text_responses: Dictionary of text responses grouped by question
         period_name: Assessment period name
         assessment_forms_data: Complete assessment forms data for PDF inclusion
+        progress_callback: Optional callable invoked with 'llm' and 'pdf' as each phase starts
     
     Returns:
         Dictionary with comprehensive analysis and PDF data
@@ -43,9 +51,13 @@ def generate_comprehensive_report(officer_name, matrix_data, text_responses, per
         }
         
         # Generate AI analysis
+        if progress_callback:
+            progress_callback('llm')
         ai_summary = generate_ai_analysis(analysis_data)
         
         # Generate PDF report
+        if progress_callback:
+            progress_callback('pdf')
         pdf_data = generate_pdf_report(analysis_data, ai_summary, assessment_forms_data)
         
         return {
@@ -239,12 +251,13 @@ def generate_ai_analysis(analysis_data):
             "overall_assessment": "Overall assessment that synthesizes actual reviewer feedback with specific examples and themes"
         }"""
         
-        response = openai_client.chat.completions.create(
-            model="gpt-4o",
-            messages=[{"role": "user", "content": prompt}],
-            response_format={"type": "json_object"},
-            timeout=90
-        )
+        with _openai_slots:
+            response = observe_openai_call('ai_comprehensive_analysis', openai_client.chat.completions.create,
+                model="gpt-4o",
+                messages=[{"role": "user", "content": prompt}],
+                response_format={"type": "json_object"},
+                timeout=90
+            )
         
         return json.loads(response.choices[0].message.content)
         
@@ -782,7 +795,8 @@ def generate_pdf_report(analysis_data, ai_summary, assessment_forms_data=None):
         story.append(Paragraph(ai_summary['overall_assessment'], styles['Normal']))
         
         # Build PDF
-        doc.build(story)
+        with PDF_RENDER_SECONDS.labels('ai_comprehensive').time():
+            doc.build(story)
         pdf_data = buffer.getvalue()
         buffer.close()
         
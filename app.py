@@ -24,6 +24,15 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Disable for development compatibi
 app.config['SESSION_COOKIE_HTTPONLY'] = True
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 86400
+app.config['BADGE_COUNT_CACHE_SECONDS'] = int(os.environ.get('BADGE_COUNT_CACHE_SECONDS', 0))  # 0 = per-request only
+app.config['DASHBOARD_STATS_CACHE_SECONDS'] = int(os.environ.get('DASHBOARD_STATS_CACHE_SECONDS', 30))  # Admin dashboard snapshot
+app.config['QUERY_COUNT_HEADERS'] = os.environ.get('QUERY_COUNT_HEADERS', 'false').lower() == 'true'  # X-DB-Queries / X-DB-Commits
+app.config['SQL_PROFILE_SAMPLE_RATE'] = float(os.environ.get('SQL_PROFILE_SAMPLE_RATE', 0.05))  # Share of requests SQL-profiled
+app.config['SQL_N_PLUS_ONE_THRESHOLD'] = int(os.environ.get('SQL_N_PLUS_ONE_THRESHOLD', 5))  # Repeats of one statement shape
+app.config['PROFILE_SAMPLE_RATE'] = float(os.environ.get('PROFILE_SAMPLE_RATE', 0))  # Share of requests stack-sampled
+app.config['PROFILE_INTERVAL_MS'] = float(os.environ.get('PROFILE_INTERVAL_MS', 5))  # Stack sampling interval
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')  # Bearer token required by /metrics when set
+app.config['REPORT_WORKER_THREADS'] = int(os.environ.get('REPORT_WORKER_THREADS', 2))  # Background AI report workers
 app.wsgi_app = ProxyFix(app.wsgi_app, x_proto=1, x_host=1)
 
 # Configure the database with environment awareness
@@ -83,6 +92,14 @@ def init_database():
             db.create_all()
             from utils import initialize_default_data
             initialize_default_data()
+            from question_index import ensure_question_index
+            ensure_question_index()
+            from activity_counters import ensure_activity_counters
+            ensure_activity_counters()
+            from workflow_state import ensure_workflow_states
+            ensure_workflow_states()
+            from report_blobs import ensure_report_blobs
+            ensure_report_blobs()
         return True
     except Exception as e:
         app.logger.error(f"Database initialization failed: {e}")
@@ -100,52 +117,23 @@ def health_check():
     except Exception as e:
         return {'status': 'unhealthy', 'error': str(e)}, 500
 
-# Context processor for pending assignments count
+# Prometheus scrape endpoint
+@app.route('/metrics')
+def metrics_endpoint():
+    """Request, database, OpenAI, PDF and email metrics in the Prometheus text format"""
+    from flask import request
+    from metrics import render_metrics
+    token = app.config.get('METRICS_TOKEN')
+    if token and request.headers.get('Authorization') != f'Bearer {token}':
+        return {'error': 'unauthorized'}, 401
+    return render_metrics()
+
+# Context processor for navigation badge counts
 @app.context_processor
-def inject_pending_assignments():
+def inject_badge_counts():
     from flask_login import current_user
-    if current_user.is_authenticated and current_user.role in ['board_member', 'admin', 'officer']:
-        from models import AssessmentAssignment, AssessmentPeriod
-        from sqlalchemy import or_
-        
-        # Count pending assignments based on user role
-        if current_user.role == 'officer':
-            # Officers only count their self-assessment tasks (where they are both officer and reviewer)
-            pending_count = AssessmentAssignment.query.filter(
-                AssessmentAssignment.officer_id == current_user.id,
-                AssessmentAssignment.reviewer_id == current_user.id,
-                AssessmentAssignment.is_completed == False
-            ).join(AssessmentPeriod).filter(AssessmentPeriod.is_active == True).count()
-        else:
-            # Board members and admins count assignments where they are reviewers
-            # Only count assignments where officer's self-assessment is approved
-            pending_count = 0
-            raw_assignments = AssessmentAssignment.query.filter(
-                AssessmentAssignment.reviewer_id == current_user.id,
-                AssessmentAssignment.officer_id != current_user.id,  # Exclude self-assessments
-                AssessmentAssignment.is_completed == False
-            ).join(AssessmentPeriod).filter(AssessmentPeriod.is_active == True).all()
-            
-            # Count only assignments where officer's self-assessment is approved
-            for assignment in raw_assignments:
-                officer_self = AssessmentAssignment.query.filter_by(
-                    officer_id=assignment.officer_id,
-                    reviewer_id=assignment.officer_id,
-                    period_id=assignment.period_id
-                ).first()
-                if officer_self and officer_self.is_admin_approved:
-                    pending_count += 1
-        
-        # Admin pending count for approval tasks
-        admin_pending_count = 0
-        if current_user.role == 'admin':
-            admin_pending_count = AssessmentAssignment.query.filter_by(
-                is_submitted=True,
-                is_admin_approved=False
-            ).count()
-        
-        return dict(pending_assignments_count=pending_count, admin_pending_count=admin_pending_count)
-    return dict(pending_assignments_count=0, admin_pending_count=0)
+    from badge_counts import navigation_badges
+    return navigation_badges(current_user)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=True)
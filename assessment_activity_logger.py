@@ -2,9 +2,12 @@
 Enhanced Assessment Activity Logger
 Comprehensive logging system for assessment workflow events
 """
-from flask import request
+from flask import request, has_request_context
+from sqlalchemy.orm import joinedload
 from app import db
 from models import AssessmentActivityLog, User, AssessmentPeriod, AssessmentAssignment
+from log_buffer import buffer_log_row, flush_log_buffer, is_duplicate_event, ASSESSMENT_ACTIVITY_LOG_TABLE
+from activity_counters import get_assessment_event_statistics
 from datetime import datetime
 import json
 
@@ -56,6 +59,73 @@ class AssessmentCategories:
     AI_PROCESSING = 'ai_processing'
     RESULTS = 'results'
 
+EVENT_CATEGORIES = {
+    # Assignment category events
+    AssessmentEvents.SELF_ASSESSMENT_ASSIGNED: AssessmentCategories.ASSIGNMENT,
+    AssessmentEvents.REVIEWER_ASSIGNMENT_CREATED: AssessmentCategories.ASSIGNMENT,
+    AssessmentEvents.ASSIGNMENT_NOTIFICATION_SENT: AssessmentCategories.NOTIFICATION,
+    AssessmentEvents.REVIEWER_NOTIFIED: AssessmentCategories.NOTIFICATION,
+
+    # Submission category events
+    AssessmentEvents.SELF_ASSESSMENT_STARTED: AssessmentCategories.SUBMISSION,
+    AssessmentEvents.SELF_ASSESSMENT_DRAFT_SAVED: AssessmentCategories.SUBMISSION,
+    AssessmentEvents.SELF_ASSESSMENT_SUBMITTED: AssessmentCategories.SUBMISSION,
+    AssessmentEvents.REVIEWER_ASSESSMENT_STARTED: AssessmentCategories.SUBMISSION,
+    AssessmentEvents.REVIEWER_DRAFT_SAVED: AssessmentCategories.SUBMISSION,
+    AssessmentEvents.REVIEWER_ASSESSMENT_SUBMITTED: AssessmentCategories.SUBMISSION,
+
+    # Approval category events
+    AssessmentEvents.ADMIN_REVIEW_STARTED: AssessmentCategories.APPROVAL,
+    AssessmentEvents.SELF_ASSESSMENT_APPROVED: AssessmentCategories.APPROVAL,
+    AssessmentEvents.SELF_ASSESSMENT_REJECTED: AssessmentCategories.APPROVAL,
+    AssessmentEvents.REVIEWERS_RELEASED: AssessmentCategories.APPROVAL,
+    AssessmentEvents.FINAL_ADMIN_REVIEW_STARTED: AssessmentCategories.APPROVAL,
+    AssessmentEvents.ASSESSMENT_APPROVED_FINAL: AssessmentCategories.APPROVAL,
+
+    # Results category events
+    AssessmentEvents.RESULTS_RELEASED_TO_REVIEWEE: AssessmentCategories.RESULTS,
+    AssessmentEvents.REVIEWEE_ACKNOWLEDGED_RESULTS: AssessmentCategories.RESULTS,
+    AssessmentEvents.ASSESSMENT_CLOSED: AssessmentCategories.RESULTS,
+
+    # AI Processing events
+    AssessmentEvents.AI_REPORT_GENERATION_STARTED: AssessmentCategories.AI_PROCESSING,
+    AssessmentEvents.AI_REPORT_GENERATED: AssessmentCategories.AI_PROCESSING,
+    AssessmentEvents.AI_REPORT_FAILED: AssessmentCategories.AI_PROCESSING,
+}
+
+def build_assessment_event(event_type, officer_id, period_id, actor_id, description,
+                           reviewer_id=None, assignment_id=None, metadata=None, event_status='completed'):
+    """
+    Unsaved AssessmentActivityLog for a workflow event, with the current request's IP
+    address and user agent (arguments as for log_assessment_event)
+    """
+    in_request = has_request_context()
+    activity = AssessmentActivityLog(
+        event_type=event_type,
+        event_category=EVENT_CATEGORIES.get(event_type, 'other'),
+        officer_id=officer_id,
+        period_id=period_id,
+        reviewer_id=reviewer_id,
+        assignment_id=assignment_id,
+        description=description,
+        event_status=event_status,
+        actor_id=actor_id,
+        timestamp=datetime.utcnow(),  # Explicit timestamp for every event
+        ip_address=request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr) if in_request else None,
+        user_agent=request.environ.get('HTTP_USER_AGENT', 'System') if in_request else 'System'
+    )
+    
+    if metadata:
+        activity.set_event_data(metadata)
+    return activity
+
+def assessment_event_row(activity):
+    """Column dictionary of an unsaved AssessmentActivityLog, for a bulk insert"""
+    return {
+        column.name: getattr(activity, column.name)
+        for column in ASSESSMENT_ACTIVITY_LOG_TABLE.columns if column.name != 'id'
+    }
+
 def log_assessment_event(event_type, officer_id, period_id, actor_id, description, 
                         reviewer_id=None, assignment_id=None, metadata=None, event_status='completed'):
     """
@@ -71,92 +141,32 @@ def log_assessment_event(event_type, officer_id, period_id, actor_id, descriptio
         assignment_id: ID of the assignment (if applicable)
         metadata: Dictionary of additional event data
         event_status: Status of the event ('completed', 'pending', 'failed')
+    
+    Returns:
+        The (not yet stored) AssessmentActivityLog, or None if skipped as a duplicate
     """
     try:
-        # Check for duplicate entries within the last 5 seconds to prevent spam
-        from datetime import datetime, timedelta
-        recent_threshold = datetime.utcnow() - timedelta(seconds=5)
-        
-        existing_log = AssessmentActivityLog.query.filter(
-            AssessmentActivityLog.event_type == event_type,
-            AssessmentActivityLog.officer_id == officer_id,
-            AssessmentActivityLog.actor_id == actor_id,
-            AssessmentActivityLog.timestamp >= recent_threshold
-        ).first()
-        
-        if existing_log:
+        # Skip duplicate entries within the last 5 seconds to prevent spam
+        if is_duplicate_event((event_type, officer_id, actor_id)):
             print(f"Skipping duplicate log entry: {event_type} for officer {officer_id} by actor {actor_id}")
-            return existing_log
-        
-        # Determine event category
-        category_map = {
-            # Assignment category events
-            AssessmentEvents.SELF_ASSESSMENT_ASSIGNED: AssessmentCategories.ASSIGNMENT,
-            AssessmentEvents.REVIEWER_ASSIGNMENT_CREATED: AssessmentCategories.ASSIGNMENT,
-            AssessmentEvents.ASSIGNMENT_NOTIFICATION_SENT: AssessmentCategories.NOTIFICATION,
-            AssessmentEvents.REVIEWER_NOTIFIED: AssessmentCategories.NOTIFICATION,
-            
-            # Submission category events
-            AssessmentEvents.SELF_ASSESSMENT_STARTED: AssessmentCategories.SUBMISSION,
-            AssessmentEvents.SELF_ASSESSMENT_DRAFT_SAVED: AssessmentCategories.SUBMISSION,
-            AssessmentEvents.SELF_ASSESSMENT_SUBMITTED: AssessmentCategories.SUBMISSION,
-            AssessmentEvents.REVIEWER_ASSESSMENT_STARTED: AssessmentCategories.SUBMISSION,
-            AssessmentEvents.REVIEWER_DRAFT_SAVED: AssessmentCategories.SUBMISSION,
-            AssessmentEvents.REVIEWER_ASSESSMENT_SUBMITTED: AssessmentCategories.SUBMISSION,
-            
-            # Approval category events
-            AssessmentEvents.ADMIN_REVIEW_STARTED: AssessmentCategories.APPROVAL,
-            AssessmentEvents.SELF_ASSESSMENT_APPROVED: AssessmentCategories.APPROVAL,
-            AssessmentEvents.SELF_ASSESSMENT_REJECTED: AssessmentCategories.APPROVAL,
-            AssessmentEvents.REVIEWERS_RELEASED: AssessmentCategories.APPROVAL,
-            AssessmentEvents.FINAL_ADMIN_REVIEW_STARTED: AssessmentCategories.APPROVAL,
-            AssessmentEvents.ASSESSMENT_APPROVED_FINAL: AssessmentCategories.APPROVAL,
-            
-            # Results category events
-            AssessmentEvents.RESULTS_RELEASED_TO_REVIEWEE: AssessmentCategories.RESULTS,
-            AssessmentEvents.REVIEWEE_ACKNOWLEDGED_RESULTS: AssessmentCategories.RESULTS,
-            AssessmentEvents.ASSESSMENT_CLOSED: AssessmentCategories.RESULTS,
-            
-            # AI Processing events
-            AssessmentEvents.AI_REPORT_GENERATION_STARTED: AssessmentCategories.AI_PROCESSING,
-            AssessmentEvents.AI_REPORT_GENERATED: AssessmentCategories.AI_PROCESSING,
-            AssessmentEvents.AI_REPORT_FAILED: AssessmentCategories.AI_PROCESSING,
-        }
-        
-        event_category = category_map.get(event_type, 'other')
-        
-        # Create activity log entry with explicit timestamp
-        from datetime import datetime
-        activity = AssessmentActivityLog(
-            event_type=event_type,
-            event_category=event_category,
-            officer_id=officer_id,
-            period_id=period_id,
-            reviewer_id=reviewer_id,
-            assignment_id=assignment_id,
-            description=description,
-            event_status=event_status,
-            actor_id=actor_id,
-            timestamp=datetime.utcnow(),  # Explicit timestamp for every event
-            ip_address=request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr) if request else None,
-            user_agent=request.environ.get('HTTP_USER_AGENT', 'System') if request else 'System'
-        )
+            return None
         
-        if metadata:
-            activity.set_event_data(metadata)
+        activity = build_assessment_event(event_type, officer_id, period_id, actor_id, description,
+                                          reviewer_id=reviewer_id, assignment_id=assignment_id,
+                                          metadata=metadata, event_status=event_status)
         
-        db.session.add(activity)
-        db.session.commit()
+        # Written by the log buffer's next bulk insert, outside this request's transaction
+        buffer_log_row(ASSESSMENT_ACTIVITY_LOG_TABLE, assessment_event_row(activity))
         
         return activity
         
     except Exception as e:
         print(f"Error logging assessment activity: {e}")
-        db.session.rollback()
         return None
 
 def get_assessment_activity_logs(officer_id=None, period_id=None, reviewer_id=None, event_category=None, user_id=None, event_type=None, limit=100):
     """Get assessment activity logs with optional filtering"""
+    flush_log_buffer()
     query = AssessmentActivityLog.query
     
     # Support both officer_id and user_id parameters for compatibility
@@ -178,7 +188,11 @@ def get_assessment_activity_logs(officer_id=None, period_id=None, reviewer_id=No
 
 def get_assessment_timeline(officer_id, period_id):
     """Get complete assessment timeline for a specific officer and period"""
-    activities = AssessmentActivityLog.query.filter_by(
+    flush_log_buffer()
+    activities = AssessmentActivityLog.query.options(
+        joinedload(AssessmentActivityLog.actor),
+        joinedload(AssessmentActivityLog.reviewer)
+    ).filter_by(
         officer_id=officer_id,
         period_id=period_id
     ).order_by(AssessmentActivityLog.timestamp.asc()).all()
@@ -353,32 +367,8 @@ def log_comprehensive_event(event_type, officer_id, period_id, actor_id, descrip
     )
 
 def get_event_statistics(period_id=None):
-    """Get comprehensive event statistics with timestamp analysis"""
-    from datetime import datetime, timedelta
-    from sqlalchemy import func
-    
-    query = AssessmentActivityLog.query
-    if period_id:
-        query = query.filter_by(period_id=period_id)
-    
-    # Get event type distribution
-    event_counts = query.with_entities(
-        AssessmentActivityLog.event_type,
-        func.count(AssessmentActivityLog.id).label('count')
-    ).group_by(AssessmentActivityLog.event_type).all()
-    
-    # Get events by day for the last 30 days
-    thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-    recent_events = query.filter(
-        AssessmentActivityLog.timestamp >= thirty_days_ago
-    ).with_entities(
-        func.date(AssessmentActivityLog.timestamp).label('date'),
-        func.count(AssessmentActivityLog.id).label('count')
-    ).group_by(func.date(AssessmentActivityLog.timestamp)).all()
-    
-    return {
-        'event_counts': dict(event_counts),
-        'recent_activity': {str(date): count for date, count in recent_events},
-        'total_events': query.count(),
-        'period_filter': period_id
-    }
\ No newline at end of file
+    """Get event statistics (by type, by category and per day for the last 30 days) from the daily rollup"""
+    flush_log_buffer()
+    statistics = get_assessment_event_statistics(period_id, days=30)
+    statistics['period_filter'] = period_id
+    return statistics
\ No newline at end of file
@@ -8,7 +8,7 @@ from plotly.subplots import make_subplots
 import pandas as pd
 from datetime import datetime, timedelta
 from models import AssessmentProject, AssessmentStatus, AssessmentAssignment, User, AssessmentPeriod
-from assessment_activity_logger import get_assessment_timeline, get_assessment_progress_summary
+from assessment_activity_logger import get_assessment_progress_summary
 import json
 
 class AssessmentVisualizer:
@@ -44,14 +44,18 @@ class AssessmentVisualizer:
     def create_assessment_timeline_chart(self, officer_id, period_id):
         """Create a comprehensive workflow diagram with reviewer branches"""
         try:
+            from sqlalchemy.orm import joinedload
             from models import AssessmentAssignment, User, AssessmentPeriod
+            from workflow_state import get_workflow_state
             
-            # Get timeline data and assessment assignments
-            timeline = get_assessment_timeline(officer_id, period_id)
-            completed_events = [item['event_type'] for item in timeline] if timeline else []
+            # Stage events recorded so far, from the materialized workflow state
+            state = get_workflow_state(officer_id, period_id)
+            completed_events = state.seen_event_types if state else set()
             
             # Get all assignments for this officer/period to show reviewer branches
-            assignments = AssessmentAssignment.query.filter_by(
+            assignments = AssessmentAssignment.query.options(
+                joinedload(AssessmentAssignment.reviewer)
+            ).filter_by(
                 officer_id=officer_id,
                 period_id=period_id
             ).all()
@@ -413,22 +417,17 @@ class AssessmentVisualizer:
     
     def create_activity_heatmap(self, period_id, days=30):
         """Create activity heatmap showing daily assessment activity"""
-        from assessment_activity_logger import get_assessment_activity_logs
+        from log_buffer import flush_log_buffer
+        from activity_counters import assessment_daily_counts
         
-        # Get recent activity logs
-        activities = get_assessment_activity_logs(period_id=period_id, limit=1000)
-        
-        # Create daily activity data
-        end_date = datetime.now().date()
+        # Daily totals come from the rollup (one row per day and event type), so busy periods are not truncated
+        flush_log_buffer()
+        end_date = datetime.utcnow().date()
         start_date = end_date - timedelta(days=days-1)
+        daily_counts = assessment_daily_counts(period_id, date_from=start_date, date_to=end_date)
         
         date_range = pd.date_range(start=start_date, end=end_date, freq='D')
-        activity_data = {date.date(): 0 for date in date_range}
-        
-        for activity in activities:
-            activity_date = activity.timestamp.date()
-            if start_date <= activity_date <= end_date:
-                activity_data[activity_date] += 1
+        activity_data = {date.date(): daily_counts.get(date.date(), 0) for date in date_range}
         
         # Create heatmap data
         dates = list(activity_data.keys())
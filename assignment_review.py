@@ -0,0 +1,163 @@
+"""
+Assignment Review
+Admin approval, release and rejection of submitted assessment assignments, for any
+number of assignments at once. The assignments are validated with one query, changed
+with one set-based UPDATE, reviewer counts for releases come from one grouped query,
+and the audit trail (ActivityLog and AssessmentActivityLog rows) is written with one
+batch insert per table in the same transaction, so it commits or rolls back with the
+change it records.
+"""
+from datetime import datetime
+from sqlalchemy import func, select, update
+from sqlalchemy.orm import aliased
+from app import db
+from models import AssessmentAssignment, User
+from activity_logger import build_activity_row
+from assessment_activity_logger import AssessmentEvents, build_assessment_event, assessment_event_row
+from log_buffer import insert_log_rows, ACTIVITY_LOG_TABLE, ASSESSMENT_ACTIVITY_LOG_TABLE
+
+REVIEW_ACTIONS = ('approve', 'release', 'reject')
+
+
+def _load_assignments(assignment_ids):
+    """Assignment columns plus officer and reviewer names for the IDs, locked on PostgreSQL"""
+    A = AssessmentAssignment
+    officer = aliased(User)
+    reviewer = aliased(User)
+    rows = db.session.execute(
+        select(A.id, A.officer_id, A.reviewer_id, A.period_id, A.is_submitted, A.is_admin_approved,
+               officer.name.label('officer_name'), reviewer.name.label('reviewer_name'))
+        .join(officer, officer.id == A.officer_id)
+        .join(reviewer, reviewer.id == A.reviewer_id)
+        .where(A.id.in_(assignment_ids))
+        .with_for_update(of=A)
+    ).mappings().all()
+    return {row['id']: row for row in rows}
+
+
+def _pending_reviewer_counts(self_assessments):
+    """(officer ID, period ID) -> external assignments neither submitted nor completed, in one grouped query"""
+    if not self_assessments:
+        return {}
+    A = AssessmentAssignment
+    pairs = {(row['officer_id'], row['period_id']) for row in self_assessments}
+    rows = db.session.query(A.officer_id, A.period_id, func.count(A.id)).filter(
+        A.officer_id.in_({officer_id for officer_id, _ in pairs}),
+        A.period_id.in_({period_id for _, period_id in pairs}),
+        A.reviewer_id != A.officer_id,
+        db.or_(A.is_completed == False, A.is_completed.is_(None)),
+        db.or_(A.is_submitted == False, A.is_submitted.is_(None))
+    ).group_by(A.officer_id, A.period_id).all()
+    return {(officer_id, period_id): count for officer_id, period_id, count in rows
+            if (officer_id, period_id) in pairs}
+
+
+def review_assignments(assignment_ids, action, admin_user_id, admin_notes=None):
+    """
+    Approve, approve and release, or send back submitted assignments
+
+    'release' approves like 'approve' and, for self-assessments, also releases the
+    officer to their external reviewers. Runs on db.session; the caller commits.
+
+    Args:
+        assignment_ids: Assignment IDs (duplicates are ignored)
+        action: 'approve', 'release' or 'reject'
+        admin_user_id: ID of the admin taking the action
+        admin_notes: Feedback stored on rejected assignments
+
+    Returns:
+        Dictionary with action, requested, succeeded and failed counts, and results: one
+        dictionary per requested ID, in request order, with assignment_id, outcome
+        ('approved', 'released', 'rejected', 'not_found', 'not_submitted' or
+        'already_approved'), success and message (plus released_to for releases)
+    """
+    if action not in REVIEW_ACTIONS:
+        raise ValueError(f"Unknown review action: {action}")
+
+    assignment_ids = list(dict.fromkeys(int(assignment_id) for assignment_id in assignment_ids))
+    assignments = _load_assignments(assignment_ids) if assignment_ids else {}
+
+    results = {}
+    eligible = []
+    for assignment_id in assignment_ids:
+        row = assignments.get(assignment_id)
+        if row is None:
+            results[assignment_id] = {'outcome': 'not_found', 'message': 'Assignment not found.'}
+        elif not row['is_submitted']:
+            results[assignment_id] = {'outcome': 'not_submitted', 'message': 'Assignment has not been submitted yet.'}
+        elif row['is_admin_approved']:
+            message = ('Assignment is already approved and cannot be rejected.' if action == 'reject'
+                       else 'Assignment is already approved.')
+            results[assignment_id] = {'outcome': 'already_approved', 'message': message}
+        else:
+            eligible.append(row)
+
+    now = datetime.utcnow()
+    activity_rows = []
+    event_rows = []
+    if eligible:
+        A = AssessmentAssignment
+        if action == 'reject':
+            values = {'is_submitted': False, 'submitted_at': None, 'admin_notes': admin_notes}
+        else:
+            values = {'is_admin_approved': True, 'admin_approved_at': now,
+                      'admin_approved_by': admin_user_id, 'is_completed': True}
+        db.session.execute(update(A).where(
+            A.id.in_([row['id'] for row in eligible]),
+            A.is_submitted == True,
+            db.or_(A.is_admin_approved == False, A.is_admin_approved.is_(None))
+        ).values(**values), execution_options={'synchronize_session': False})
+
+        releases = [row for row in eligible if action == 'release' and row['officer_id'] == row['reviewer_id']]
+        release_ids = {row['id'] for row in releases}
+        pending_reviewers = _pending_reviewer_counts(releases)
+
+        for row in eligible:
+            is_self = row['officer_id'] == row['reviewer_id']
+            names = f"by {row['reviewer_name']} for {row['officer_name']}"
+            event = None
+            if action == 'reject':
+                result = {'outcome': 'rejected', 'message': f"Assessment by {row['reviewer_name']} has been sent back for revision."}
+                activity_rows.append(build_activity_row(
+                    admin_user_id, 'reject_reviewer_assessment', f'Sent back assessment {names} for revision'))
+                if is_self:
+                    event = (AssessmentEvents.SELF_ASSESSMENT_REJECTED, 'Self-assessment rejected by admin')
+            else:
+                result = {'outcome': 'approved', 'message': f"Assessment by {row['reviewer_name']} has been approved."}
+                activity_rows.append(build_activity_row(
+                    admin_user_id, 'approve_reviewer_assessment', f'Approved assessment {names}'))
+                if is_self:
+                    event = (AssessmentEvents.SELF_ASSESSMENT_APPROVED, 'Self-assessment approved by admin')
+
+            if event is not None:
+                event_rows.append(assessment_event_row(build_assessment_event(
+                    event[0], row['officer_id'], row['period_id'], admin_user_id, event[1], assignment_id=row['id'])))
+
+            if row['id'] in release_ids:
+                released_to = pending_reviewers.get((row['officer_id'], row['period_id']), 0)
+                result = {'outcome': 'released', 'released_to': released_to,
+                          'message': f'Self-assessment approved and released to {released_to} external reviewers.'}
+                activity_rows.append(build_activity_row(
+                    admin_user_id, 'release_to_reviewers',
+                    f"Released {row['officer_name']} for external review by {released_to} reviewers after self-assessment approval"))
+                event_rows.append(assessment_event_row(build_assessment_event(
+                    AssessmentEvents.REVIEWERS_RELEASED, row['officer_id'], row['period_id'], admin_user_id,
+                    f'Released to {released_to} external reviewers', assignment_id=row['id'],
+                    metadata={'reviewer_count': released_to})))
+            results[row['id']] = result
+
+        connection = db.session.connection()
+        insert_log_rows(connection, ACTIVITY_LOG_TABLE, activity_rows)
+        insert_log_rows(connection, ASSESSMENT_ACTIVITY_LOG_TABLE, event_rows)
+        db.session.expire_all()
+
+    succeeded = len(eligible)
+    return {
+        'action': action,
+        'requested': len(assignment_ids),
+        'succeeded': succeeded,
+        'failed': len(assignment_ids) - succeeded,
+        'results': [dict(results[assignment_id], assignment_id=assignment_id,
+                         success=results[assignment_id]['outcome'] in ('approved', 'released', 'rejected'))
+                    for assignment_id in assignment_ids]
+    }
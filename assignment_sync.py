@@ -0,0 +1,84 @@
+"""
+Assignment Synchronization
+Brings a period's review assignments in line with the assignment matrix by comparing
+the requested and existing (officer, reviewer) pairs in memory, then applying the
+difference with one bulk insert and one bulk delete. Assignments that already have
+responses are never removed.
+"""
+from sqlalchemy import insert, delete, update
+from app import db
+from models import AssessmentAssignment, AssessmentResponse, AssessmentActivityLog
+
+
+def _assignments_with_responses(period_id):
+    """IDs of the period's assignments that have at least one response (one grouped query)"""
+    rows = db.session.query(AssessmentResponse.assessment_assignment_id).join(
+        AssessmentAssignment, AssessmentAssignment.id == AssessmentResponse.assessment_assignment_id
+    ).filter(
+        AssessmentAssignment.period_id == period_id
+    ).group_by(AssessmentResponse.assessment_assignment_id).all()
+    return {row[0] for row in rows}
+
+
+def sync_period_assignments(period_id, create_pairs, keep_pairs=()):
+    """
+    Create missing assignments and delete unrequested ones for a period
+
+    Runs on db.session; the caller commits.
+
+    Args:
+        period_id: Assessment period ID
+        create_pairs: Set of (officer_id, reviewer_id) pairs that must exist
+        keep_pairs: Extra pairs kept if they already exist, but not created
+
+    Returns:
+        Dictionary with created, deleted, preserved and unchanged counts, plus the
+        created_pairs and deleted_pairs lists
+    """
+    create_pairs = set(create_pairs)
+    requested = create_pairs | set(keep_pairs)
+
+    existing = {}  # (officer_id, reviewer_id) -> [assignment IDs]
+    for assignment_id, officer_id, reviewer_id in db.session.query(
+        AssessmentAssignment.id, AssessmentAssignment.officer_id, AssessmentAssignment.reviewer_id
+    ).filter(AssessmentAssignment.period_id == period_id).all():
+        existing.setdefault((officer_id, reviewer_id), []).append(assignment_id)
+
+    with_responses = _assignments_with_responses(period_id)
+    preserved_pairs = {pair for pair, ids in existing.items() if with_responses.intersection(ids)}
+
+    # Delete unrequested assignments without responses
+    delete_ids = []
+    deleted_pairs = []
+    for pair, ids in existing.items():
+        if pair in requested:
+            continue
+        removable = [assignment_id for assignment_id in ids if assignment_id not in with_responses]
+        if removable:
+            delete_ids.extend(removable)
+            deleted_pairs.append(pair)
+
+    if delete_ids:
+        # Workflow events keep their history but lose the link to the removed assignment
+        db.session.execute(update(AssessmentActivityLog).where(
+            AssessmentActivityLog.assignment_id.in_(delete_ids)
+        ).values(assignment_id=None), execution_options={'synchronize_session': False})
+        db.session.execute(delete(AssessmentAssignment).where(
+            AssessmentAssignment.id.in_(delete_ids)
+        ), execution_options={'synchronize_session': False})
+
+    created_pairs = sorted(create_pairs - set(existing))
+    if created_pairs:
+        db.session.execute(insert(AssessmentAssignment), [
+            {'period_id': period_id, 'officer_id': officer_id, 'reviewer_id': reviewer_id}
+            for officer_id, reviewer_id in created_pairs
+        ])
+
+    return {
+        'created': len(created_pairs),
+        'deleted': len(delete_ids),
+        'preserved': len(preserved_pairs),
+        'unchanged': len(set(existing) & requested),
+        'created_pairs': created_pairs,
+        'deleted_pairs': sorted(deleted_pairs)
+    }
@@ -0,0 +1,120 @@
+"""
+Navigation Badge Counts
+Computes the reviewer, self-assessment and admin approval badge counts in a single
+aggregated SQL statement, memoized for the life of the request and optionally cached
+for a few seconds per user (BADGE_COUNT_CACHE_SECONDS)
+"""
+import time
+from flask import g, current_app, has_app_context
+from sqlalchemy import select, func, and_, exists
+from sqlalchemy.orm import aliased
+from app import db
+from models import AssessmentAssignment, AssessmentPeriod
+
+# user_id -> (expires_at, counts); only used when BADGE_COUNT_CACHE_SECONDS > 0
+_badge_cache = {}
+_MAX_CACHED_USERS = 1000
+
+
+def _count_badges(user_id):
+    """Run the single aggregated badge-count statement for one user"""
+    assignment = AssessmentAssignment
+    self_assignment = aliased(AssessmentAssignment)
+
+    active_period = exists().where(
+        AssessmentPeriod.id == assignment.period_id,
+        AssessmentPeriod.is_active == True
+    )
+
+    # Reviewer tasks only count once the officer's self-assessment is approved
+    officer_self_approved = exists().where(
+        self_assignment.officer_id == assignment.officer_id,
+        self_assignment.reviewer_id == assignment.officer_id,
+        self_assignment.period_id == assignment.period_id,
+        self_assignment.is_admin_approved == True
+    )
+
+    reviewer_pending = select(func.count(assignment.id)).where(
+        assignment.reviewer_id == user_id,
+        assignment.officer_id != user_id,
+        assignment.is_completed == False,
+        active_period,
+        officer_self_approved
+    ).scalar_subquery()
+
+    self_pending = select(func.count(assignment.id)).where(
+        assignment.officer_id == user_id,
+        assignment.reviewer_id == user_id,
+        assignment.is_completed == False,
+        active_period
+    ).scalar_subquery()
+
+    admin_pending = select(func.count(assignment.id)).where(
+        and_(assignment.is_submitted == True, assignment.is_admin_approved == False)
+    ).scalar_subquery()
+
+    row = db.session.execute(select(
+        reviewer_pending.label('reviewer_pending'),
+        self_pending.label('self_pending'),
+        admin_pending.label('admin_pending')
+    )).one()
+
+    return {
+        'reviewer_pending': row.reviewer_pending or 0,
+        'self_pending': row.self_pending or 0,
+        'admin_pending': row.admin_pending or 0
+    }
+
+
+def get_badge_counts(user):
+    """
+    Get navigation badge counts for a user
+
+    Returns:
+        Dictionary with reviewer_pending, self_pending and admin_pending counts
+    """
+    memo = g.get('_badge_counts')
+    if memo is not None and memo[0] == user.id:
+        return memo[1]
+
+    ttl = current_app.config.get('BADGE_COUNT_CACHE_SECONDS', 0)
+    now = time.monotonic()
+    cached = _badge_cache.get(user.id) if ttl else None
+    if cached and cached[0] > now:
+        counts = cached[1]
+    else:
+        counts = _count_badges(user.id)
+        if ttl:
+            if len(_badge_cache) >= _MAX_CACHED_USERS:
+                _badge_cache.clear()
+            _badge_cache[user.id] = (now + ttl, counts)
+
+    g._badge_counts = (user.id, counts)
+    return counts
+
+
+def invalidate_badge_counts(user_id=None):
+    """Drop cached badge counts for one user, or for everyone"""
+    if has_app_context():
+        g.pop('_badge_counts', None)
+    if user_id is None:
+        _badge_cache.clear()
+    else:
+        _badge_cache.pop(user_id, None)
+
+
+def navigation_badges(user):
+    """Template variables for the navigation badges, based on the user's role"""
+    if not user.is_authenticated or user.role not in ['board_member', 'admin', 'officer']:
+        return dict(pending_assignments_count=0, admin_pending_count=0)
+
+    counts = get_badge_counts(user)
+    if user.role == 'officer':
+        # Officers only count their self-assessment tasks
+        pending_count = counts['self_pending']
+    else:
+        # Board members and admins count assignments where they are reviewers
+        pending_count = counts['reviewer_pending']
+
+    admin_pending_count = counts['admin_pending'] if user.role == 'admin' else 0
+    return dict(pending_assignments_count=pending_count, admin_pending_count=admin_pending_count)
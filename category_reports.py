@@ -0,0 +1,88 @@
+"""
+Category Rating Reports
+Loads a year's CategoryRating rows in one query and pivots them with pandas into the
+assessment x category and officer x category matrices behind the legacy reports page
+and the CSV export, instead of looking up each rating individually
+"""
+import pandas as pd
+from app import db
+from models import Assessment, CategoryRating
+
+
+def load_year_ratings(year):
+    """
+    Load every category rating for a year's assessments in one query
+
+    Args:
+        year: Assessment year
+
+    Returns:
+        DataFrame with assessment_id, officer_id, category_id and rating columns, one row
+        per (assessment, category); the first rating wins if a pair was stored twice
+    """
+    rows = db.session.query(
+        CategoryRating.assessment_id,
+        Assessment.officer_id,
+        CategoryRating.category_id,
+        CategoryRating.rating
+    ).join(Assessment, Assessment.id == CategoryRating.assessment_id).filter(
+        Assessment.year == year
+    ).order_by(CategoryRating.id).all()
+
+    ratings = pd.DataFrame(rows, columns=['assessment_id', 'officer_id', 'category_id', 'rating'])
+    return ratings.drop_duplicates(['assessment_id', 'category_id'], keep='first')
+
+
+def assessment_category_matrix(ratings, category_ids):
+    """Pivot ratings into an assessment_id x category_id matrix (NaN where a rating is missing)"""
+    matrix = ratings.pivot(index='assessment_id', columns='category_id', values='rating')
+    return matrix.reindex(columns=list(category_ids))
+
+
+def officer_category_report(year, officers, categories):
+    """
+    Per-officer assessment counts, overall averages and category averages for a year
+
+    Args:
+        year: Assessment year
+        officers: Officer User objects to report on
+        categories: Category objects (report columns)
+
+    Returns:
+        List of dictionaries with officer, assessments_count, overall_average and
+        category_averages (category ID -> average, 0 when unrated), for officers with
+        at least one assessment in the year
+    """
+    officer_ids = [officer.id for officer in officers]
+    category_ids = [category.id for category in categories]
+    if not officer_ids:
+        return []
+
+    assessments = pd.DataFrame(db.session.query(Assessment.officer_id, Assessment.overall_rating).filter(
+        Assessment.year == year,
+        Assessment.officer_id.in_(officer_ids)
+    ).all(), columns=['officer_id', 'overall_rating'])
+    if assessments.empty:
+        return []
+
+    # Unrated assessments count towards the divisor, as on the original report
+    overall = assessments.assign(overall_rating=assessments['overall_rating'].astype(float).fillna(0)) \
+        .groupby('officer_id')['overall_rating'].agg(['size', 'mean'])
+
+    ratings = load_year_ratings(year)
+    category_averages = ratings[ratings['officer_id'].isin(officer_ids)] \
+        .groupby(['officer_id', 'category_id'])['rating'].mean().unstack() \
+        .reindex(index=overall.index, columns=category_ids).round(2).fillna(0)
+
+    reports = []
+    for officer in officers:
+        if officer.id not in overall.index:
+            continue
+        averages = category_averages.loc[officer.id]
+        reports.append({
+            'officer': officer,
+            'assessments_count': int(overall.at[officer.id, 'size']),
+            'overall_average': round(float(overall.at[officer.id, 'mean']), 2),
+            'category_averages': {category_id: float(averages[category_id]) for category_id in category_ids}
+        })
+    return reports
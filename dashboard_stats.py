@@ -0,0 +1,127 @@
+"""
+Admin Dashboard Statistics
+Computes the admin dashboard's entity counts in one multi-aggregate statement and the
+monthly assessment trend in one GROUP BY, and keeps the result as a short-lived
+snapshot (DASHBOARD_STATS_CACHE_SECONDS) that is dropped whenever a transaction that
+changed assessments or assignments commits
+"""
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, func, event
+from app import db
+from models import Assessment, AssessmentAssignment, AssessmentForm, AssessmentQuestion, User
+
+# (period_id, year) -> (expires_at, stats)
+_snapshots = {}
+_snapshot_lock = threading.Lock()
+
+# Changes to these models invalidate the snapshot when their transaction commits
+_TRACKED_MODELS = (Assessment, AssessmentAssignment)
+
+
+def _count_entities(period_id, year):
+    """Run the single multi-aggregate count statement"""
+    def count(model, *criteria):
+        return select(func.count(model.id)).where(*criteria).scalar_subquery()
+
+    row = db.session.execute(select(
+        count(AssessmentForm, AssessmentForm.is_active == True).label('assessment_forms_count'),
+        count(AssessmentQuestion, AssessmentQuestion.is_active == True).label('assessment_questions_count'),
+        count(AssessmentForm, AssessmentForm.is_active == True, AssessmentForm.is_template == True).label('template_forms_count'),
+        count(User, User.role == 'officer').label('total_officers'),
+        count(User, User.role == 'board_member').label('total_board_members'),
+        count(Assessment, Assessment.year == year).label('total_assessments'),
+        count(AssessmentAssignment, AssessmentAssignment.period_id == period_id).label('total_assignments'),
+        count(AssessmentAssignment, AssessmentAssignment.period_id == period_id,
+              AssessmentAssignment.is_completed == True).label('completed_assignments'),
+    )).one()
+    return {key: value or 0 for key, value in row._mapping.items()}
+
+
+def _monthly_trend(year):
+    """Assessments submitted per month of the year, from one GROUP BY over a submitted_at range"""
+    month = db.extract('month', Assessment.submitted_at)
+    counts = dict(db.session.query(month, func.count(Assessment.id)).filter(
+        Assessment.submitted_at >= datetime(year, 1, 1),
+        Assessment.submitted_at < datetime(year + 1, 1, 1)
+    ).group_by(month).all())
+    counts = {int(m): n for m, n in counts.items() if m is not None}
+
+    return [{
+        'month': m,
+        'count': counts.get(m, 0),
+        'month_name': datetime(year, m, 1).strftime('%b')
+    } for m in range(1, 13)]
+
+
+def get_dashboard_stats(period_id, year):
+    """
+    Get admin dashboard statistics
+
+    Args:
+        period_id: Current assessment period ID (None if there is no active period)
+        year: Calendar year for the assessment totals and monthly trend
+
+    Returns:
+        Dictionary with entity counts, assignment totals for the period, completion_rate
+        and monthly_data (12 entries)
+    """
+    key = (period_id, year)
+    ttl = current_app.config.get('DASHBOARD_STATS_CACHE_SECONDS', 0)
+    now = time.monotonic()
+    if ttl:
+        with _snapshot_lock:
+            cached = _snapshots.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+
+    stats = _count_entities(period_id, year)
+    stats['pending_assignments'] = stats['total_assignments'] - stats['completed_assignments']
+    stats['completion_rate'] = round(
+        stats['completed_assignments'] / stats['total_assignments'] * 100, 1
+    ) if stats['total_assignments'] > 0 else 0
+    stats['monthly_data'] = _monthly_trend(year)
+
+    if ttl:
+        with _snapshot_lock:
+            _snapshots[key] = (now + ttl, stats)
+    return stats
+
+
+def invalidate_dashboard_stats():
+    """Drop every cached dashboard snapshot"""
+    with _snapshot_lock:
+        _snapshots.clear()
+
+
+def _touches_tracked_models(objects):
+    return any(isinstance(obj, _TRACKED_MODELS) for obj in objects)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _note_tracked_changes(session, flush_context):
+    if _touches_tracked_models(session.new) or _touches_tracked_models(session.dirty) \
+            or _touches_tracked_models(session.deleted):
+        session.info['dashboard_stats_stale'] = True
+
+
+@event.listens_for(db.session, 'do_orm_execute')
+def _note_bulk_changes(orm_execute_state):
+    """Bulk inserts, query.update() and query.delete() bypass the flush"""
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None and issubclass(mapper.class_, _TRACKED_MODELS):
+            orm_execute_state.session.info['dashboard_stats_stale'] = True
+
+
+@event.listens_for(db.session, 'after_commit')
+def _invalidate_after_commit(session):
+    if session.info.pop('dashboard_stats_stale', False):
+        invalidate_dashboard_stats()
+
+
+@event.listens_for(db.session, 'after_rollback')
+def _forget_after_rollback(session):
+    session.info.pop('dashboard_stats_stale', None)
@@ -376,6 +376,9 @@ CREATE INDEX idx_assignment_completed ON assessment_assignment(is_completed);
 CREATE INDEX idx_assignment_submitted ON assessment_assignment(is_submitted);
 CREATE INDEX idx_assignment_approved ON assessment_assignment(is_admin_approved);
 CREATE INDEX idx_assignment_unique_combo ON assessment_assignment(period_id, officer_id, reviewer_id);
+CREATE INDEX idx_assignment_period_officer ON assessment_assignment(period_id, officer_id);
+CREATE INDEX idx_assignment_period_reviewer ON assessment_assignment(period_id, reviewer_id);
+CREATE INDEX idx_assignment_submitted_approved ON assessment_assignment(is_submitted, is_admin_approved);
 
 -- Assessment Project Indexes
 CREATE INDEX idx_project_period ON assessment_project(period_id);
@@ -395,7 +398,7 @@ CREATE INDEX idx_question_active ON assessment_question(is_active);
 -- Assessment Response Indexes
 CREATE INDEX idx_response_assignment ON assessment_response(assessment_assignment_id);
 CREATE INDEX idx_response_question ON assessment_response(question_id);
-CREATE INDEX idx_response_assignment_question ON assessment_response(assessment_assignment_id, question_id);
+CREATE UNIQUE INDEX uq_response_assignment_question ON assessment_response(assessment_assignment_id, question_id);
 
 -- Period Selection Indexes
 CREATE INDEX idx_period_reviewee_period ON period_reviewee(period_id);
@@ -418,10 +421,12 @@ CREATE INDEX idx_ai_report_officer_period ON ai_generated_report(officer_id, per
 -- Activity Log Indexes
 CREATE INDEX idx_activity_user ON activity_log(user_id);
 CREATE INDEX idx_activity_timestamp ON activity_log(timestamp DESC);
+CREATE INDEX idx_activity_log_user_timestamp ON activity_log(user_id, timestamp);
 CREATE INDEX idx_activity_action ON activity_log(action);
 CREATE INDEX idx_assessment_activity_officer ON assessment_activity_log(officer_id);
 CREATE INDEX idx_assessment_activity_period ON assessment_activity_log(period_id);
 CREATE INDEX idx_assessment_activity_timestamp ON assessment_activity_log(timestamp DESC);
+CREATE INDEX idx_assessment_activity_officer_period_timestamp ON assessment_activity_log(officer_id, period_id, timestamp);
 CREATE INDEX idx_assessment_activity_event_type ON assessment_activity_log(event_type);
 CREATE INDEX idx_assessment_activity_category ON assessment_activity_log(event_category);
 
@@ -0,0 +1,244 @@
+"""
+Email Outbox
+Emails are written to the email_outbox table inside the request and sent by a background
+dispatcher thread. Each dispatch pass claims a batch of due emails and sends them over
+EMAIL_DISPATCH_CONCURRENCY SMTP connections in parallel, each connection reused for its
+share of the batch. Failures are retried with backoff. Reminder runs queue one digest
+per reviewer rather than one email per pending assignment. The dispatcher starts with
+the first request each process handles, so emails left pending or awaiting a retry
+across a restart or worker recycle go out without waiting for new ones.
+
+To try it against a local SMTP stand-in instead of the real server:
+
+    python -m aiosmtpd -n -l localhost:1025
+    SMTP_SERVER=localhost SMTP_PORT=1025 SMTP_USE_TLS=false SMTP_REQUIRE_AUTH=false
+"""
+import os
+import smtplib
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from flask import current_app
+from sqlalchemy.orm import joinedload
+from app import app, db
+from models import EmailOutbox, AssessmentAssignment
+from email_service import email_service
+
+EMAIL_DISPATCH_CONCURRENCY = int(os.environ.get('EMAIL_DISPATCH_CONCURRENCY', 2))  # Parallel SMTP connections
+EMAIL_BATCH_SIZE = int(os.environ.get('EMAIL_BATCH_SIZE', 100))
+EMAIL_DISPATCH_INTERVAL_SECONDS = float(os.environ.get('EMAIL_DISPATCH_INTERVAL_SECONDS', 30))
+RETRY_DELAYS = [60, 300, 1800]  # Seconds before the 2nd, 3rd and later attempts
+STALE_CLAIM_SECONDS = 600  # 'sending' rows older than this are assumed lost (process restart)
+
+_wake = threading.Event()
+_dispatcher = {'thread': None, 'pid': None}
+_dispatcher_lock = threading.Lock()
+_dispatch_lock = threading.Lock()  # One dispatch pass at a time per process
+
+
+def queue_email(to_email, subject, text_body, html_body, kind='notification', dedup_key=None, created_by=None):
+    """
+    Add an email to the outbox
+
+    The caller commits and then calls wake_dispatcher().
+
+    Returns:
+        The new EmailOutbox row
+    """
+    email = EmailOutbox(
+        kind=kind,
+        dedup_key=dedup_key,
+        to_email=to_email,
+        subject=subject,
+        text_body=text_body,
+        html_body=html_body,
+        created_by=created_by
+    )
+    db.session.add(email)
+    return email
+
+
+def queue_reminder_digests(period, created_by=None):
+    """
+    Queue one reminder email per reviewer with pending assignments in a period
+
+    Reviewers who still have an unsent reminder for the period are skipped.
+
+    Args:
+        period: AssessmentPeriod
+        created_by: ID of the user who requested the reminders
+
+    Returns:
+        Dictionary with emails (queued), assignments (covered by them) and skipped
+        (reviewers with an unsent reminder already queued)
+    """
+    pending = AssessmentAssignment.query.options(
+        joinedload(AssessmentAssignment.officer),
+        joinedload(AssessmentAssignment.reviewer)
+    ).filter_by(period_id=period.id, is_completed=False).order_by(
+        AssessmentAssignment.reviewer_id, AssessmentAssignment.id
+    ).all()
+
+    by_reviewer = defaultdict(list)
+    for assignment in pending:
+        by_reviewer[assignment.reviewer_id].append(assignment)
+
+    keys = {reviewer_id: f'reminder:{period.id}:{reviewer_id}' for reviewer_id in by_reviewer}
+    already_queued = {row[0] for row in db.session.query(EmailOutbox.dedup_key).filter(
+        EmailOutbox.dedup_key.in_(list(keys.values())),
+        EmailOutbox.status.in_(['pending', 'sending'])
+    ).all()} if keys else set()
+
+    days_remaining = (period.end_date - date.today()).days
+    summary = {'emails': 0, 'assignments': 0, 'skipped': 0}
+    for reviewer_id, assignments in by_reviewer.items():
+        if keys[reviewer_id] in already_queued:
+            summary['skipped'] += 1
+            continue
+
+        reviewer = assignments[0].reviewer
+        subject, text_body, html_body = email_service.build_reminder_digest(
+            reviewer.name, [assignment.officer.name for assignment in assignments], period.name, days_remaining
+        )
+        queue_email(reviewer.email, subject, text_body, html_body,
+                    kind='reminder_digest', dedup_key=keys[reviewer_id], created_by=created_by)
+        summary['emails'] += 1
+        summary['assignments'] += len(assignments)
+    return summary
+
+
+def _release_stale_claims():
+    """Return emails claimed by a dispatcher that never reported back to the queue"""
+    stale_before = datetime.utcnow() - timedelta(seconds=STALE_CLAIM_SECONDS)
+    EmailOutbox.query.filter(
+        EmailOutbox.status == 'sending',
+        EmailOutbox.claimed_at < stale_before
+    ).update({'status': 'pending'}, synchronize_session=False)
+    db.session.commit()
+
+
+def _claim_batch(limit):
+    """Atomically move up to limit due emails from pending to sending"""
+    now = datetime.utcnow()
+    ids = [row[0] for row in db.session.query(EmailOutbox.id).filter(
+        EmailOutbox.status == 'pending',
+        EmailOutbox.send_after <= now
+    ).order_by(EmailOutbox.send_after, EmailOutbox.id).limit(limit).all()]
+    if not ids:
+        return []
+
+    EmailOutbox.query.filter(
+        EmailOutbox.id.in_(ids),
+        EmailOutbox.status == 'pending'
+    ).update({
+        'status': 'sending',
+        'claimed_at': now,
+        'attempts': EmailOutbox.attempts + 1
+    }, synchronize_session=False)
+    db.session.commit()
+
+    # Rows another process claimed in the meantime carry a different claim time
+    return EmailOutbox.query.filter(
+        EmailOutbox.id.in_(ids),
+        EmailOutbox.status == 'sending',
+        EmailOutbox.claimed_at == now
+    ).all()
+
+
+def _record_results(batch, results, summary):
+    now = datetime.utcnow()
+    for email in batch:
+        error = results.get(email.id, RuntimeError('Not attempted'))
+        if error is None:
+            email.status = 'sent'
+            email.sent_at = now
+            email.last_error = None
+            summary['sent'] += 1
+            continue
+
+        email.last_error = str(error)
+        permanent = isinstance(error, smtplib.SMTPRecipientsRefused)
+        if permanent or email.attempts >= email.max_attempts:
+            email.status = 'failed'
+            summary['failed'] += 1
+        else:
+            email.status = 'pending'
+            email.send_after = now + timedelta(seconds=RETRY_DELAYS[min(email.attempts - 1, len(RETRY_DELAYS) - 1)])
+            summary['retrying'] += 1
+    db.session.commit()
+
+
+def dispatch_outbox(batch_size=EMAIL_BATCH_SIZE, concurrency=EMAIL_DISPATCH_CONCURRENCY):
+    """
+    Send every due email in the outbox
+
+    Args:
+        batch_size: Emails claimed per pass
+        concurrency: SMTP connections used in parallel for a pass
+
+    Returns:
+        Dictionary with sent, retrying and failed counts
+    """
+    summary = {'sent': 0, 'retrying': 0, 'failed': 0}
+    with _dispatch_lock:
+        _release_stale_claims()
+        while True:
+            batch = _claim_batch(batch_size)
+            if not batch:
+                break
+
+            messages = [(email.id, email.to_email, email.subject, email.text_body or '', email.html_body or '')
+                        for email in batch]
+            workers = max(1, min(concurrency, len(messages)))
+            results = {}
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='email-sender') as executor:
+                for chunk_results in executor.map(email_service.send_messages,
+                                                  [messages[i::workers] for i in range(workers)]):
+                    results.update(chunk_results)
+
+            _record_results(batch, results, summary)
+            if len(batch) < batch_size:
+                break
+    return summary
+
+
+def _dispatcher_loop(app):
+    """Dispatch whenever woken, and every EMAIL_DISPATCH_INTERVAL_SECONDS for retries"""
+    while True:
+        _wake.wait(EMAIL_DISPATCH_INTERVAL_SECONDS)
+        _wake.clear()
+        try:
+            with app.app_context():
+                try:
+                    dispatch_outbox()
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"Email dispatcher error: {e}")
+
+
+def start_email_dispatcher():
+    """Start the dispatcher thread once per process (again after a fork) and run a first pass at once"""
+    if _dispatcher['pid'] == os.getpid() and _dispatcher['thread'] is not None:
+        return
+    with _dispatcher_lock:
+        if _dispatcher['pid'] == os.getpid() and _dispatcher['thread'] is not None:
+            return
+        app = current_app._get_current_object()
+        thread = threading.Thread(target=_dispatcher_loop, args=(app,), name='email-dispatcher', daemon=True)
+        thread.start()
+        _dispatcher['thread'] = thread
+        _dispatcher['pid'] = os.getpid()
+        _wake.set()  # Send whatever an earlier process left pending
+
+
+def wake_dispatcher():
+    """Ask the dispatcher to send newly committed outbox emails now"""
+    start_email_dispatcher()
+    _wake.set()
+
+
+@app.before_request
+def _ensure_email_dispatcher():
+    start_email_dispatcher()
@@ -3,7 +3,9 @@ import os
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from flask import url_for, current_app
+from markupsafe import escape
 import logging
+from metrics import EMAILS_SENT, count_email_results
 
 class EmailService:
     def __init__(self):
@@ -13,6 +15,14 @@ class EmailService:
         self.smtp_password = os.environ.get('SMTP_PASSWORD', '')
         self.from_email = os.environ.get('FROM_EMAIL', self.smtp_username)
         self.from_name = os.environ.get('FROM_NAME', 'AAA Performance Tracker')
+        # A local SMTP stand-in (e.g. python -m aiosmtpd -n -l localhost:1025) needs neither
+        self.smtp_use_tls = os.environ.get('SMTP_USE_TLS', 'true').lower() == 'true'
+        self.smtp_require_auth = os.environ.get('SMTP_REQUIRE_AUTH', 'true').lower() == 'true'
+    
+    @property
+    def is_configured(self):
+        """True if messages are really sent rather than only logged"""
+        return bool(self.smtp_username and self.smtp_password) or not self.smtp_require_auth
     
     def send_assessment_notification(self, reviewer_email, reviewer_name, officer_name, period_name, assessment_url):
         """Send assessment assignment notification email"""
@@ -179,50 +189,196 @@ class EmailService:
             logging.error(f"Error creating reminder email: {str(e)}")
             return False
     
+    def build_reminder_digest(self, reviewer_name, officer_names, period_name, days_remaining):
+        """
+        Build one reminder email covering all of a reviewer's pending assessments in a period
+
+        Args:
+            reviewer_name: Reviewer's name
+            officer_names: Names of the officers still awaiting this reviewer's assessment
+            period_name: Assessment period name
+            days_remaining: Days until the period ends
+
+        Returns:
+            Tuple of (subject, text_content, html_content)
+        """
+        count = len(officer_names)
+        if count == 1:
+            subject = f"Reminder: Assessment Due Soon - {officer_names[0]}"
+        else:
+            subject = f"Reminder: {count} Assessments Due Soon - {period_name}"
+        base_url = current_app.config.get('BASE_URL', 'http://localhost:5000')
+        officer_items = ''.join(f"<li>{escape(name)}</li>" for name in officer_names)
+        officer_lines = '\n'.join(f"            - {name}" for name in officer_names)
+        
+        html_content = f"""
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{ font-family: Arial, sans-serif; line-height: 1.6; color: #333; }}
+                .container {{ max-width: 600px; margin: 0 auto; padding: 20px; }}
+                .header {{ background-color: #ffc107; color: #212529; padding: 20px; text-align: center; }}
+                .content {{ padding: 20px; background-color: #fff3cd; }}
+                .button {{ 
+                    display: inline-block; 
+                    background-color: #dc3545; 
+                    color: white; 
+                    padding: 12px 24px; 
+                    text-decoration: none; 
+                    border-radius: 5px;
+                    margin: 20px 0;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>⚠️ Assessment Reminder</h1>
+                </div>
+                <div class="content">
+                    <h2>Hello {escape(reviewer_name)},</h2>
+                    <p>This is a friendly reminder that you have {count} pending assessment{'s' if count != 1 else ''} in the <strong>{escape(period_name)}</strong> period:</p>
+                    <ul>{officer_items}</ul>
+                    
+                    <p><strong>Time Remaining: {days_remaining} days</strong></p>
+                    
+                    <p>Please complete your assessments as soon as possible to ensure timely completion of the review process.</p>
+                    
+                    <p style="text-align: center;">
+                        <a href="{base_url}" class="button">Complete Assessments Now</a>
+                    </p>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+        
+        text_content = f"""
+            Assessment Reminder - {period_name}
+            
+            Hello {reviewer_name},
+            
+            This is a reminder that you have {count} pending assessment{'s' if count != 1 else ''}:
+{officer_lines}
+            Time remaining: {days_remaining} days
+            
+            Please log in to complete your assessments as soon as possible.
+            
+            Thank you.
+            
+            ---
+            AAA Performance Tracker
+            """
+        
+        return subject, text_content, html_content
+    
+    def _build_message(self, to_email, subject, text_content, html_content):
+        """MIME message with plain text and HTML alternatives"""
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.from_name} <{self.from_email}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        msg.attach(MIMEText(text_content, 'plain'))
+        msg.attach(MIMEText(html_content, 'html'))
+        return msg
+    
+    def open_connection(self):
+        """Connect, STARTTLS and log in once; the caller sends any number of messages and quits"""
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        if self.smtp_use_tls:
+            server.starttls()
+        if self.smtp_username and self.smtp_password:
+            server.login(self.smtp_username, self.smtp_password)
+        return server
+    
+    def send_messages(self, messages):
+        """
+        Send several messages over one SMTP connection
+
+        Reconnects once if the server drops the connection part way through.
+
+        Args:
+            messages: List of (key, to_email, subject, text_content, html_content) tuples
+
+        Returns:
+            Dictionary mapping key to None (sent) or the exception that prevented sending
+        """
+        results = {}
+        if not self.is_configured:
+            for key, to_email, subject, _, _ in messages:
+                logging.info(f"Email would be sent to {to_email}: {subject}")
+                results[key] = None
+            EMAILS_SENT.labels('not_configured').inc(len(messages))
+            return results
+        
+        server = None
+        try:
+            for index, (key, to_email, subject, text_content, html_content) in enumerate(messages):
+                msg = self._build_message(to_email, subject, text_content, html_content)
+                for attempt in range(2):
+                    if server is None:
+                        try:
+                            server = self.open_connection()
+                        except (smtplib.SMTPException, OSError) as e:
+                            # Server unreachable or login refused: nothing else in this batch can go out
+                            for remaining in messages[index:]:
+                                results[remaining[0]] = e
+                            return results
+                    try:
+                        server.send_message(msg)
+                        results[key] = None
+                        break
+                    except smtplib.SMTPServerDisconnected as e:
+                        server = None  # Reconnect and try this message once more
+                        results[key] = e
+                    except (smtplib.SMTPException, OSError) as e:
+                        results[key] = e
+                        if not isinstance(e, (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError)):
+                            server = None  # Connection state unknown, start over for the next message
+                        break
+        finally:
+            if server is not None:
+                try:
+                    server.quit()
+                except Exception:
+                    pass
+        count_email_results(results)
+        return results
+    
     def _send_email(self, to_email, subject, text_content, html_content):
         """Send email using SMTP"""
         try:
             # Skip if no SMTP configuration
-            if not self.smtp_username or not self.smtp_password:
+            if not self.is_configured:
                 logging.info(f"Email would be sent to {to_email}: {subject}")
+                EMAILS_SENT.labels('not_configured').inc()
                 return True  # Return True for demo purposes
             
             # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.from_name} <{self.from_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add text and HTML parts
-            text_part = MIMEText(text_content, 'plain')
-            html_part = MIMEText(html_content, 'html')
-            
-            msg.attach(text_part)
-            msg.attach(html_part)
+            msg = self._build_message(to_email, subject, text_content, html_content)
             
             # Send email
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
+            server = self.open_connection()
             server.send_message(msg)
             server.quit()
             
             logging.info(f"Email sent successfully to {to_email}")
+            EMAILS_SENT.labels('sent').inc()
             return True
             
         except Exception as e:
             logging.error(f"Error sending email to {to_email}: {str(e)}")
+            EMAILS_SENT.labels('failed').inc()
             return False
     
     def test_connection(self):
         """Test email configuration"""
         try:
-            if not self.smtp_username or not self.smtp_password:
+            if not self.is_configured:
                 return False, "SMTP credentials not configured"
             
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            server.starttls()
-            server.login(self.smtp_username, self.smtp_password)
+            server = self.open_connection()
             server.quit()
             return True, "Email configuration is working"
             
@@ -38,6 +38,14 @@ certfile = None
 # Application
 preload_app = True
 
+# Prometheus multiprocess metrics (metrics.py): every run starts with an empty directory
+PROMETHEUS_MULTIPROC_DIR = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+if PROMETHEUS_MULTIPROC_DIR:
+    os.makedirs(PROMETHEUS_MULTIPROC_DIR, exist_ok=True)
+    for name in os.listdir(PROMETHEUS_MULTIPROC_DIR):
+        if name.endswith('.db'):
+            os.remove(os.path.join(PROMETHEUS_MULTIPROC_DIR, name))
+
 # Health check - enable for deployment monitoring
 def when_ready(server):
     """Called just after the server is started"""
@@ -47,6 +55,12 @@ def worker_int(worker):
     """Called just after a worker has been exited on SIGINT or SIGQUIT"""
     worker.log.info("Worker received INT or QUIT signal")
 
+def child_exit(server, worker):
+    """Called just after a worker has exited; retire its live metric samples"""
+    if PROMETHEUS_MULTIPROC_DIR:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
+
 def on_exit(server):
     """Called just before exiting gunicorn"""
     server.log.info("Shutting down: Master")
\ No newline at end of file
@@ -0,0 +1,175 @@
+"""
+Buffered Activity Log Writer
+Collects ActivityLog and AssessmentActivityLog rows in memory and writes them with
+bulk inserts from a background flusher thread, so logging adds no commit to the
+request. The buffer is flushed when it reaches LOG_BUFFER_MAX_EVENTS, every
+LOG_FLUSH_INTERVAL_SECONDS, after each request, and at process exit. ActivityLog
+rows also update the activity counters in the same transaction.
+"""
+import atexit
+import os
+import threading
+import time
+from app import app, db
+from models import ActivityLog, AssessmentActivityLog
+from activity_counters import count_logged_rows, count_logged_assessment_rows
+from workflow_state import apply_workflow_events
+
+LOG_BUFFER_MAX_EVENTS = int(os.environ.get('LOG_BUFFER_MAX_EVENTS', 100))
+LOG_FLUSH_INTERVAL_SECONDS = float(os.environ.get('LOG_FLUSH_INTERVAL_SECONDS', 1.0))
+_MAX_PENDING_EVENTS = 10000  # Cap on rows kept for retry while the database is unavailable
+DEDUP_WINDOW_SECONDS = 5
+
+_buffer = []  # (table, row dict) in arrival order
+_buffer_lock = threading.Lock()
+_flush_lock = threading.Lock()  # One flush at a time
+_wake = threading.Event()
+_flusher = {'thread': None, 'pid': None}
+_recent_events = {}  # dedup key -> monotonic time last seen
+_recent_lock = threading.Lock()
+
+
+def buffer_log_row(table, row):
+    """
+    Queue a log row for the next bulk insert
+
+    Args:
+        table: ActivityLog.__table__ or AssessmentActivityLog.__table__
+        row: Dictionary of column values (timestamp included, set at event time)
+    """
+    _ensure_flusher()
+    with _buffer_lock:
+        _buffer.append((table, row))
+        full = len(_buffer) >= LOG_BUFFER_MAX_EVENTS
+    if full:
+        _wake.set()
+
+
+def is_duplicate_event(key, window=DEDUP_WINDOW_SECONDS):
+    """True if the same event key was seen within the dedup window; records the key otherwise"""
+    now = time.monotonic()
+    with _recent_lock:
+        last_seen = _recent_events.get(key)
+        if last_seen is not None and now - last_seen < window:
+            return True
+        _recent_events[key] = now
+        if len(_recent_events) > 1000:
+            for stale_key in [k for k, seen in _recent_events.items() if now - seen >= window]:
+                del _recent_events[stale_key]
+    return False
+
+
+def insert_log_rows(connection, table, rows):
+    """
+    Bulk insert log rows for one table and update its counters and workflow states
+
+    Used by the flusher, and directly by callers whose audit rows must commit or roll
+    back together with the change they record.
+
+    Args:
+        connection: Connection with an open transaction (e.g. db.session.connection())
+        table: ActivityLog.__table__ or AssessmentActivityLog.__table__
+        rows: Column dictionaries, oldest first
+    """
+    if not rows:
+        return
+    connection.execute(table.insert(), rows)
+    if table is ACTIVITY_LOG_TABLE:
+        count_logged_rows(connection, rows)
+    elif table is ASSESSMENT_ACTIVITY_LOG_TABLE:
+        count_logged_assessment_rows(connection, rows)
+        apply_workflow_events(connection, rows)
+
+
+def _insert_rows(connection, batch):
+    """Bulk insert a batch grouped by table (executemany per table) and update the counters for it"""
+    by_table = {}
+    for table, row in batch:
+        by_table.setdefault(table, []).append(row)
+    for table, rows in by_table.items():
+        insert_log_rows(connection, table, rows)
+
+
+def flush_log_buffer():
+    """
+    Write every buffered log row to the database
+
+    Returns:
+        Number of rows written
+    """
+    with _flush_lock:
+        with _buffer_lock:
+            batch = _buffer[:]
+            del _buffer[:]
+        if not batch:
+            return 0
+
+        with app.app_context():
+            try:
+                with db.engine.begin() as connection:
+                    _insert_rows(connection, batch)
+                return len(batch)
+            except Exception as e:
+                print(f"Error flushing activity logs in bulk: {e}")
+
+            # Retry row by row so one bad row (e.g. a deleted user) does not hold back the rest
+            written = 0
+            retry = []
+            for item in batch:
+                try:
+                    with db.engine.begin() as connection:
+                        _insert_rows(connection, [item])
+                    written += 1
+                except Exception as e:
+                    if 'foreign key' in str(e).lower() or 'integrity' in type(e).__name__.lower():
+                        print(f"Dropping activity log row that cannot be stored: {e}")
+                    else:
+                        retry.append(item)
+
+            if retry:
+                with _buffer_lock:
+                    _buffer[:0] = retry[-_MAX_PENDING_EVENTS:]
+            return written
+
+
+def _flusher_loop():
+    while True:
+        _wake.wait(LOG_FLUSH_INTERVAL_SECONDS)
+        _wake.clear()
+        try:
+            flush_log_buffer()
+        except Exception as e:
+            print(f"Activity log flusher error: {e}")
+
+
+def _ensure_flusher():
+    """Start the flusher thread once per process (again after a fork)"""
+    if _flusher['pid'] == os.getpid() and _flusher['thread'] is not None:
+        return
+    with _buffer_lock:
+        if _flusher['pid'] == os.getpid() and _flusher['thread'] is not None:
+            return
+        thread = threading.Thread(target=_flusher_loop, name='activity-log-flusher', daemon=True)
+        thread.start()
+        _flusher['thread'] = thread
+        _flusher['pid'] = os.getpid()
+
+
+@app.teardown_request
+def _flush_after_request(exception=None):
+    """Hand the request's log rows to the flusher without waiting for the write"""
+    if _buffer:
+        _wake.set()
+
+
+@atexit.register
+def _flush_at_exit():
+    """Write whatever is still buffered on normal shutdown"""
+    try:
+        flush_log_buffer()
+    except Exception as e:
+        print(f"Error flushing activity logs at exit: {e}")
+
+
+ACTIVITY_LOG_TABLE = ActivityLog.__table__
+ASSESSMENT_ACTIVITY_LOG_TABLE = AssessmentActivityLog.__table__
@@ -0,0 +1,125 @@
+"""
+Streaming Log Export
+Streams ActivityLog and AssessmentActivityLog rows as CSV, newest first, reading the
+table in keyset-paginated chunks on (timestamp, id) so memory stays bounded no matter
+how large the audit history is
+"""
+import csv
+import io
+from datetime import datetime
+from flask import Response, stream_with_context
+from sqlalchemy.orm import joinedload
+from models import ActivityLog, AssessmentActivityLog
+from log_pagination import older_than
+
+EXPORT_CHUNK_SIZE = 1000
+
+
+def iter_keyset_chunks(query, model, chunk_size=EXPORT_CHUNK_SIZE, options=()):
+    """
+    Yield lists of rows from a filtered query, newest first, one keyset page at a time
+
+    Args:
+        query: Filtered query on model (any ordering is replaced)
+        model: Model with timestamp and id columns
+        chunk_size: Rows per page
+        options: Loader options applied to every page (e.g. joinedload of users)
+
+    Yields:
+        Lists of at most chunk_size rows
+    """
+    ordered = query.order_by(None).options(*options).order_by(model.timestamp.desc(), model.id.desc())
+    last_timestamp, last_id = None, None
+
+    while True:
+        page_query = ordered
+        if last_id is not None:
+            page_query = older_than(page_query, model, last_timestamp, last_id)
+        rows = page_query.limit(chunk_size).all()
+        if not rows:
+            return
+
+        yield rows
+        last_timestamp, last_id = rows[-1].timestamp, rows[-1].id
+        if len(rows) < chunk_size:
+            return
+
+
+def iter_csv(query, model, header, row_builder, options=(), chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield CSV text: the header line, then one block of lines per keyset chunk"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    writer.writerow(header)
+    yield buffer.getvalue()
+
+    for rows in iter_keyset_chunks(query, model, chunk_size, options):
+        buffer.seek(0)
+        buffer.truncate(0)
+        for row in rows:
+            writer.writerow(row_builder(row))
+        yield buffer.getvalue()
+
+
+def csv_stream_response(chunks, filename_prefix):
+    """Wrap a CSV text generator in a streaming download response"""
+    response = Response(stream_with_context(chunks), mimetype='text/csv')
+    response.headers['Content-Disposition'] = (
+        f'attachment; filename={filename_prefix}_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
+    )
+    return response
+
+
+def _user_name(user):
+    return user.name if user else ''
+
+
+ACTIVITY_LOG_HEADER = ['Timestamp', 'User Name', 'User Role', 'Action', 'Description', 'IP Address', 'User Agent']
+
+
+def _activity_log_row(log):
+    return [
+        log.timestamp.strftime('%Y-%m-%d %H:%M:%S') if log.timestamp else '',
+        _user_name(log.user),
+        log.user.role if log.user else '',
+        log.action,
+        log.description,
+        log.ip_address or '',
+        log.user_agent or ''
+    ]
+
+
+ASSESSMENT_ACTIVITY_LOG_HEADER = ['Timestamp', 'Event Type', 'Event Category', 'Officer', 'Assessment Project',
+                                  'Reviewer', 'Performed By', 'Status', 'Description', 'IP Address']
+
+
+def _assessment_activity_log_row(log):
+    return [
+        log.timestamp.strftime('%Y-%m-%d %H:%M:%S') if log.timestamp else '',
+        log.event_type,
+        log.event_category,
+        _user_name(log.officer),
+        log.period.name if log.period else '',
+        _user_name(log.reviewer),
+        _user_name(log.actor),
+        log.event_status or '',
+        log.description,
+        log.ip_address or ''
+    ]
+
+
+def stream_activity_logs_csv(query):
+    """Streaming CSV download of a filtered ActivityLog query"""
+    chunks = iter_csv(query, ActivityLog, ACTIVITY_LOG_HEADER, _activity_log_row,
+                      options=(joinedload(ActivityLog.user),))
+    return csv_stream_response(chunks, 'activity_logs')
+
+
+def stream_assessment_activity_logs_csv(query):
+    """Streaming CSV download of a filtered AssessmentActivityLog query"""
+    chunks = iter_csv(query, AssessmentActivityLog, ASSESSMENT_ACTIVITY_LOG_HEADER, _assessment_activity_log_row,
+                      options=(joinedload(AssessmentActivityLog.officer),
+                               joinedload(AssessmentActivityLog.reviewer),
+                               joinedload(AssessmentActivityLog.actor),
+                               joinedload(AssessmentActivityLog.period)))
+    return csv_stream_response(chunks, 'assessment_activity_logs')
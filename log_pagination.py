@@ -0,0 +1,101 @@
+"""
+Keyset Pagination for Log Tables
+Pages through ActivityLog and AssessmentActivityLog newest first using a cursor on
+(timestamp, id) instead of OFFSET, so every page is an index range scan of per_page
+rows and no COUNT(*) of the filtered history is needed
+"""
+from datetime import datetime
+from sqlalchemy import and_, or_
+
+_CURSOR_TIME_FORMAT = '%Y%m%d%H%M%S%f'
+
+
+def encode_cursor(row):
+    """Cursor for a log row: '<timestamp>-<id>'"""
+    return f"{row.timestamp.strftime(_CURSOR_TIME_FORMAT)}-{row.id}"
+
+
+def decode_cursor(cursor):
+    """(timestamp, id) from a cursor, None if the cursor is missing or malformed"""
+    try:
+        timestamp, row_id = cursor.split('-', 1)
+        return datetime.strptime(timestamp, _CURSOR_TIME_FORMAT), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def older_than(query, model, timestamp, row_id):
+    """Restrict a query to rows after (timestamp, id) in newest-first order"""
+    return query.filter(
+        model.timestamp <= timestamp,
+        or_(model.timestamp < timestamp, and_(model.timestamp == timestamp, model.id < row_id))
+    )
+
+
+def newer_than(query, model, timestamp, row_id):
+    """Restrict a query to rows before (timestamp, id) in newest-first order"""
+    return query.filter(
+        model.timestamp >= timestamp,
+        or_(model.timestamp > timestamp, and_(model.timestamp == timestamp, model.id > row_id))
+    )
+
+
+class KeysetPage:
+    """One page of log rows with cursors to the neighbouring pages"""
+
+    def __init__(self, items, next_cursor=None, prev_cursor=None):
+        self.items = items
+        self.next_cursor = next_cursor  # Older rows
+        self.prev_cursor = prev_cursor  # Newer rows
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_page(query, model, after=None, before=None, per_page=50, options=()):
+    """
+    Fetch one newest-first page of a filtered log query
+
+    Args:
+        query: Filtered query on model (any ordering is replaced)
+        model: Model with timestamp and id columns
+        after: Cursor of the last row of the previous page (page towards older rows)
+        before: Cursor of the first row of the next page (page towards newer rows)
+        per_page: Rows per page
+        options: Loader options for the page (e.g. joinedload of users)
+
+    Returns:
+        KeysetPage
+    """
+    query = query.order_by(None).options(*options)
+    after_key = decode_cursor(after)
+    before_key = decode_cursor(before) if after_key is None else None
+
+    if before_key is not None:
+        # Walk towards newer rows in ascending order, then flip back to newest first
+        rows = newer_than(query, model, *before_key).order_by(
+            model.timestamp.asc(), model.id.asc()
+        ).limit(per_page + 1).all()
+        has_newer = len(rows) > per_page
+        items = list(reversed(rows[:per_page]))
+        has_older = True
+    else:
+        if after_key is not None:
+            query = older_than(query, model, *after_key)
+        rows = query.order_by(model.timestamp.desc(), model.id.desc()).limit(per_page + 1).all()
+        has_older = len(rows) > per_page
+        items = rows[:per_page]
+        has_newer = after_key is not None
+
+    if not items:
+        return KeysetPage(items)
+    return KeysetPage(
+        items,
+        next_cursor=encode_cursor(items[-1]) if has_older else None,
+        prev_cursor=encode_cursor(items[0]) if has_newer else None
+    )
@@ -0,0 +1,128 @@
+"""
+Prometheus Metrics
+Request latency, per-request database queries and time, OpenAI call latency, tokens and
+failures, PDF render durations and email send outcomes, exposed in the Prometheus text
+format on /metrics.
+
+Under gunicorn, set PROMETHEUS_MULTIPROC_DIR to a writable directory. Each worker then
+writes its samples to memory-mapped files there and /metrics merges all workers, so
+any worker can answer a scrape (gunicorn.conf.py empties the directory at startup and
+retires the files of exited workers). Without it, metrics are kept in process.
+"""
+import os
+import time
+from flask import g, request, Response
+from prometheus_client import CollectorRegistry, Counter, Histogram, REGISTRY, multiprocess
+from prometheus_client.exposition import choose_encoder
+from app import app
+
+REQUEST_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+AI_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+HTTP_REQUESTS = Counter(
+    'http_requests_total', 'HTTP requests handled', ['method', 'endpoint', 'status'])
+HTTP_REQUEST_SECONDS = Histogram(
+    'http_request_duration_seconds', 'Time to handle an HTTP request', ['method', 'endpoint'],
+    buckets=REQUEST_BUCKETS)
+HTTP_REQUEST_DB_QUERIES = Histogram(
+    'http_request_db_queries', 'SQL statements issued per HTTP request', ['endpoint'],
+    buckets=QUERY_COUNT_BUCKETS)
+HTTP_REQUEST_DB_SECONDS = Histogram(
+    'http_request_db_seconds', 'Time spent in SQL statements per HTTP request', ['endpoint'],
+    buckets=REQUEST_BUCKETS)
+
+OPENAI_REQUEST_SECONDS = Histogram(
+    'openai_request_duration_seconds', 'OpenAI API call latency', ['source', 'model'],
+    buckets=AI_BUCKETS)
+OPENAI_TOKENS = Counter(
+    'openai_tokens_total', 'OpenAI tokens used', ['source', 'model', 'kind'])
+OPENAI_FAILURES = Counter(
+    'openai_request_failures_total', 'OpenAI API calls that raised', ['source', 'model', 'error'])
+
+PDF_RENDER_SECONDS = Histogram(
+    'pdf_render_duration_seconds', 'Time to render a PDF report', ['report'],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30))
+
+EMAILS_SENT = Counter(
+    'emails_sent_total', 'Email send attempts by outcome (sent, failed, not_configured)', ['outcome'])
+
+
+def observe_openai_call(source, create, **kwargs):
+    """
+    Make an OpenAI call and record its latency, token usage or failure
+
+    Args:
+        source: Module or feature making the call (metric label)
+        create: The client method to call, e.g. openai_client.chat.completions.create
+        **kwargs: Arguments for create
+
+    Returns:
+        The OpenAI response (exceptions are re-raised after being counted)
+    """
+    model = kwargs.get('model', 'unknown')
+    started = time.perf_counter()
+    try:
+        response = create(**kwargs)
+    except Exception as e:
+        OPENAI_FAILURES.labels(source, model, type(e).__name__).inc()
+        raise
+    finally:
+        OPENAI_REQUEST_SECONDS.labels(source, model).observe(time.perf_counter() - started)
+
+    usage = getattr(response, 'usage', None)
+    if usage is not None:
+        OPENAI_TOKENS.labels(source, model, 'prompt').inc(usage.prompt_tokens or 0)
+        OPENAI_TOKENS.labels(source, model, 'completion').inc(usage.completion_tokens or 0)
+    return response
+
+
+def count_email_results(results):
+    """Count send_messages results (key -> None or exception) by outcome"""
+    failed = sum(1 for error in results.values() if error is not None)
+    if failed:
+        EMAILS_SENT.labels('failed').inc(failed)
+    if len(results) > failed:
+        EMAILS_SENT.labels('sent').inc(len(results) - failed)
+
+
+def render_metrics():
+    """Current metrics in the Prometheus text format, merged across workers when multiprocess"""
+    registry = REGISTRY
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    encoder, content_type = choose_encoder(request.headers.get('Accept'))
+    return Response(encoder(registry), content_type=content_type)
+
+
+@app.before_request
+def _start_request_timer():
+    g._metrics_started = time.perf_counter()
+
+
+@app.after_request
+def _note_response_status(response):
+    g._metrics_status = response.status_code
+    return response
+
+
+@app.teardown_request
+def _observe_request(exception=None):
+    """Record the request once the deferred commit and every after_request hook have run"""
+    started = g.pop('_metrics_started', None)
+    if started is None or request.endpoint == 'static':
+        return
+    try:
+        from unit_of_work import request_db_stats
+
+        endpoint = request.endpoint or 'unmatched'
+        status = 500 if exception is not None else g.get('_metrics_status', 500)
+        db_stats = request_db_stats()
+
+        HTTP_REQUESTS.labels(request.method, endpoint, str(status)).inc()
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint).observe(time.perf_counter() - started)
+        HTTP_REQUEST_DB_QUERIES.labels(endpoint).observe(db_stats['queries'])
+        HTTP_REQUEST_DB_SECONDS.labels(endpoint).observe(db_stats['seconds'])
+    except Exception as e:
+        print(f"Error recording request metrics: {e}")
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Schema Index Migration
+Adds the composite indexes declared in models.py (assignment, response, activity log
+and AI cache hot paths) to existing PostgreSQL and SQLite databases, and reports which indexes the
+main routes' queries actually use.
+
+New databases get these indexes from db.create_all(); run this once against databases
+created before they were declared:
+
+    python migrate_indexes.py            # apply
+    python migrate_indexes.py dry-run    # show what would change
+    python migrate_indexes.py explain    # report index usage of hot route queries
+"""
+import re
+import sys
+from sqlalchemy import inspect, text, func
+from app import app, db
+from models import AssessmentAssignment, AssessmentResponse, ActivityLog, AssessmentActivityLog, AssessmentPeriod, AIAnalysisCache
+
+# Models whose declared indexes this migration manages
+INDEXED_MODELS = [AssessmentAssignment, AssessmentResponse, ActivityLog, AssessmentActivityLog, AIAnalysisCache]
+
+
+def _declared_indexes():
+    """Named indexes declared in __table_args__ of the managed models"""
+    indexes = []
+    for model in INDEXED_MODELS:
+        for index in sorted(model.__table__.indexes, key=lambda i: i.name):
+            if index.name:
+                indexes.append(index)
+    return indexes
+
+
+def _is_covered(index, existing_indexes):
+    """True if an index with the same name, or the same columns (and uniqueness), already exists"""
+    columns = [c.name for c in index.columns]
+    for existing in existing_indexes:
+        if existing['name'] == index.name:
+            return True
+        if existing['column_names'] == columns and (existing.get('unique') or not index.unique):
+            return True
+    return False
+
+
+def _create_index_sql(index, dialect_name):
+    """CREATE INDEX statement; CONCURRENTLY on PostgreSQL so writes are not blocked"""
+    columns = ', '.join(f'"{c.name}"' for c in index.columns)
+    unique = 'UNIQUE ' if index.unique else ''
+    concurrently = 'CONCURRENTLY ' if dialect_name == 'postgresql' else ''
+    return f'CREATE {unique}INDEX {concurrently}IF NOT EXISTS {index.name} ON "{index.table.name}" ({columns})'
+
+
+def count_duplicate_responses(connection):
+    """Count responses that would violate the one-response-per-question constraint"""
+    return connection.execute(text(
+        "SELECT COUNT(*) FROM assessment_response WHERE id NOT IN ("
+        "SELECT MIN(id) FROM assessment_response GROUP BY assessment_assignment_id, question_id)"
+    )).scalar() or 0
+
+
+def remove_duplicate_responses(connection):
+    """Keep the first response per (assignment, question) - the one every reader already shows"""
+    result = connection.execute(text(
+        "DELETE FROM assessment_response WHERE id NOT IN ("
+        "SELECT MIN(id) FROM assessment_response GROUP BY assessment_assignment_id, question_id)"
+    ))
+    return result.rowcount
+
+
+def plan_index_migration(engine):
+    """Return the declared indexes missing from the database"""
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    missing = []
+    for index in _declared_indexes():
+        if index.table.name not in existing_tables:
+            continue  # db.create_all() will create the table with its indexes
+        if not _is_covered(index, inspector.get_indexes(index.table.name)):
+            missing.append(index)
+    return missing
+
+
+def apply_index_migration(engine, dry_run=False):
+    """
+    Create missing indexes on an existing database
+
+    Args:
+        engine: SQLAlchemy engine for the target database
+        dry_run: Only report what would be done
+
+    Returns:
+        Dictionary with created index names and removed duplicate responses
+    """
+    missing = plan_index_migration(engine)
+    result = {'created': [], 'duplicates_removed': 0, 'dry_run': dry_run}
+
+    needs_unique_response = any(index.name == 'uq_response_assignment_question' for index in missing)
+    if needs_unique_response:
+        with engine.begin() as connection:
+            if dry_run:
+                result['duplicates_removed'] = count_duplicate_responses(connection)
+            else:
+                result['duplicates_removed'] = remove_duplicate_responses(connection)
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as connection:
+        for index in missing:
+            statement = _create_index_sql(index, engine.dialect.name)
+            print(f"{'Would run' if dry_run else 'Running'}: {statement}")
+            if not dry_run:
+                connection.execute(text(statement))
+            result['created'].append(index.name)
+
+    return result
+
+
+def _hot_route_queries(period_id, officer_id, reviewer_id):
+    """Representative queries issued by the main routes"""
+    return {
+        'officer_reviews / matrix exports: assignments for officer': AssessmentAssignment.query.filter_by(
+            officer_id=officer_id, period_id=period_id),
+        'officer_reviews / matrix exports: responses for assignments': AssessmentResponse.query.filter(
+            AssessmentResponse.assessment_assignment_id.in_([1, 2, 3])),
+        'evaluate / edit_assessment_new: response for question': AssessmentResponse.query.filter_by(
+            assessment_assignment_id=1, question_id=1),
+        'my_tasks / navigation badges: reviewer tasks': AssessmentAssignment.query.filter_by(
+            period_id=period_id, reviewer_id=reviewer_id, is_completed=False),
+        'pending_approvals / admin badge: awaiting approval': AssessmentAssignment.query.filter_by(
+            is_submitted=True, is_admin_approved=False),
+        'admin_activity_logs: latest entries': ActivityLog.query.order_by(ActivityLog.timestamp.desc()).limit(50),
+        'user_activity: entries for user': ActivityLog.query.filter_by(user_id=reviewer_id).order_by(
+            ActivityLog.timestamp.desc()).limit(50),
+        'assessment timeline: events for officer and period': AssessmentActivityLog.query.filter_by(
+            officer_id=officer_id, period_id=period_id).order_by(AssessmentActivityLog.timestamp.asc()),
+    }
+
+
+def explain_hot_queries(engine):
+    """
+    Run EXPLAIN for the main routes' queries and report which indexes each one uses
+
+    Returns:
+        Dictionary mapping query label to {'indexes': [...], 'full_scan': bool, 'plan': str}
+    """
+    period_id = db.session.query(func.max(AssessmentPeriod.id)).scalar() or 1
+    officer_id, reviewer_id = db.session.query(
+        AssessmentAssignment.officer_id, AssessmentAssignment.reviewer_id
+    ).filter(AssessmentAssignment.officer_id != AssessmentAssignment.reviewer_id).first() or (1, 1)
+
+    inspector = inspect(engine)
+    known_indexes = set()
+    for table_name in inspector.get_table_names():
+        known_indexes.update(index['name'] for index in inspector.get_indexes(table_name) if index['name'])
+
+    explain_prefix = 'EXPLAIN QUERY PLAN ' if engine.dialect.name == 'sqlite' else 'EXPLAIN '
+    report = {}
+    with engine.connect() as connection:
+        for label, query in _hot_route_queries(period_id, officer_id, reviewer_id).items():
+            compiled = query.statement.compile(dialect=engine.dialect, compile_kwargs={'literal_binds': True})
+            rows = connection.execute(text(explain_prefix + str(compiled))).fetchall()
+            plan = '\n'.join(' '.join(str(value) for value in row) for row in rows)
+            used = sorted(name for name in known_indexes if re.search(rf'\b{re.escape(name)}\b', plan))
+            full_scan = any('Seq Scan' in line or (re.search(r'\bSCAN\b', line) and 'USING' not in line)
+                            for line in plan.split('\n'))
+            report[label] = {'indexes': used, 'full_scan': full_scan, 'plan': plan}
+    return report
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else 'apply'
+
+    with app.app_context():
+        engine = db.engine
+        print(f"🔍 Database dialect: {engine.dialect.name}")
+
+        if command == 'explain':
+            for label, info in explain_hot_queries(engine).items():
+                status = '⚠️  full scan' if info['full_scan'] else '✅'
+                print(f"\n{status} {label}")
+                print(f"   indexes used: {', '.join(info['indexes']) or 'none'}")
+            return
+
+        result = apply_index_migration(engine, dry_run=(command == 'dry-run'))
+        if result['duplicates_removed']:
+            verb = 'Would remove' if result['dry_run'] else 'Removed'
+            print(f"🧹 {verb} {result['duplicates_removed']} duplicate assessment responses")
+        if result['created']:
+            verb = 'Would create' if result['dry_run'] else 'Created'
+            print(f"✅ {verb} {len(result['created'])} indexes: {', '.join(result['created'])}")
+        else:
+            print("✅ All indexes already present")
+
+
+if __name__ == "__main__":
+    main()
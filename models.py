@@ -188,13 +188,31 @@ class AssessmentPeriod(db.Model):
         today = datetime.now().date()
         return self.start_date <= today <= self.end_date and self.is_active
     
+    def set_completion_counts(self, total, completed):
+        """Store assignment counts loaded in bulk (see period_progress.load_completion_rates)"""
+        self._completion_counts = (total, completed)
+
+    def _assignment_counts(self):
+        """(total, completed) assignment counts, from the bulk-loaded values when available"""
+        counts = getattr(self, '_completion_counts', None)
+        if counts is None:
+            counts = db.session.query(
+                db.func.count(AssessmentAssignment.id),
+                db.func.sum(db.case((AssessmentAssignment.is_completed == True, 1), else_=0))
+            ).filter(AssessmentAssignment.period_id == self.id).one()
+        return counts[0], counts[1] or 0
+
     @property
     def completion_rate(self):
-        total_assignments = self.assignments.count()
+        total_assignments, completed = self._assignment_counts()
         if total_assignments == 0:
             return 0
-        completed = self.assignments.filter_by(is_completed=True).count()
         return round((completed / total_assignments) * 100, 1)
+
+    @property
+    def pending_assignment_count(self):
+        total_assignments, completed = self._assignment_counts()
+        return total_assignments - completed
     
     def get_reviewees(self):
         """Get list of selected reviewees for this period"""
@@ -264,6 +282,12 @@ class AssessmentAssignment(db.Model):
     assessment_id = db.Column(db.Integer, db.ForeignKey('assessment.id'))
     assessment = db.relationship('Assessment', backref='assignment')
     
+    __table_args__ = (
+        db.Index('idx_assignment_period_officer', 'period_id', 'officer_id'),
+        db.Index('idx_assignment_period_reviewer', 'period_id', 'reviewer_id'),
+        db.Index('idx_assignment_submitted_approved', 'is_submitted', 'is_admin_approved'),
+    )
+    
     @property
     def is_self_assessment(self):
         """Check if this is a self-assessment"""
@@ -479,13 +503,66 @@ class ActivityLog(db.Model):
     # Relationships
     user = db.relationship('User', backref='activity_logs')
     
+    __table_args__ = (
+        db.Index('idx_activity_log_timestamp', 'timestamp'),
+        db.Index('idx_activity_log_user_timestamp', 'user_id', 'timestamp'),
+    )
+    
     def __repr__(self):
         return f'<ActivityLog {self.user.name}: {self.action} at {self.timestamp}>'
 
+class ActivityCounter(db.Model):
+    """Number of ActivityLog rows per UTC day and action, maintained as logs are written"""
+    __tablename__ = 'activity_counter'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    action = db.Column(db.String(100), nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (db.UniqueConstraint('day', 'action', name='unique_activity_counter_day_action'),)
+
+    def __repr__(self):
+        return f'<ActivityCounter {self.day} {self.action}: {self.event_count}>'
+
+class ActivityDailyUser(db.Model):
+    """Users with at least one ActivityLog row on a UTC day"""
+    __tablename__ = 'activity_daily_user'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    __table_args__ = (db.UniqueConstraint('day', 'user_id', name='unique_activity_daily_user'),)
+
+    def __repr__(self):
+        return f'<ActivityDailyUser {self.day} User:{self.user_id}>'
+
+class AssessmentActivityRollup(db.Model):
+    """Number of AssessmentActivityLog rows per UTC day, period, event type and category"""
+    __tablename__ = 'assessment_activity_rollup'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    period_id = db.Column(db.Integer, db.ForeignKey('assessment_period.id'), nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    event_category = db.Column(db.String(30), nullable=False)
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('period_id', 'day', 'event_type', 'event_category',
+                            name='unique_assessment_activity_rollup'),
+        db.Index('idx_assessment_activity_rollup_day', 'day'),
+    )
+
+    def __repr__(self):
+        return f'<AssessmentActivityRollup {self.day} Period:{self.period_id} {self.event_type}: {self.event_count}>'
+
 class AIAnalysisCache(db.Model):
     """Cache AI analysis results to avoid regenerating them"""
     __tablename__ = 'ai_analysis_cache'
-    __table_args__ = {'extend_existing': True}
+    __table_args__ = (
+        db.Index('idx_ai_cache_content_hash', 'content_hash'),
+        db.Index('idx_ai_cache_officer_period', 'officer_id', 'period_id'),
+        {'extend_existing': True}
+    )
     id = db.Column(db.Integer, primary_key=True)
     officer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     period_id = db.Column(db.Integer, db.ForeignKey('assessment_period.id'), nullable=False)
@@ -526,7 +603,19 @@ class AIAnalysisCache(db.Model):
                 'major_themes': json.loads(self.major_themes) if self.major_themes else [],
                 'overall_sentiment': self.overall_sentiment
             }
-    
+
+    def set_analysis_data(self, data):
+        """Store an analysis result dictionary in the columns for this analysis type"""
+        import json
+        if self.analysis_type == 'question':
+            self.summary = data.get('summary')
+            self.themes = json.dumps(data.get('themes') or [])
+            self.sentiment = data.get('sentiment') or data.get('average_sentiment')
+        else:  # overall
+            self.executive_summary = data.get('executive_summary')
+            self.major_themes = json.dumps(data.get('major_themes') or [])
+            self.overall_sentiment = data.get('overall_sentiment')
+
     def __repr__(self):
         return f'<AIAnalysisCache {self.analysis_type} for Officer:{self.officer_id} Period:{self.period_id}>'
 
@@ -583,6 +672,31 @@ class AssessmentQuestion(db.Model):
     def __repr__(self):
         return f'<AssessmentQuestion {self.question_text[:50]}>'
 
+class CanonicalQuestion(db.Model):
+    """Canonical key shared by equivalent assessment questions across forms"""
+    __tablename__ = 'canonical_question'
+    id = db.Column(db.Integer, primary_key=True)
+    text_hash = db.Column(db.String(64), nullable=False, unique=True)  # SHA-256 of question_text
+    question_text = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<CanonicalQuestion {self.question_text[:50]}>'
+
+class QuestionEquivalence(db.Model):
+    """Maps every assessment question to its canonical question key"""
+    __tablename__ = 'question_equivalence'
+    question_id = db.Column(db.Integer, db.ForeignKey('assessment_question.id'), primary_key=True)
+    canonical_id = db.Column(db.Integer, db.ForeignKey('canonical_question.id'), nullable=False, index=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    question = db.relationship('AssessmentQuestion', backref=db.backref('equivalence', uselist=False, cascade='all, delete-orphan'))
+    canonical = db.relationship('CanonicalQuestion', backref=db.backref('equivalences', lazy='dynamic'))
+    
+    def __repr__(self):
+        return f'<QuestionEquivalence Question:{self.question_id} Canonical:{self.canonical_id}>'
+
 class PeriodFormAssignment(db.Model):
     """Links assessment periods to specific assessment forms with usage type"""
     id = db.Column(db.Integer, primary_key=True)
@@ -614,6 +728,11 @@ class AssessmentResponse(db.Model):
     # Relationships
     assignment = db.relationship('AssessmentAssignment', backref='assessment_responses')
     
+    # One response per question per assignment
+    __table_args__ = (
+        db.Index('uq_response_assignment_question', 'assessment_assignment_id', 'question_id', unique=True),
+    )
+    
     def get_response_data(self):
         """Get response data as appropriate type"""
         if self.response_json:
@@ -678,7 +797,7 @@ class AIGeneratedReport(db.Model):
     report_title = db.Column(db.String(200))
     summary_text = db.Column(db.Text)  # AI-generated summary text
     report_data = db.Column(db.Text)  # Complete AI report data as JSON
-    pdf_data = db.Column(db.LargeBinary)  # Stored PDF file
+    pdf_data = db.deferred(db.Column(db.LargeBinary))  # Legacy inline PDF; moved to report_blob by report_blobs.ensure_report_blobs
     pdf_filename = db.Column(db.String(200))
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -700,6 +819,128 @@ class AIGeneratedReport(db.Model):
     def __repr__(self):
         return f'<AIGeneratedReport Officer:{self.officer_id} Period:{self.period_id}>'
 
+class ReportBlob(db.Model):
+    """Content-addressed file content (report_blobs); identical files are stored once"""
+    __tablename__ = 'report_blob'
+    sha256 = db.Column(db.String(64), primary_key=True)  # Hex SHA-256 of data, also the download ETag
+    size = db.Column(db.Integer, nullable=False)
+    content_type = db.Column(db.String(100), nullable=False, default='application/pdf')
+    data = db.deferred(db.Column(db.LargeBinary, nullable=False))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f'<ReportBlob {self.sha256[:12]} {self.size} bytes>'
+
+class AIReportPdf(db.Model):
+    """Links an AIGeneratedReport to the ReportBlob holding its PDF"""
+    __tablename__ = 'ai_report_pdf'
+    report_id = db.Column(db.Integer, db.ForeignKey('ai_generated_report.id', ondelete='CASCADE'), primary_key=True)
+    blob_sha256 = db.Column(db.String(64), db.ForeignKey('report_blob.sha256'), nullable=False, index=True)
+    stored_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    report = db.relationship('AIGeneratedReport', backref=db.backref('pdf_file', uselist=False, passive_deletes=True))
+    blob = db.relationship('ReportBlob')
+
+    def __repr__(self):
+        return f'<AIReportPdf Report:{self.report_id} Blob:{self.blob_sha256[:12]}>'
+
+class ReportBatch(db.Model):
+    """Period-wide AI report generation request fanned out into one ReportJob per officer"""
+    id = db.Column(db.Integer, primary_key=True)
+    period_id = db.Column(db.Integer, db.ForeignKey('assessment_period.id'), nullable=False)
+    total_jobs = db.Column(db.Integer, default=0)
+    force = db.Column(db.Boolean, default=False)  # Regenerate even when the input data is unchanged
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relationships
+    period = db.relationship('AssessmentPeriod')
+    creator = db.relationship('User', foreign_keys=[created_by])
+    jobs = db.relationship('ReportJob', backref='batch', lazy='dynamic')
+
+    def __repr__(self):
+        return f'<ReportBatch {self.id} Period:{self.period_id} Jobs:{self.total_jobs}>'
+
+class ReportJob(db.Model):
+    """Persistent background job for AI report generation (processed by report_jobs worker pool)"""
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False, default='ai_report')
+    officer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period_id = db.Column(db.Integer, db.ForeignKey('assessment_period.id'), nullable=False)
+    batch_id = db.Column(db.Integer, db.ForeignKey('report_batch.id'), nullable=True, index=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')  # 'queued', 'running', 'completed', 'skipped', 'failed'
+    phase = db.Column(db.String(30), nullable=True)  # 'matrix', 'llm', 'pdf', 'store'
+    skip_unchanged = db.Column(db.Boolean, default=False)  # Skip if input matches the last report's input hash
+    input_hash = db.Column(db.String(64), nullable=True)
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=3)
+    error_message = db.Column(db.Text, nullable=True)
+    run_after = db.Column(db.DateTime, default=datetime.utcnow)  # Earliest time to (re)try
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    officer = db.relationship('User', foreign_keys=[officer_id])
+    period = db.relationship('AssessmentPeriod')
+    creator = db.relationship('User', foreign_keys=[created_by])
+
+    __table_args__ = (
+        db.Index('idx_report_job_status_run_after', 'status', 'run_after'),
+        db.Index('idx_report_job_officer_period', 'officer_id', 'period_id'),
+    )
+
+    def __repr__(self):
+        return f'<ReportJob {self.id} Officer:{self.officer_id} Period:{self.period_id} Status:{self.status}>'
+
+class EmailOutbox(db.Model):
+    """Outgoing email waiting for the email_outbox dispatcher"""
+    __tablename__ = 'email_outbox'
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False, default='notification')  # 'reminder_digest', 'notification'
+    dedup_key = db.Column(db.String(200), nullable=True)  # e.g. 'reminder:<period>:<reviewer>'; one unsent email per key
+    to_email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(300), nullable=False)
+    text_body = db.Column(db.Text)
+    html_body = db.Column(db.Text)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, default=0)
+    max_attempts = db.Column(db.Integer, default=4)
+    last_error = db.Column(db.Text, nullable=True)
+    send_after = db.Column(db.DateTime, default=datetime.utcnow)  # Earliest time to (re)try
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    claimed_at = db.Column(db.DateTime, nullable=True)
+    sent_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_email_outbox_status_send_after', 'status', 'send_after'),
+        db.Index('idx_email_outbox_dedup_key', 'dedup_key'),
+    )
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.kind} to {self.to_email}: {self.status}>'
+
+class RequestProfile(db.Model):
+    """Sampled call stacks of one profiled request (request_profiler)"""
+    __tablename__ = 'request_profile'
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex, the profile ID
+    endpoint = db.Column(db.String(100), nullable=True)
+    method = db.Column(db.String(10), nullable=False)
+    path = db.Column(db.String(500), nullable=False)
+    status = db.Column(db.Integer, nullable=True)
+    trigger = db.Column(db.String(20), nullable=False)  # 'requested' (admin flag) or 'sampled'
+    duration_ms = db.Column(db.Float, nullable=False)
+    interval_ms = db.Column(db.Float, nullable=False)
+    sample_count = db.Column(db.Integer, nullable=False, default=0)
+    collapsed_stacks = db.Column(db.Text, nullable=False, default='')  # "frame;frame;frame count" per line
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RequestProfile {self.id} {self.method} {self.path}: {self.duration_ms:.0f}ms>'
+
 class AssessmentActivityLog(db.Model):
     """Enhanced activity logging specifically for assessment workflow events"""
     __tablename__ = 'assessment_activity_log'
@@ -735,6 +976,10 @@ class AssessmentActivityLog(db.Model):
     assignment = db.relationship('AssessmentAssignment', backref='activity_logs')
     actor = db.relationship('User', foreign_keys=[actor_id], backref='assessment_activities_performed')
     
+    __table_args__ = (
+        db.Index('idx_assessment_activity_officer_period_timestamp', 'officer_id', 'period_id', 'timestamp'),
+    )
+    
     def get_event_data(self):
         """Get event data as dictionary"""
         if self.event_data:
@@ -750,6 +995,60 @@ class AssessmentActivityLog(db.Model):
     def __repr__(self):
         return f'<AssessmentActivityLog {self.event_type} for Officer:{self.officer_id} Period:{self.period_id}>'
 
+class AssessmentWorkflowState(db.Model):
+    """Current workflow position of one officer's assessment in a period, kept up to date from
+    AssessmentActivityLog events as they are written (workflow_state)"""
+    __tablename__ = 'assessment_workflow_state'
+    id = db.Column(db.Integer, primary_key=True)
+    officer_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    period_id = db.Column(db.Integer, db.ForeignKey('assessment_period.id'), nullable=False)
+    current_stage = db.Column(db.String(40), nullable=False, default='not_started')
+
+    # First time each stage was reached
+    assigned_at = db.Column(db.DateTime, nullable=True)
+    self_draft_saved_at = db.Column(db.DateTime, nullable=True)
+    self_submitted_at = db.Column(db.DateTime, nullable=True)
+    self_approved_at = db.Column(db.DateTime, nullable=True)
+    reviewers_released_at = db.Column(db.DateTime, nullable=True)
+    reviewer_activity_at = db.Column(db.DateTime, nullable=True)  # First reviewer start or submission
+    all_reviewers_completed_at = db.Column(db.DateTime, nullable=True)
+    final_approved_at = db.Column(db.DateTime, nullable=True)
+    results_released_at = db.Column(db.DateTime, nullable=True)
+    acknowledged_at = db.Column(db.DateTime, nullable=True)
+    closed_at = db.Column(db.DateTime, nullable=True)
+
+    seen_events = db.Column(db.Text, nullable=False, default='[]')  # JSON list of stage event types recorded
+    reviewer_status = db.Column(db.Text, nullable=False, default='{}')  # JSON: reviewer ID -> status, events, updated_at
+    event_count = db.Column(db.Integer, nullable=False, default=0)
+    last_event_at = db.Column(db.DateTime, nullable=True)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    officer = db.relationship('User', foreign_keys=[officer_id])
+    period = db.relationship('AssessmentPeriod')
+
+    __table_args__ = (
+        db.UniqueConstraint('officer_id', 'period_id', name='unique_workflow_state_officer_period'),
+        db.Index('idx_workflow_state_period_stage', 'period_id', 'current_stage'),
+    )
+
+    @property
+    def seen_event_types(self):
+        """Set of stage event types recorded so far"""
+        import json
+        return set(json.loads(self.seen_events or '[]'))
+
+    def get_reviewer_status(self):
+        """Reviewer ID -> {'status', 'events', 'updated_at'}"""
+        import json
+        return {int(reviewer_id): status for reviewer_id, status in json.loads(self.reviewer_status or '{}').items()}
+
+    def reviewer_events(self, reviewer_id):
+        """Set of event types recorded for one reviewer"""
+        return set(self.get_reviewer_status().get(reviewer_id, {}).get('events', []))
+
+    def __repr__(self):
+        return f'<AssessmentWorkflowState Officer:{self.officer_id} Period:{self.period_id}: {self.current_stage}>'
+
 # Add relationships for the new association tables
 AssessmentPeriod.selected_reviewees = db.relationship('PeriodReviewee', backref='period', lazy='dynamic', cascade='all, delete-orphan')
 AssessmentPeriod.selected_reviewers = db.relationship('PeriodReviewer', backref='period', lazy='dynamic', cascade='all, delete-orphan')
@@ -0,0 +1,97 @@
+"""
+Period Progress Aggregation
+Builds the per-officer progress breakdown for an assessment period from one query with
+officers and reviewers eager-loaded, and computes completion rates for a whole list of
+periods with one grouped query instead of two COUNTs per period
+"""
+from sqlalchemy import func, case
+from sqlalchemy.orm import joinedload
+from app import db
+from models import AssessmentAssignment
+
+
+def _rate(total, completed):
+    return round((completed / total) * 100, 1) if total else 0
+
+
+def load_completion_rates(periods):
+    """
+    Compute completion rates for several periods in one query
+
+    The counts are stored on each period, so period.completion_rate does not query again.
+
+    Args:
+        periods: AssessmentPeriod objects
+
+    Returns:
+        Dictionary mapping period ID to completion rate
+    """
+    periods = list(periods)
+    if not periods:
+        return {}
+
+    counts = {
+        period_id: (total, completed or 0)
+        for period_id, total, completed in db.session.query(
+            AssessmentAssignment.period_id,
+            func.count(AssessmentAssignment.id),
+            func.sum(case((AssessmentAssignment.is_completed == True, 1), else_=0))
+        ).filter(
+            AssessmentAssignment.period_id.in_([period.id for period in periods])
+        ).group_by(AssessmentAssignment.period_id).all()
+    }
+
+    for period in periods:
+        period.set_completion_counts(*counts.get(period.id, (0, 0)))
+    return {period.id: period.completion_rate for period in periods}
+
+
+def get_period_progress(period):
+    """
+    Per-officer review progress for a period
+
+    Args:
+        period: AssessmentPeriod (its completion counts are filled in as well)
+
+    Returns:
+        Dictionary with assignments (list), officer_progress (officer ID -> officer,
+        total_reviewers, completed_reviews, completion_rate, completed_reviewers and
+        pending_reviewers), total, completed and pending
+    """
+    assignments = AssessmentAssignment.query.options(
+        joinedload(AssessmentAssignment.officer),
+        joinedload(AssessmentAssignment.reviewer)
+    ).filter(AssessmentAssignment.period_id == period.id).order_by(AssessmentAssignment.id).all()
+
+    officer_progress = {}
+    for assignment in assignments:
+        progress = officer_progress.get(assignment.officer_id)
+        if progress is None:
+            progress = officer_progress[assignment.officer_id] = {
+                'officer': assignment.officer,
+                'total_reviewers': 0,
+                'completed_reviews': 0,
+                'pending_reviewers': [],
+                'completed_reviewers': []
+            }
+
+        progress['total_reviewers'] += 1
+        if assignment.is_completed:
+            progress['completed_reviews'] += 1
+            progress['completed_reviewers'].append(assignment.reviewer)
+        else:
+            progress['pending_reviewers'].append(assignment.reviewer)
+
+    for progress in officer_progress.values():
+        progress['completion_rate'] = _rate(progress['total_reviewers'], progress['completed_reviews'])
+
+    completed = sum(progress['completed_reviews'] for progress in officer_progress.values())
+    period.set_completion_counts(len(assignments), completed)
+
+    return {
+        'assignments': assignments,
+        'officer_progress': officer_progress,
+        'total': len(assignments),
+        'completed': completed,
+        'pending': len(assignments) - completed
+    }
@@ -0,0 +1,165 @@
+"""
+Project Workflow
+Advances every AssessmentProject of a period in bulk. The transition conditions that
+AssessmentProject.advance_status checks per project (self-assessment completed, any
+reviewer started, all reviewers completed) are read for the whole period from one
+grouped query over its assignments, each project is walked forward in memory, and
+the results are written with one UPDATE per (from status, to status) pair.
+"""
+from datetime import datetime
+from sqlalchemy import case, func, update
+from app import db
+from models import AssessmentAssignment, AssessmentProject, AssessmentStatus
+
+S = AssessmentStatus
+
+# Status -> (next status, condition, columns set on the way through).
+# Conditions: None always moves, 'admin' needs an admin user, 'reviewee' is the
+# reviewee's own action and never moves in bulk, anything else is a key of the
+# assignment snapshot that must be true.
+TRANSITIONS = {
+    S.PENDING_SELF_ASSESSMENT: (S.SELF_ASSESSMENT_SUBMITTED, 'self_completed', ('self_assessment_submitted_at',)),
+    S.SELF_ASSESSMENT_SUBMITTED: (S.AWAITING_ADMIN_REVIEW, None, ()),
+    S.AWAITING_ADMIN_REVIEW: (S.ADMIN_REVIEW_COMPLETED, 'admin', ('admin_review_completed_at', 'admin_approved_by')),
+    S.ADMIN_REVIEW_COMPLETED: (S.AWAITING_REVIEWER_ASSESSMENTS, None, ('reviewer_assessments_released_at', 'reviewer_tasks_visible')),
+    S.AWAITING_REVIEWER_ASSESSMENTS: (S.REVIEWER_ASSESSMENTS_IN_PROGRESS, 'reviewers_started', ()),
+    S.REVIEWER_ASSESSMENTS_IN_PROGRESS: (S.REVIEWER_ASSESSMENTS_COMPLETED, 'reviewers_completed', ()),
+    S.REVIEWER_ASSESSMENTS_COMPLETED: (S.AWAITING_FINAL_ADMIN_APPROVAL, None, ()),
+    S.AWAITING_FINAL_ADMIN_APPROVAL: (S.ASSESSMENT_APPROVED_BY_ADMIN, 'admin', ('final_approval_at',)),
+    S.ASSESSMENT_APPROVED_BY_ADMIN: (S.RESULTS_RELEASED_TO_REVIEWEE, 'admin', ('results_released_at',)),
+    S.RESULTS_RELEASED_TO_REVIEWEE: (S.REVIEWEE_ACKNOWLEDGED_RESULTS, 'reviewee', ('reviewee_acknowledged_at',)),
+    S.REVIEWEE_ACKNOWLEDGED_RESULTS: (S.ASSESSMENT_CLOSED, None, ()),
+}
+
+NO_ASSIGNMENTS = {'self_completed': False, 'reviewers_started': False, 'reviewers_completed': False}
+
+
+def load_assignment_snapshot(period_id):
+    """
+    Transition conditions for every officer in a period, from one grouped query
+
+    Args:
+        period_id: Assessment period ID
+
+    Returns:
+        Dictionary mapping officer ID to a dictionary with self_completed,
+        reviewers_started and reviewers_completed booleans plus the reviewer_total
+        and reviewer_completed counts
+    """
+    A = AssessmentAssignment
+    is_self = A.reviewer_id == A.officer_id
+    is_reviewer = A.reviewer_id != A.officer_id
+    rows = db.session.query(
+        A.officer_id,
+        func.sum(case((is_self & (A.is_completed == True), 1), else_=0)),
+        func.sum(case((is_reviewer, 1), else_=0)),
+        func.sum(case((is_reviewer & A.assessment_id.isnot(None), 1), else_=0)),
+        func.sum(case((is_reviewer & (A.is_completed == True), 1), else_=0))
+    ).filter(A.period_id == period_id).group_by(A.officer_id).all()
+
+    snapshot = {}
+    for officer_id, self_completed, total, started, completed in rows:
+        total, completed = total or 0, completed or 0
+        snapshot[officer_id] = {
+            'self_completed': bool(self_completed),
+            'reviewers_started': bool(started),
+            'reviewers_completed': total > 0 and completed >= total,
+            'reviewer_total': total,
+            'reviewer_completed': completed
+        }
+    return snapshot
+
+
+def _walk(status, conditions, admin_user_id, max_steps):
+    """Statuses a project passes through, following TRANSITIONS until a condition fails"""
+    path = []
+    while max_steps is None or len(path) < max_steps:
+        transition = TRANSITIONS.get(status)
+        if transition is None:
+            break
+        next_status, condition, _ = transition
+        if condition == 'reviewee':
+            break
+        if condition == 'admin':
+            if not admin_user_id:
+                break
+        elif condition is not None and not conditions[condition]:
+            break
+        path.append(next_status)
+        status = next_status
+    return path
+
+
+def advance_period_projects(period_id, admin_user_id=None, dry_run=False, max_steps=1):
+    """
+    Apply every eligible workflow transition to a period's assessment projects
+
+    Uses the same rules as AssessmentProject.advance_status: by default every eligible
+    project moves one step, as if advance_status were called once on each. Admin-gated
+    steps (admin review, final approval, releasing results) only move when
+    admin_user_id is given, and the reviewee's acknowledgement is never made for them.
+    Runs on db.session; the caller commits.
+
+    Args:
+        period_id: Assessment period ID
+        admin_user_id: Admin approving the admin review, final approval and results release steps
+        dry_run: Report what would move without updating anything
+        max_steps: Maximum steps per project (None for as far as the conditions allow)
+
+    Returns:
+        Dictionary with checked, advanced and unchanged counts, the number of UPDATE
+        statements issued (0 on a dry run), and moves: a list of from/to statuses with
+        their project_ids, largest first
+    """
+    snapshot = load_assignment_snapshot(period_id)
+    projects = db.session.query(
+        AssessmentProject.id, AssessmentProject.officer_id, AssessmentProject.status
+    ).filter(AssessmentProject.period_id == period_id).all()
+
+    moves = {}  # (from status, to status) -> (project IDs, columns to set)
+    for project_id, officer_id, status in projects:
+        path = _walk(status, snapshot.get(officer_id, NO_ASSIGNMENTS), admin_user_id, max_steps)
+        if not path:
+            continue
+        key = (status, path[-1])
+        if key not in moves:
+            columns = set()
+            step = status
+            for next_status in path:
+                columns.update(TRANSITIONS[step][2])
+                step = next_status
+            moves[key] = ([], columns)
+        moves[key][0].append(project_id)
+
+    updates = 0
+    if not dry_run and moves:
+        now = datetime.utcnow()
+        column_values = {
+            'admin_approved_by': admin_user_id,
+            'reviewer_tasks_visible': True
+        }
+        for (from_status, to_status), (project_ids, columns) in moves.items():
+            values = {column: column_values.get(column, now) for column in columns}
+            values.update(status=to_status, updated_at=now)
+            # The status guard keeps a concurrent single-project change from being overwritten
+            db.session.execute(update(AssessmentProject).where(
+                AssessmentProject.id.in_(project_ids),
+                AssessmentProject.status == from_status
+            ).values(**values), execution_options={'synchronize_session': False})
+            updates += 1
+        db.session.expire_all()
+
+    advanced = sum(len(project_ids) for project_ids, _ in moves.values())
+    return {
+        'dry_run': dry_run,
+        'checked': len(projects),
+        'advanced': advanced,
+        'unchanged': len(projects) - advanced,
+        'updates': updates,
+        'moves': sorted(({
+            'from': from_status.value,
+            'to': to_status.value,
+            'count': len(project_ids),
+            'project_ids': sorted(project_ids)
+        } for (from_status, to_status), (project_ids, _) in moves.items()), key=lambda move: -move['count'])
+    }
@@ -0,0 +1,92 @@
+"""
+Question Equivalence Index
+Maps every AssessmentQuestion to a canonical question key so matrix and report code
+can match the same question across forms (e.g. self-review vs reviewer) on an integer
+key instead of comparing question text at request time
+"""
+import hashlib
+from app import db
+from models import AssessmentQuestion, CanonicalQuestion, QuestionEquivalence
+
+
+def question_text_hash(question_text):
+    """Stable hash of the question text; questions with identical text share a canonical key"""
+    return hashlib.sha256((question_text or '').encode('utf-8')).hexdigest()
+
+
+def index_questions(questions):
+    """
+    Assign (or refresh) canonical keys for the given questions
+
+    Questions must already be flushed so they have IDs. The caller commits.
+
+    Args:
+        questions: Iterable of AssessmentQuestion objects
+
+    Returns:
+        Dictionary mapping question ID to canonical key
+    """
+    questions = [q for q in questions if q.id is not None]
+    if not questions:
+        return {}
+
+    hashes = {q.id: question_text_hash(q.question_text) for q in questions}
+
+    # Reuse existing canonical questions, create the missing ones
+    canonical = {
+        c.text_hash: c for c in CanonicalQuestion.query.filter(
+            CanonicalQuestion.text_hash.in_(set(hashes.values()))
+        ).all()
+    }
+    for question in questions:
+        text_hash = hashes[question.id]
+        if text_hash not in canonical:
+            canonical[text_hash] = CanonicalQuestion(text_hash=text_hash, question_text=question.question_text)
+            db.session.add(canonical[text_hash])
+    db.session.flush()
+
+    existing = {
+        e.question_id: e for e in QuestionEquivalence.query.filter(
+            QuestionEquivalence.question_id.in_(list(hashes.keys()))
+        ).all()
+    }
+
+    keys = {}
+    for question in questions:
+        canonical_id = canonical[hashes[question.id]].id
+        equivalence = existing.get(question.id)
+        if equivalence is None:
+            db.session.add(QuestionEquivalence(question_id=question.id, canonical_id=canonical_id))
+        elif equivalence.canonical_id != canonical_id:
+            equivalence.canonical_id = canonical_id
+        keys[question.id] = canonical_id
+
+    return keys
+
+
+def index_form_questions(form_id):
+    """Assign canonical keys to every question on a form (after create, duplicate or import)"""
+    return index_questions(AssessmentQuestion.query.filter_by(form_id=form_id).all())
+
+
+def get_canonical_keys(question_ids):
+    """Get canonical keys for a set of question IDs in one query"""
+    question_ids = list(set(question_ids))
+    if not question_ids:
+        return {}
+    rows = db.session.query(QuestionEquivalence.question_id, QuestionEquivalence.canonical_id).filter(
+        QuestionEquivalence.question_id.in_(question_ids)
+    ).all()
+    return dict(rows)
+
+
+def ensure_question_index():
+    """Backfill canonical keys for questions created before the index existed"""
+    missing = AssessmentQuestion.query.outerjoin(
+        QuestionEquivalence, QuestionEquivalence.question_id == AssessmentQuestion.id
+    ).filter(QuestionEquivalence.question_id.is_(None)).all()
+
+    if missing:
+        index_questions(missing)
+        db.session.commit()
+    return len(missing)
@@ -0,0 +1,206 @@
+"""
+Report Blobs
+Content-addressed storage for generated report files. Each file is stored once in
+report_blob under the SHA-256 of its bytes, so identical PDFs are deduplicated, and
+ai_report_pdf links an AIGeneratedReport to its blob. Metadata lookups read only the
+link and the blob's size; the bytes are read in REPORT_BLOB_CHUNK_SIZE slices while a
+download streams, honouring Range and If-None-Match / If-Range with the hash as ETag.
+"""
+import hashlib
+import os
+from datetime import datetime
+from urllib.parse import quote
+from flask import Response, request, stream_with_context
+from sqlalchemy import func, select
+from app import db
+from models import AIGeneratedReport, AIReportPdf, ReportBlob
+
+REPORT_BLOB_CHUNK_SIZE = int(os.environ.get('REPORT_BLOB_CHUNK_SIZE', 256 * 1024))
+
+BLOB_TABLE = ReportBlob.__table__
+
+
+def _dialect_insert(connection):
+    dialect_name = connection.dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(BLOB_TABLE)
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(BLOB_TABLE)
+    return None
+
+
+def store_blob(data, content_type='application/pdf'):
+    """
+    Store file content once, keyed by its SHA-256 (runs on db.session; the caller commits)
+
+    Returns:
+        Hex SHA-256 of data
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    row = {'sha256': sha256, 'size': len(data), 'content_type': content_type,
+           'data': data, 'created_at': datetime.utcnow()}
+    connection = db.session.connection()
+    insert = _dialect_insert(connection)
+    if insert is not None:
+        connection.execute(insert.on_conflict_do_nothing(index_elements=['sha256']), row)
+    elif connection.execute(select(BLOB_TABLE.c.sha256).where(BLOB_TABLE.c.sha256 == sha256)).first() is None:
+        connection.execute(BLOB_TABLE.insert(), row)
+    return sha256
+
+
+def prune_orphan_blobs(candidates=None):
+    """
+    Delete blobs no report links to (caller commits)
+
+    Args:
+        candidates: Only consider these hashes (None for every blob)
+
+    Returns:
+        Number of blobs deleted
+    """
+    query = BLOB_TABLE.delete().where(BLOB_TABLE.c.sha256.not_in(select(AIReportPdf.blob_sha256)))
+    if candidates is not None:
+        candidates = [sha256 for sha256 in candidates if sha256]
+        if not candidates:
+            return 0
+        query = query.where(BLOB_TABLE.c.sha256.in_(candidates))
+    return db.session.execute(query).rowcount or 0
+
+
+def attach_report_pdf(report, pdf_data):
+    """
+    Store a report's PDF as a blob and point the report at it (caller commits)
+
+    Args:
+        report: AIGeneratedReport (flushed here if it has no ID yet)
+        pdf_data: PDF bytes, or None to detach the current PDF
+
+    Returns:
+        Hex SHA-256 of the stored PDF, or None
+    """
+    if report.id is None:
+        db.session.flush()
+
+    link = db.session.get(AIReportPdf, report.id)
+    previous = link.blob_sha256 if link is not None else None
+    sha256 = None
+    if pdf_data:
+        sha256 = store_blob(pdf_data)
+        if link is None:
+            db.session.add(AIReportPdf(report_id=report.id, blob_sha256=sha256))
+        else:
+            link.blob_sha256 = sha256
+            link.stored_at = datetime.utcnow()
+    elif link is not None:
+        db.session.delete(link)
+
+    report.pdf_data = None  # Content lives in report_blob only
+    if previous and previous != sha256:
+        db.session.flush()
+        prune_orphan_blobs([previous])
+    return sha256
+
+
+def get_report_pdf(report_id):
+    """
+    Metadata of a report's PDF blob, without reading its content
+
+    Returns:
+        Dictionary with sha256, size and content_type, or None if the report has no PDF
+    """
+    row = db.session.execute(
+        select(ReportBlob.sha256, ReportBlob.size, ReportBlob.content_type)
+        .join(AIReportPdf, AIReportPdf.blob_sha256 == ReportBlob.sha256)
+        .where(AIReportPdf.report_id == report_id)
+    ).mappings().first()
+    return dict(row) if row else None
+
+
+def iter_blob(sha256, start=0, length=None, chunk_size=None):
+    """Yield a byte range of a blob in chunks, each read with its own SUBSTR query"""
+    chunk_size = chunk_size or REPORT_BLOB_CHUNK_SIZE
+    with db.engine.connect() as connection:
+        if length is None:
+            length = connection.execute(
+                select(BLOB_TABLE.c.size).where(BLOB_TABLE.c.sha256 == sha256)
+            ).scalar_one() - start
+        position = start
+        end = start + length
+        while position < end:
+            size = min(chunk_size, end - position)
+            chunk = connection.execute(
+                select(func.substr(BLOB_TABLE.c.data, position + 1, size)).where(BLOB_TABLE.c.sha256 == sha256)
+            ).scalar()
+            if not chunk:
+                break
+            yield bytes(chunk)
+            position += len(chunk)
+
+
+def _content_disposition(filename):
+    """attachment header with an ASCII fallback name and the UTF-8 name for non-ASCII filenames"""
+    ascii_name = filename.encode('ascii', 'ignore').decode('ascii').replace('"', '') or 'download'
+    if ascii_name == filename:
+        return f'attachment; filename="{ascii_name}"'
+    return f"attachment; filename=\"{ascii_name}\"; filename*=UTF-8''{quote(filename)}"
+
+
+def send_blob(blob, download_name):
+    """
+    Stream a blob as a download for the current request
+
+    Answers If-None-Match with 304 and a single-range Range header with 206 (or 416 when
+    unsatisfiable); If-Range with another ETag falls back to the whole file.
+
+    Args:
+        blob: Metadata from get_report_pdf
+        download_name: File name offered to the browser
+
+    Returns:
+        Flask Response whose body is read from the database while it is sent
+    """
+    sha256, size = blob['sha256'], blob['size']
+    headers = {
+        'Accept-Ranges': 'bytes',
+        'Cache-Control': 'private, no-cache',  # Revalidate with the ETag; content never changes under it
+        'Content-Disposition': _content_disposition(download_name)
+    }
+
+    if request.if_none_match.contains(sha256):
+        response = Response(status=304, headers=headers)
+        response.set_etag(sha256)
+        return response
+
+    start, stop, status = 0, size, 200
+    byte_range = request.range
+    if_range = request.headers.get('If-Range')
+    if byte_range is not None and len(byte_range.ranges) == 1 and (not if_range or if_range.strip('"') == sha256):
+        bounds = byte_range.range_for_length(size)
+        if bounds is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status=416, headers=headers)
+        start, stop = bounds
+        status = 206
+        headers['Content-Range'] = f'bytes {start}-{stop - 1}/{size}'
+
+    headers['Content-Length'] = str(stop - start)
+    response = Response(stream_with_context(iter_blob(sha256, start, stop - start)),
+                        status=status, mimetype=blob['content_type'], headers=headers,
+                        direct_passthrough=True)
+    response.set_etag(sha256)
+    return response
+
+
+def ensure_report_blobs():
+    """Move PDFs still stored inline on ai_generated_report into report_blob, one report at a time"""
+    report_ids = [row[0] for row in db.session.query(AIGeneratedReport.id).filter(
+        AIGeneratedReport.pdf_data.isnot(None)
+    ).all()]
+    for report_id in report_ids:
+        report = db.session.get(AIGeneratedReport, report_id)
+        attach_report_pdf(report, report.pdf_data)
+        db.session.commit()
+        db.session.expunge(report)
+    return len(report_ids)
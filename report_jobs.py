@@ -0,0 +1,464 @@
+"""
+AI Report Job Queue
+Runs comprehensive AI report generation (matrix build, GPT-4o call, PDF render) in a
+bounded pool of background threads so the request that triggers it returns at once.
+Jobs are persisted in the report_job table, retried with backoff, and their progress is
+written to AISummaryStatus for the ai_summary_status endpoint to poll.
+"""
+import hashlib
+import json
+import queue
+import threading
+from collections import defaultdict
+from datetime import datetime, timedelta
+from flask import current_app
+from app import db
+from sqlalchemy import func
+from models import User, AssessmentPeriod, AssessmentAssignment, AISummaryStatus, AIGeneratedReport, ReportBatch, ReportJob
+from activity_logger import log_activity
+from review_matrix import build_review_matrix
+from report_blobs import attach_report_pdf
+
+# Progress (0-100) written to AISummaryStatus when each phase starts
+PHASE_PROGRESS = {
+    'queued': 0,
+    'matrix': 10,
+    'llm': 30,
+    'pdf': 70,
+    'store': 90,
+    'completed': 100
+}
+
+RETRY_DELAYS = [30, 120, 600]  # Seconds to wait before attempt 2, 3, ...
+STALE_JOB_SECONDS = 900  # A 'running' job older than this was orphaned by a restart
+
+_job_queue = queue.Queue()
+_workers = []
+_workers_lock = threading.Lock()
+
+
+class ReportInputError(Exception):
+    """The officer has nothing to report on; retrying will not help"""
+
+
+def prepare_ai_report_input(officer, matrix):
+    """
+    Convert a review matrix into the input expected by generate_comprehensive_report
+
+    Args:
+        officer: User being reviewed
+        matrix: Result of build_review_matrix
+
+    Returns:
+        Tuple of (matrix_data, text_responses) in the AI analysis format
+    """
+    ai_compatible_matrix_data = []
+    for question_row in matrix['matrix_data']:
+        reviewer_data = {}
+        for reviewer_name, response in question_row['responses'].items():
+            if response and response['rating'] is not None:
+                reviewer_data[reviewer_name] = {
+                    'score': response['rating'],
+                    'rating': response['rating'],
+                    'is_self_assessment': reviewer_name == officer.name
+                }
+
+        if reviewer_data:  # Only include questions with responses
+            ai_compatible_matrix_data.append({
+                'question': question_row['question'].question_text,
+                'category': 'Performance',  # Default category
+                'reviewer_data': reviewer_data,
+                'officer_name': officer.name  # Pass officer name to identify self-assessment
+            })
+
+    # Text responses grouped by question, with full content
+    text_responses = defaultdict(list)
+    for response in matrix['text_responses']:
+        text_responses[response['question_name']].append({
+            'reviewer': response['reviewer'],
+            'reviewer_role': 'Board Member' if response['reviewer'] != officer.name else 'Self-Assessment',
+            'response': response['response']
+        })
+
+    ai_compatible_text_responses = {
+        question_name: {'question_text': question_name, 'responses': responses}
+        for question_name, responses in text_responses.items()
+    }
+    return ai_compatible_matrix_data, ai_compatible_text_responses
+
+
+def report_input_hash(officer, period, matrix_data, text_responses):
+    """Hash of everything the AI report is generated from; unchanged hash means an unchanged report"""
+    payload = json.dumps({
+        'officer': officer.name,
+        'period': period.name,
+        'matrix_data': matrix_data,
+        'text_responses': text_responses
+    }, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _stored_input_hash(report):
+    """Input hash recorded in an AIGeneratedReport's report_data, if any"""
+    if report is None or not report.report_data or report.pdf_file is None:
+        return None
+    try:
+        return json.loads(report.report_data).get('input_hash')
+    except (ValueError, AttributeError):
+        return None
+
+
+def store_ai_report(officer, period, report_result, user_id, input_hash=None):
+    """Create or replace the AIGeneratedReport for an officer and period (caller commits)"""
+    report = AIGeneratedReport.query.filter_by(officer_id=officer.id, period_id=period.id).first()
+    statistics = report_result['statistics']
+
+    if report is None:
+        report = AIGeneratedReport(
+            officer_id=officer.id,
+            period_id=period.id,
+            generated_by=user_id
+        )
+        db.session.add(report)
+
+    report.report_title = f"AI Performance Analysis - {officer.name} - {period.name}"
+    report.summary_text = json.dumps(report_result['ai_summary'])
+    report.pdf_filename = f"{officer.name}_{period.name}_AI_Report.pdf"
+    report.total_reviewers = statistics['total_reviewers']
+    report.average_rating = statistics.get('overall_average', 0)
+    report.total_questions = statistics['total_numerical_questions']
+    report.report_data = json.dumps({'input_hash': input_hash, 'statistics': statistics}, default=str)
+    report.created_by = user_id
+    report.created_at = datetime.utcnow()
+    attach_report_pdf(report, report_result['pdf_data'])
+    return report
+
+
+def _set_status(officer_id, period_id, status, progress, user_id, error_message=None):
+    """Upsert the AISummaryStatus row polled by the UI (caller commits)"""
+    status_record = AISummaryStatus.query.filter_by(officer_id=officer_id, period_id=period_id).first()
+    if status_record is None:
+        status_record = AISummaryStatus(officer_id=officer_id, period_id=period_id, created_by=user_id)
+        db.session.add(status_record)
+
+    status_record.status = status
+    status_record.progress = progress
+    status_record.error_message = error_message
+    if status == 'pending':
+        status_record.started_at = datetime.utcnow()
+        status_record.completed_at = None
+        status_record.created_by = user_id
+    elif status in ('completed', 'error'):
+        status_record.completed_at = datetime.utcnow()
+    return status_record
+
+
+def _set_phase(job, phase):
+    """Record the phase a running job has reached and commit so pollers see it"""
+    job.phase = phase
+    _set_status(job.officer_id, job.period_id, 'processing', PHASE_PROGRESS[phase], job.created_by)
+    db.session.commit()
+
+
+def get_active_job(officer_id, period_id):
+    """Get the queued or running report job for an officer and period, if any"""
+    return ReportJob.query.filter(
+        ReportJob.officer_id == officer_id,
+        ReportJob.period_id == period_id,
+        ReportJob.status.in_(['queued', 'running'])
+    ).order_by(ReportJob.id.desc()).first()
+
+
+def _add_job(officer_id, period_id, user_id, active_job=None, batch_id=None, skip_unchanged=False):
+    """Add a queued job unless one is already active (caller commits); returns (job, created)"""
+    if active_job is not None:
+        if batch_id and active_job.batch_id is None:
+            active_job.batch_id = batch_id
+        return active_job, False
+
+    job = ReportJob(
+        job_type='ai_report',
+        officer_id=officer_id,
+        period_id=period_id,
+        batch_id=batch_id,
+        status='queued',
+        phase='queued',
+        skip_unchanged=skip_unchanged,
+        run_after=datetime.utcnow(),
+        created_by=user_id
+    )
+    db.session.add(job)
+    _set_status(officer_id, period_id, 'pending', PHASE_PROGRESS['queued'], user_id)
+    return job, True
+
+
+def enqueue_ai_report(officer_id, period_id, user_id):
+    """
+    Queue comprehensive AI report generation for an officer
+
+    Args:
+        officer_id: ID of the officer to report on
+        period_id: ID of the assessment period
+        user_id: ID of the admin requesting the report
+
+    Returns:
+        The ReportJob (an already active job for the same officer and period is reused)
+    """
+    start_report_workers()
+    job, created = _add_job(officer_id, period_id, user_id, active_job=get_active_job(officer_id, period_id))
+    db.session.commit()
+    if created:
+        _job_queue.put(job.id)
+    return job
+
+
+def enqueue_period_reports(period_id, user_id, force=False):
+    """
+    Queue AI reports for every officer with assignments in a period
+
+    Args:
+        period_id: ID of the assessment period
+        user_id: ID of the admin requesting the reports
+        force: Regenerate reports whose input data has not changed since the last report
+
+    Returns:
+        The ReportBatch grouping the jobs
+    """
+    start_report_workers()
+    officer_ids = [row[0] for row in db.session.query(AssessmentAssignment.officer_id).filter_by(
+        period_id=period_id
+    ).distinct().order_by(AssessmentAssignment.officer_id).all()]
+
+    active_jobs = {
+        job.officer_id: job for job in ReportJob.query.filter(
+            ReportJob.period_id == period_id,
+            ReportJob.status.in_(['queued', 'running'])
+        ).order_by(ReportJob.id).all()
+    }
+
+    batch = ReportBatch(period_id=period_id, total_jobs=0, force=force, created_by=user_id)
+    db.session.add(batch)
+    db.session.flush()
+
+    new_jobs = []
+    linked = 0
+    for officer_id in officer_ids:
+        job, created = _add_job(officer_id, period_id, user_id, active_job=active_jobs.get(officer_id),
+                                batch_id=batch.id, skip_unchanged=not force)
+        if created:
+            new_jobs.append(job)
+        # Jobs still active for an earlier batch stay there and are not counted here
+        if job.batch_id == batch.id:
+            linked += 1
+    batch.total_jobs = linked
+    db.session.commit()
+
+    for job in new_jobs:
+        _job_queue.put(job.id)
+    return batch
+
+
+def get_batch_summary(batch_id):
+    """
+    Aggregate progress, throughput and failures for a report batch
+
+    Returns:
+        Dictionary with job counts by status, elapsed time, throughput and failure details,
+        or None if the batch does not exist
+    """
+    batch = db.session.get(ReportBatch, batch_id)
+    if batch is None:
+        return None
+
+    counts = dict(db.session.query(ReportJob.status, func.count(ReportJob.id)).filter_by(
+        batch_id=batch_id
+    ).group_by(ReportJob.status).all())
+    finished = counts.get('completed', 0) + counts.get('skipped', 0) + counts.get('failed', 0)
+    done = finished >= batch.total_jobs
+
+    last_finished, average_seconds = None, None
+    finished_jobs = db.session.query(ReportJob.started_at, ReportJob.finished_at).filter(
+        ReportJob.batch_id == batch_id,
+        ReportJob.status.in_(['completed', 'skipped'])
+    ).all()
+    durations = [(end - start).total_seconds() for start, end in finished_jobs if start and end]
+    if durations:
+        average_seconds = round(sum(durations) / len(durations), 1)
+    if finished_jobs:
+        last_finished = max(end for _, end in finished_jobs if end)
+
+    end_time = last_finished if done and last_finished else datetime.utcnow()
+    elapsed_seconds = max((end_time - batch.created_at).total_seconds(), 0.001)
+
+    failures = [{
+        'officer_id': job.officer_id,
+        'officer_name': job.officer.name if job.officer else None,
+        'attempts': job.attempts,
+        'error': job.error_message
+    } for job in batch.jobs.filter_by(status='failed').order_by(ReportJob.officer_id).all()]
+
+    return {
+        'batch_id': batch.id,
+        'period_id': batch.period_id,
+        'total': batch.total_jobs,
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'completed': counts.get('completed', 0),
+        'skipped': counts.get('skipped', 0),
+        'failed': counts.get('failed', 0),
+        'done': done,
+        'elapsed_seconds': round(elapsed_seconds, 1),
+        'throughput_per_minute': round((counts.get('completed', 0) + counts.get('skipped', 0)) / elapsed_seconds * 60, 2),
+        'average_job_seconds': average_seconds,
+        'failures': failures
+    }
+
+
+def run_ai_report_job(job_id):
+    """
+    Execute one attempt of a report job; called by worker threads inside an app context
+
+    Returns:
+        Final job status for this attempt ('completed', 'skipped', 'queued' for a retry or 'failed'),
+        or None if the job was not available to claim
+    """
+    # Claim the job atomically so it is never run twice
+    now = datetime.utcnow()
+    claimed = ReportJob.query.filter(
+        ReportJob.id == job_id,
+        ReportJob.status == 'queued'
+    ).update({
+        'status': 'running',
+        'attempts': ReportJob.attempts + 1,
+        'started_at': now,
+        'error_message': None
+    }, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        return None
+
+    job = db.session.get(ReportJob, job_id)
+    try:
+        officer = db.session.get(User, job.officer_id)
+        period = db.session.get(AssessmentPeriod, job.period_id)
+        if officer is None or period is None:
+            raise ReportInputError('Officer or assessment period no longer exists')
+
+        _set_phase(job, 'matrix')
+        matrix = build_review_matrix(officer, period, exclude_self_from_average=False)
+        if not matrix['assignments']:
+            raise ReportInputError('No assignments found for this officer in the current period.')
+        if not matrix['matrix_data']:
+            raise ReportInputError('No rating questions found in assigned forms.')
+        matrix_data, text_responses = prepare_ai_report_input(officer, matrix)
+        job.input_hash = report_input_hash(officer, period, matrix_data, text_responses)
+
+        if job.skip_unchanged:
+            existing_report = AIGeneratedReport.query.filter_by(officer_id=officer.id, period_id=period.id).first()
+            if _stored_input_hash(existing_report) == job.input_hash:
+                job.status = 'skipped'
+                job.phase = 'completed'
+                job.finished_at = datetime.utcnow()
+                _set_status(job.officer_id, job.period_id, 'completed', PHASE_PROGRESS['completed'], job.created_by)
+                db.session.commit()
+                return 'skipped'
+
+        from ai_comprehensive_analysis import generate_comprehensive_report
+        report_result = generate_comprehensive_report(
+            officer_name=officer.name,
+            matrix_data=matrix_data,
+            text_responses=text_responses,
+            period_name=period.name,
+            progress_callback=lambda phase: _set_phase(job, phase)
+        )
+        if not report_result['success']:
+            raise RuntimeError(report_result.get('error', 'AI analysis failed'))
+
+        _set_phase(job, 'store')
+        store_ai_report(officer, period, report_result, job.created_by, input_hash=job.input_hash)
+        job.status = 'completed'
+        job.phase = 'completed'
+        job.finished_at = datetime.utcnow()
+        _set_status(job.officer_id, job.period_id, 'completed', PHASE_PROGRESS['completed'], job.created_by)
+        db.session.commit()
+        log_activity(job.created_by, 'generate_ai_summary', f'Generated AI summary and PDF for {officer.name}')
+        return 'completed'
+
+    except Exception as e:
+        print(f"AI Report Job {job_id} Error: {type(e).__name__}: {str(e)}")
+        db.session.rollback()
+        job = db.session.get(ReportJob, job_id)
+        retryable = not isinstance(e, ReportInputError) and job.attempts < job.max_attempts
+        job.error_message = str(e)
+        job.finished_at = datetime.utcnow()
+
+        if retryable:
+            delay = RETRY_DELAYS[min(job.attempts - 1, len(RETRY_DELAYS) - 1)]
+            job.status = 'queued'
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+            _set_status(job.officer_id, job.period_id, 'processing', PHASE_PROGRESS['queued'], job.created_by,
+                        error_message=f'Attempt {job.attempts} failed, retrying in {delay}s: {e}')
+        else:
+            job.status = 'failed'
+            _set_status(job.officer_id, job.period_id, 'error', 0, job.created_by, error_message=str(e))
+        db.session.commit()
+
+        if retryable:
+            _schedule(job_id, delay)
+        return job.status
+
+
+def _schedule(job_id, delay):
+    """Put a job back on the queue after a delay"""
+    timer = threading.Timer(delay, _job_queue.put, args=(job_id,))
+    timer.daemon = True
+    timer.start()
+
+
+def _worker_loop(app):
+    """Take job IDs off the queue and run them, one at a time per thread"""
+    while True:
+        job_id = _job_queue.get()
+        try:
+            with app.app_context():
+                try:
+                    run_ai_report_job(job_id)
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            print(f"AI Report Worker Error: {e}")
+        finally:
+            _job_queue.task_done()
+
+
+def recover_report_jobs():
+    """Re-queue jobs left behind by a restart: queued jobs and running jobs that went stale"""
+    stale_before = datetime.utcnow() - timedelta(seconds=STALE_JOB_SECONDS)
+    ReportJob.query.filter(
+        ReportJob.status == 'running',
+        ReportJob.started_at < stale_before
+    ).update({'status': 'queued'}, synchronize_session=False)
+    db.session.commit()
+
+    now = datetime.utcnow()
+    pending = db.session.query(ReportJob.id, ReportJob.run_after).filter_by(status='queued').all()
+    for job_id, run_after in pending:
+        delay = (run_after - now).total_seconds() if run_after else 0
+        if delay > 0:
+            _schedule(job_id, delay)
+        else:
+            _job_queue.put(job_id)
+    return len(pending)
+
+
+def start_report_workers():
+    """Start the worker pool (REPORT_WORKER_THREADS threads) once per process"""
+    with _workers_lock:
+        if _workers:
+            return
+        app = current_app._get_current_object()
+        for i in range(max(1, app.config.get('REPORT_WORKER_THREADS', 2))):
+            worker = threading.Thread(target=_worker_loop, args=(app,), name=f'report-worker-{i}', daemon=True)
+            worker.start()
+            _workers.append(worker)
+        recover_report_jobs()
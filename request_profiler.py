@@ -0,0 +1,253 @@
+"""
+Request Profiler
+Sampling profiler for individual requests. A profiled request gets a sampler thread that
+reads the request thread's current stack from sys._current_frames() every
+PROFILE_INTERVAL_MS and counts identical stacks, so the view itself runs uninstrumented
+between samples. A request is profiled when an admin adds ?_profile=1 (or sends
+X-Profile: 1), or at random for a PROFILE_SAMPLE_RATE share of traffic.
+
+The collapsed stacks ("frame;frame;frame count" lines, the flamegraph.pl / speedscope
+input format) are stored in request_profile under a profile ID, returned in the
+X-Profile-Id header, and summarised on /admin/profiles as time per component (SQL/ORM,
+Jinja, reportlab, plotly, OpenAI, ...) and a call tree. The newest PROFILE_KEEP
+profiles are kept.
+"""
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from flask_login import current_user
+from sqlalchemy import select
+from app import app, db
+from models import RequestProfile
+
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 200))
+PROFILE_TREE_MIN_SHARE = 0.01  # Call tree nodes under 1% of samples are folded away
+PROFILE_TREE_MAX_DEPTH = 60
+
+# Stack roots above the request dispatch (server loop, WSGI middleware) are dropped
+DISPATCH_FRAME = 'flask.app:full_dispatch_request'
+
+# Library prefix -> component; the frame nearest the leaf that matches decides a sample's component
+COMPONENTS = (
+    ('sqlalchemy.', 'SQL / ORM'),
+    ('psycopg2.', 'SQL / ORM'),
+    ('jinja2.', 'Jinja templates'),
+    ('template ', 'Jinja templates'),
+    ('reportlab.', 'reportlab'),
+    ('plotly.', 'plotly'),
+    ('matplotlib.', 'matplotlib'),
+    ('pandas.', 'pandas'),
+    ('openai.', 'OpenAI'),
+    ('httpx.', 'OpenAI'),
+    ('openpyxl.', 'openpyxl'),
+)
+APPLICATION_COMPONENT = 'Application code'
+
+_frame_labels = {}  # code object -> frame label
+
+
+def _frame_label(code):
+    """'package.module:function' for libraries, 'module:function' for the app, 'template name:block' for Jinja"""
+    label = _frame_labels.get(code)
+    if label is None:
+        filename = code.co_filename.replace('\\', '/')
+        if filename.endswith(('.html', '.txt')):
+            label = f"template {filename.rsplit('/', 1)[-1]}:{code.co_name}"
+        else:
+            if '/site-packages/' in filename:
+                module = filename.split('/site-packages/', 1)[1]
+            else:
+                module = filename.rsplit('/', 1)[-1]
+            module = module[:-3] if module.endswith('.py') else module
+            module = module.replace('/', '.').replace('.__init__', '')
+            label = f'{module}:{code.co_name}'
+        _frame_labels[code] = label
+    return label
+
+
+def _collapse(frame):
+    """Root-first, ';'-joined frame labels for a stack, starting at the request dispatch"""
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    labels.reverse()
+    if DISPATCH_FRAME in labels:
+        labels = labels[labels.index(DISPATCH_FRAME):]
+    return ';'.join(labels)
+
+
+class _Sampler(threading.Thread):
+    """Counts the stacks of one thread at a fixed interval until stopped"""
+
+    def __init__(self, thread_id, interval):
+        super().__init__(name='request-profiler', daemon=True)
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._done = threading.Event()
+
+    def run(self):
+        while not self._done.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.stacks[_collapse(frame)] += 1
+
+    def finish(self):
+        self._done.set()
+        self.join()
+        return self.stacks
+
+
+def _profile_trigger():
+    """'requested', 'sampled' or None for the current request"""
+    if request.args.get('_profile') == '1' or request.headers.get('X-Profile') == '1':
+        if current_user.is_authenticated and current_user.role == 'admin':
+            return 'requested'
+        return None
+    rate = app.config.get('PROFILE_SAMPLE_RATE', 0)
+    if rate > 0 and random.random() < rate:
+        return 'sampled'
+    return None
+
+
+@app.before_request
+def _start_request_profile():
+    if request.endpoint == 'static':
+        return
+    trigger = _profile_trigger()
+    if trigger is None:
+        return
+
+    interval_ms = app.config.get('PROFILE_INTERVAL_MS', 5)
+    sampler = _Sampler(threading.get_ident(), interval_ms / 1000)
+    sampler.start()
+    g._request_profile = {
+        'id': uuid.uuid4().hex,
+        'trigger': trigger,
+        'interval_ms': interval_ms,
+        'sampler': sampler,
+        'started': time.perf_counter()
+    }
+
+
+@app.after_request
+def _tag_profiled_response(response):
+    profile = g.get('_request_profile')
+    if profile is not None:
+        profile['status'] = response.status_code
+        response.headers['X-Profile-Id'] = profile['id']
+    return response
+
+
+@app.teardown_request
+def _save_request_profile(exception=None):
+    """Stop the sampler and store the profile on its own connection, outside the request's session"""
+    profile = g.pop('_request_profile', None)
+    if profile is None:
+        return
+    try:
+        stacks = profile['sampler'].finish()
+        row = {
+            'id': profile['id'],
+            'endpoint': request.endpoint,
+            'method': request.method,
+            'path': request.full_path.rstrip('?')[:500],
+            'status': 500 if exception is not None else profile.get('status'),
+            'trigger': profile['trigger'],
+            'duration_ms': round((time.perf_counter() - profile['started']) * 1000, 2),
+            'interval_ms': profile['interval_ms'],
+            'sample_count': sum(stacks.values()),
+            'collapsed_stacks': '\n'.join(f'{stack} {count}' for stack, count in stacks.most_common()),
+            'user_id': current_user.id if current_user.is_authenticated else None,
+            'created_at': datetime.utcnow()
+        }
+
+        table = RequestProfile.__table__
+        with db.engine.begin() as connection:
+            connection.execute(table.insert(), row)
+            newest = select(table.c.id).order_by(table.c.created_at.desc()).limit(PROFILE_KEEP).scalar_subquery()
+            connection.execute(table.delete().where(table.c.id.not_in(newest)))
+    except Exception as e:
+        print(f"Error saving request profile: {e}")
+
+
+def parse_collapsed(text):
+    """Collapsed stack lines -> list of (frame labels, sample count)"""
+    stacks = []
+    for line in (text or '').splitlines():
+        stack, _, count = line.rpartition(' ')
+        if stack and count.isdigit():
+            stacks.append((stack.split(';'), int(count)))
+    return stacks
+
+
+def _component(frames):
+    for label in reversed(frames):
+        for prefix, component in COMPONENTS:
+            if label.startswith(prefix):
+                return component
+    return APPLICATION_COMPONENT
+
+
+def summarize_profile(profile):
+    """
+    Time per component and a call tree for a stored profile
+
+    Args:
+        profile: RequestProfile
+
+    Returns:
+        Dictionary with total_samples, components (list of name, samples, share, ms, largest
+        first) and tree (depth-first list of depth, label, samples, self_samples, share and ms
+        for every node with at least PROFILE_TREE_MIN_SHARE of the samples)
+    """
+    stacks = parse_collapsed(profile.collapsed_stacks)
+    total = sum(count for _, count in stacks)
+    interval = profile.interval_ms or 0
+
+    def share(samples):
+        return round(samples / total * 100, 1) if total else 0
+
+    by_component = Counter()
+    root = {'children': {}, 'samples': 0, 'self': 0}
+    for frames, count in stacks:
+        by_component[_component(frames)] += count
+        node = root
+        for label in frames[:PROFILE_TREE_MAX_DEPTH]:
+            node = node['children'].setdefault(label, {'children': {}, 'samples': 0, 'self': 0})
+            node['samples'] += count
+        node['self'] += count
+
+    components = [{
+        'name': name,
+        'samples': samples,
+        'share': share(samples),
+        'ms': round(samples * interval, 1)
+    } for name, samples in by_component.most_common()]
+
+    tree = []
+    min_samples = total * PROFILE_TREE_MIN_SHARE
+
+    def walk(children, depth):
+        for label, node in sorted(children.items(), key=lambda item: -item[1]['samples']):
+            if node['samples'] < min_samples:
+                continue
+            tree.append({
+                'depth': depth,
+                'label': label,
+                'samples': node['samples'],
+                'self_samples': node['self'],
+                'share': share(node['samples']),
+                'ms': round(node['samples'] * interval, 1)
+            })
+            walk(node['children'], depth + 1)
+
+    walk(root['children'], 0)
+    return {'total_samples': total, 'components': components, 'tree': tree}
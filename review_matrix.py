@@ -0,0 +1,279 @@
+"""
+Review Matrix Builder
+Builds the question x reviewer matrix for an officer in a fixed number of queries
+(assignments, questions, responses, canonical keys) and assembles it in memory
+"""
+from sqlalchemy.orm import joinedload, contains_eager
+from app import db
+from models import AssessmentAssignment, AssessmentForm, AssessmentQuestion, AssessmentResponse, PeriodFormAssignment
+from question_index import get_canonical_keys
+
+TEXT_QUESTION_TYPES = ('text', 'textarea')
+EXCLUDED_TEXT_FIELDS = ('signature', 'date', 'name')  # Skip signature fields in text summaries
+
+
+def load_matrix_source(officer_id, period_id, form_types=('reviewer', 'self_review')):
+    """
+    Load everything needed to build a review matrix in three queries
+
+    Args:
+        officer_id: ID of the officer being reviewed
+        period_id: ID of the assessment period
+        form_types: PeriodFormAssignment form types whose questions form the rows
+
+    Returns:
+        Tuple of (assignments, questions, responses)
+    """
+    # 1. Assignments with their reviewers
+    assignments = AssessmentAssignment.query.options(
+        joinedload(AssessmentAssignment.reviewer)
+    ).filter_by(
+        officer_id=officer_id,
+        period_id=period_id
+    ).order_by(AssessmentAssignment.id).all()
+
+    # 2. Active questions from every active form assigned to the period
+    questions = AssessmentQuestion.query.join(
+        AssessmentForm, AssessmentQuestion.form_id == AssessmentForm.id
+    ).join(
+        PeriodFormAssignment, PeriodFormAssignment.form_id == AssessmentForm.id
+    ).filter(
+        PeriodFormAssignment.period_id == period_id,
+        PeriodFormAssignment.form_type.in_(form_types),
+        PeriodFormAssignment.is_active == True,
+        AssessmentForm.is_active == True,
+        AssessmentQuestion.is_active == True
+    ).order_by(AssessmentQuestion.form_id, AssessmentQuestion.order.asc(), AssessmentQuestion.id).all()
+
+    # 3. Every response for these assignments, with its question
+    assignment_ids = [a.id for a in assignments]
+    responses = []
+    if assignment_ids:
+        responses = AssessmentResponse.query.join(
+            AssessmentQuestion, AssessmentResponse.question_id == AssessmentQuestion.id
+        ).options(
+            contains_eager(AssessmentResponse.question)
+        ).filter(
+            AssessmentResponse.assessment_assignment_id.in_(assignment_ids)
+        ).order_by(AssessmentResponse.id).all()
+
+    return assignments, questions, responses
+
+
+def _equivalence_key_function(questions, responses):
+    """
+    Build the key used to treat questions on different forms as the same question
+
+    Uses the canonical question index; falls back to comparing question text if any
+    question involved has not been indexed yet.
+    """
+    question_ids = [q.id for q in questions] + [r.question_id for r in responses]
+    canonical_keys = get_canonical_keys(question_ids)
+    if all(question_id in canonical_keys for question_id in question_ids):
+        return lambda question: canonical_keys[question.id]
+    return lambda question: question.question_text
+
+
+def _index_responses(responses, question_key):
+    """Index responses by (assignment, question id) and by (assignment, equivalence key)"""
+    by_question = {}
+    by_key = {}
+    for response in responses:
+        by_question.setdefault((response.assessment_assignment_id, response.question_id), response)
+        question = response.question
+        if question_key is not None and question is not None and question.is_active:
+            by_key.setdefault((response.assessment_assignment_id, question_key(question)), []).append(response)
+
+    # Prefer the lowest equivalent question id, matching the old per-cell lookup order
+    for matches in by_key.values():
+        matches.sort(key=lambda r: (r.question_id, r.id))
+    return by_question, by_key
+
+
+def _cell_from_response(question, response, reviewer):
+    """Convert a stored response into a matrix cell"""
+    response_data = response.get_response_data()
+    rating = None
+    comment = ""
+
+    # Handle different response types
+    if question.question_type == 'rating' and response.response_number is not None:
+        rating = int(response.response_number)
+        comment = response.response_text or ""
+    elif question.question_type in TEXT_QUESTION_TYPES:
+        comment = response.response_text or ""
+    else:
+        comment = str(response_data) if response_data else ""
+
+    return {
+        'rating': rating,
+        'comment': comment,
+        'text_response': comment,
+        'reviewer': reviewer,
+        'response_data': response_data
+    }
+
+
+def build_review_matrix(officer, period, form_types=('reviewer', 'self_review'), question_types=('rating',),
+                        merge_equivalent=True, exclude_self_from_average=True):
+    """
+    Build the question x reviewer matrix for an officer in one assessment period
+
+    Args:
+        officer: User being reviewed
+        period: AssessmentPeriod to build the matrix for
+        form_types: Form types whose questions become matrix rows
+        question_types: Question types to include as rows (None for all types)
+        merge_equivalent: Treat equivalent questions (same canonical key) on different forms as one row
+        exclude_self_from_average: Leave the officer's self-assessment out of the averages
+
+    Returns:
+        Dictionary with assignments, reviewers, matrix_data, text_responses and summary statistics
+    """
+    assignments, questions, responses = load_matrix_source(officer.id, period.id, form_types)
+    question_key = _equivalence_key_function(questions, responses) if merge_equivalent else None
+    by_question, by_key = _index_responses(responses, question_key)
+
+    # Reviewers in assignment order, each with their first assignment
+    reviewers = {}
+    reviewer_assignments = {}
+    for assignment in assignments:
+        reviewers.setdefault(assignment.reviewer_id, assignment.reviewer)
+        reviewer_assignments.setdefault(assignment.reviewer_id, assignment)
+
+    matrix_data = []
+    processed = set()
+    for question in questions:
+        row_key = question_key(question) if merge_equivalent else question.id
+        if row_key in processed:
+            continue
+        if question_types and question.question_type not in question_types:
+            continue
+        processed.add(row_key)
+
+        question_row = {
+            'question': question,
+            'responses': {},
+            'average_rating': 0,
+            'response_count': 0,
+            'responses_for_ai': []
+        }
+        total_rating = 0
+        rating_count = 0
+
+        for reviewer_id, reviewer in reviewers.items():
+            assignment = reviewer_assignments[reviewer_id]
+
+            # Exact question match first, then an equivalent question on another form
+            response = by_question.get((assignment.id, question.id))
+            if response is None and merge_equivalent:
+                matches = by_key.get((assignment.id, question_key(question)))
+                response = matches[0] if matches else None
+
+            if response is None:
+                question_row['responses'][reviewer.name] = None
+                continue
+
+            cell = _cell_from_response(question, response, reviewer)
+            question_row['responses'][reviewer.name] = cell
+
+            rating = cell['rating']
+            if rating and not (exclude_self_from_average and reviewer.id == officer.id):
+                total_rating += rating
+                rating_count += 1
+
+            # Collect for AI analysis (only valid responses with content)
+            if rating or cell['comment']:
+                question_row['responses_for_ai'].append({
+                    'reviewer': reviewer.name,
+                    'rating': rating,
+                    'comment': cell['comment'],
+                    'reviewer_role': reviewer.role
+                })
+
+        if rating_count > 0:
+            question_row['average_rating'] = round(total_rating / rating_count, 2)
+            question_row['response_count'] = rating_count
+
+        matrix_data.append(question_row)
+
+    # Text responses (non-numerical questions) in assignment order
+    responses_by_assignment = {}
+    for response in responses:
+        responses_by_assignment.setdefault(response.assessment_assignment_id, []).append(response)
+
+    text_responses = []
+    for assignment in assignments:
+        for response in responses_by_assignment.get(assignment.id, []):
+            question = response.question
+            if question.question_type not in TEXT_QUESTION_TYPES or question.question_name in EXCLUDED_TEXT_FIELDS:
+                continue
+            if response.response_text and response.response_text.strip():
+                text_responses.append({
+                    'question_name': question.question_name,
+                    'question_text': question.question_text,
+                    'response': response.response_text,
+                    'reviewer': assignment.reviewer.name,
+                    'reviewer_role': assignment.reviewer.role
+                })
+
+    # Overall statistics
+    total_reviewers = len(reviewers)
+    completed_assignments = len([a for a in assignments if a.is_completed])
+    completion_rate = round((completed_assignments / total_reviewers) * 100, 1) if total_reviewers > 0 else 0
+
+    all_ratings = []
+    for question_row in matrix_data:
+        for response in question_row['responses'].values():
+            if response and response.get('rating'):
+                if exclude_self_from_average and response['reviewer'].id == officer.id:
+                    continue
+                all_ratings.append(response['rating'])
+    overall_average = round(sum(all_ratings) / len(all_ratings), 2) if all_ratings else 0
+
+    return {
+        'assignments': assignments,
+        'reviewers': reviewers,
+        'matrix_data': matrix_data,
+        'text_responses': text_responses,
+        'total_reviewers': total_reviewers,
+        'completed_assignments': completed_assignments,
+        'completion_rate': completion_rate,
+        'overall_average': overall_average
+    }
+
+
+def build_overall_summary(officer, matrix):
+    """Immediate performance summary for the matrix (no AI call, so pages load instantly)"""
+    overall_average = matrix['overall_average']
+    performance_level = "excellent" if overall_average >= 4 else "good" if overall_average >= 3 else "satisfactory"
+    return {
+        "executive_summary": f"Performance evaluation shows {officer.name} achieving {overall_average}/5.0 overall rating across {len(matrix['matrix_data'])} assessment categories. {len(matrix['reviewers'])} reviewers provided comprehensive feedback indicating {performance_level} leadership performance.",
+        "major_themes": ["Multi-reviewer assessment", "Comprehensive evaluation", "Professional leadership", "Strategic performance"],
+        "overall_sentiment": performance_level
+    }
+
+
+def serialize_matrix(officer, matrix, overall_ai_summary):
+    """Flatten the matrix into plain rows for spreadsheet export"""
+    export_data = {
+        'officer_name': officer.name,
+        'overall_average': matrix['overall_average'],
+        'overall_ai_summary': overall_ai_summary,
+        'matrix_rows': []
+    }
+
+    for question_data in matrix['matrix_data']:
+        row = {
+            'question_text': question_data['question'].question_text,
+            'average_rating': question_data.get('average_rating', 0),
+            'reviewer_ratings': {}
+        }
+        for reviewer_name, response in question_data['responses'].items():
+            row['reviewer_ratings'][reviewer_name] = {
+                'rating': response.get('rating') if response else None,
+                'comment': response.get('comment', '') if response else ''
+            }
+        export_data['matrix_rows'].append(row)
+
+    return export_data
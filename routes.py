@@ -1,29 +1,35 @@
 from flask import render_template, request, redirect, url_for, flash, jsonify, make_response, session, send_file
 from flask_login import login_user, logout_user, login_required, current_user
-from sqlalchemy.orm import joinedload
+from sqlalchemy.orm import joinedload, defer
 from app import app, db
-from models import User, Assessment, Category, CategoryRating, AssessmentPeriod, AssessmentAssignment, ActivityLog, AssessmentActivityLog, AssessmentForm, AssessmentQuestion, AssessmentResponse, PeriodFormAssignment, PeriodReviewee, PeriodReviewer
+from models import User, Assessment, Category, CategoryRating, AssessmentPeriod, AssessmentAssignment, ActivityLog, AssessmentActivityLog, AssessmentForm, AssessmentQuestion, AssessmentResponse, PeriodFormAssignment, PeriodReviewee, PeriodReviewer, RequestProfile
 from forms import LoginForm, AssessmentForm as AssessmentFormClass, CategoryRatingForm, UserForm, EditUserForm, AssessmentPeriodForm, AssignmentForm, CategoryForm
-from utils import admin_required, generate_pdf_report, export_csv_data
+from utils import admin_required, generate_pdf_report, generate_matrix_pdf_report, export_csv_data
 from email_service import email_service
 from activity_logger import log_activity, get_activity_logs, get_user_activity_logs
+from log_buffer import flush_log_buffer
+import unit_of_work  # Registers the request commit hooks
 from admin_chatbot import process_chatbot_message
+from review_matrix import build_review_matrix, build_overall_summary, serialize_matrix
+from question_index import index_questions, index_form_questions
+from ai_cache import clear_analysis_cache_for_officer
+from log_export import stream_activity_logs_csv, stream_assessment_activity_logs_csv
+from log_pagination import keyset_page
+from dashboard_stats import get_dashboard_stats
+from category_reports import officer_category_report
+from assignment_sync import sync_period_assignments
+from project_workflow import advance_period_projects
+from assignment_review import review_assignments, REVIEW_ACTIONS
+from period_progress import get_period_progress, load_completion_rates
+from email_outbox import queue_reminder_digests, wake_dispatcher
+from sql_instrumentation import get_endpoint_performance, reset_endpoint_performance
+from request_profiler import summarize_profile
+from report_blobs import get_report_pdf, send_blob
+from activity_counters import count_activities, get_activity_summary, parse_filter_day, remove_user_activity_counts
 from datetime import datetime, date
 import csv
 import io
 
-@app.context_processor
-def inject_task_counts():
-    """Inject task counts for navigation badges"""
-    if current_user.is_authenticated and current_user.role == 'admin':
-        # Admin sees submitted assignments pending approval
-        admin_pending_count = AssessmentAssignment.query.filter_by(
-            is_submitted=True,
-            is_admin_approved=False
-        ).count()
-        return dict(admin_pending_count=admin_pending_count, pending_assignments_count=0)
-    return dict(admin_pending_count=0, pending_assignments_count=0)
-
 @app.route('/')
 def index():
     if current_user.is_authenticated:
@@ -177,17 +183,21 @@ def my_tasks():
                 is_admin_approved=False
             ).join(AssessmentPeriod).order_by(AssessmentPeriod.start_date.desc()).all()
             
-            # For each self-assessment, get the external reviewers that will be notified
-            external_reviewers_map = {}
-            for assignment in assignments:
-                if assignment.officer_id == assignment.reviewer_id:  # Self-assessment
-                    external_reviewers = AssessmentAssignment.query.options(
-                        db.joinedload(AssessmentAssignment.reviewer)
-                    ).filter_by(
-                        officer_id=assignment.officer_id,
-                        period_id=assignment.period_id
-                    ).filter(AssessmentAssignment.reviewer_id != assignment.officer_id).all()
-                    external_reviewers_map[assignment.id] = external_reviewers
+            # For each self-assessment, get the external reviewers that will be notified (one query for all of them)
+            self_assessments = [a for a in assignments if a.officer_id == a.reviewer_id]
+            external_by_officer = {}
+            if self_assessments:
+                for external in AssessmentAssignment.query.options(
+                    db.joinedload(AssessmentAssignment.reviewer)
+                ).filter(
+                    AssessmentAssignment.officer_id.in_({a.officer_id for a in self_assessments}),
+                    AssessmentAssignment.period_id.in_({a.period_id for a in self_assessments}),
+                    AssessmentAssignment.reviewer_id != AssessmentAssignment.officer_id
+                ).all():
+                    external_by_officer.setdefault((external.officer_id, external.period_id), []).append(external)
+            external_reviewers_map = {
+                a.id: external_by_officer.get((a.officer_id, a.period_id), []) for a in self_assessments
+            }
             
             # For admin: Open Tasks = pending approval, All Tasks = all submitted assignments
             open_tasks = assignments  # All submitted assignments need admin approval
@@ -473,22 +483,15 @@ def admin_dashboard():
     # Get all assessment projects for context
     all_periods = AssessmentPeriod.query.order_by(AssessmentPeriod.created_at.desc()).limit(5).all()
     
-    # Get assessment form statistics
-    from models import AssessmentForm, AssessmentQuestion
-    assessment_forms_count = AssessmentForm.query.filter_by(is_active=True).count()
-    assessment_questions_count = AssessmentQuestion.query.filter_by(is_active=True).count()
-    template_forms_count = AssessmentForm.query.filter_by(is_active=True, is_template=True).count()
+    # Counts and the monthly trend come from a short-lived snapshot (two queries when rebuilt)
+    stats = get_dashboard_stats(current_period.id if current_period else None, current_year)
+    
     # Get categories for traditional questions
     categories = Category.query.filter_by(is_active=True).order_by(Category.order).all()
     active_periods = AssessmentPeriod.query.filter_by(is_active=True).order_by(AssessmentPeriod.created_at.desc()).limit(3).all()
     
     # Get statistics for current period
     if current_period:
-        total_assignments = AssessmentAssignment.query.filter_by(period_id=current_period.id).count()
-        completed_assignments = AssessmentAssignment.query.filter_by(period_id=current_period.id, is_completed=True).count()
-        pending_assignments = total_assignments - completed_assignments
-        completion_rate = round((completed_assignments / total_assignments * 100), 1) if total_assignments > 0 else 0
-        
         # Get assignment data for current period including AI report availability
         from models import AIGeneratedReport
         assignments_by_officer = db.session.query(
@@ -525,47 +528,27 @@ def admin_dashboard():
         ).group_by(User.id, User.name).all()
         
     else:
-        total_assignments = completed_assignments = pending_assignments = 0
-        completion_rate = 0
         assignments_by_officer = []
         recent_assessments = []
         reviewer_progress = []
     
-    # Get overall system statistics
-    total_officers = User.query.filter_by(role='officer').count()
-    total_board_members = User.query.filter_by(role='board_member').count()
-    total_assessments = Assessment.query.filter_by(year=current_year).count()
-    
-    # Get monthly assessment trend for the chart
-    monthly_data = []
-    for month in range(1, 13):
-        month_assessments = Assessment.query.filter(
-            db.extract('year', Assessment.submitted_at) == current_year,
-            db.extract('month', Assessment.submitted_at) == month
-        ).count()
-        monthly_data.append({
-            'month': month,
-            'count': month_assessments,
-            'month_name': datetime(current_year, month, 1).strftime('%b')
-        })
-    
     return render_template('admin_dashboard.html',
                          current_period=current_period,
                          all_periods=all_periods,
-                         total_assignments=total_assignments,
-                         completed_assignments=completed_assignments,
-                         pending_assignments=pending_assignments,
-                         completion_rate=completion_rate,
+                         total_assignments=stats['total_assignments'],
+                         completed_assignments=stats['completed_assignments'],
+                         pending_assignments=stats['pending_assignments'],
+                         completion_rate=stats['completion_rate'],
                          assignments_by_officer=assignments_by_officer,
                          recent_assessments=recent_assessments,
                          reviewer_progress=reviewer_progress,
-                         total_officers=total_officers,
-                         total_board_members=total_board_members,
-                         total_assessments=total_assessments,
-                         monthly_data=monthly_data,
-                         assessment_forms_count=assessment_forms_count,
-                         assessment_questions_count=assessment_questions_count,
-                         template_forms_count=template_forms_count,
+                         total_officers=stats['total_officers'],
+                         total_board_members=stats['total_board_members'],
+                         total_assessments=stats['total_assessments'],
+                         monthly_data=stats['monthly_data'],
+                         assessment_forms_count=stats['assessment_forms_count'],
+                         assessment_questions_count=stats['assessment_questions_count'],
+                         template_forms_count=stats['template_forms_count'],
                          categories=categories,
                          active_periods=active_periods)
 
@@ -586,207 +569,36 @@ def officer_reviews(officer_id):
             flash('No active assessment project found.', 'warning')
             return redirect(url_for('admin_dashboard'))
         
-        # Get all assignments for this officer in the current period
-        assignments = AssessmentAssignment.query.filter_by(
-            officer_id=officer_id,
-            period_id=current_period.id
-        ).all()
+        # Build the question x reviewer matrix in a fixed number of queries
+        matrix = build_review_matrix(officer, current_period)
         
-        if not assignments:
+        if not matrix['assignments']:
             flash(f'No assessment assignments found for {officer.name} in the current period.', 'warning')
             return redirect(url_for('admin_dashboard'))
         
-        # Create reviewers list from ALL ASSIGNMENTS
-        reviewers = {}
-        for assignment in assignments:
-            reviewers[assignment.reviewer.id] = assignment.reviewer
-        
-        # Get all assessment forms assigned to this period for BOTH reviewers AND self-review
-        # This is CRITICAL for self-assessment display - includes both form types
-        reviewer_forms = db.session.query(AssessmentForm).join(PeriodFormAssignment).filter(
-            PeriodFormAssignment.period_id == current_period.id,
-            PeriodFormAssignment.form_type.in_(['reviewer', 'self_review']),
-            PeriodFormAssignment.is_active == True,
-            AssessmentForm.is_active == True
-        ).all()
-        
-        # Build matrix data: questions in rows, reviewers in columns
-        matrix_data = []
-        processed_question_texts = set()  # Track processed question texts to prevent duplicates
+        reviewers = matrix['reviewers']
+        matrix_data = matrix['matrix_data']
         
-        # Get all questions from all forms (both reviewer and self-review)
-        all_questions = []
-        for form in reviewer_forms:
-            form_questions = AssessmentQuestion.query.filter_by(
-                form_id=form.id,
-                is_active=True
-            ).order_by(AssessmentQuestion.order.asc()).all()
-            all_questions.extend(form_questions)
-        
-        for question in all_questions:
-            # Skip if we've already processed this question text (prevent duplicates)
-            if question.question_text in processed_question_texts:
-                continue
-            
-            # Only include rating questions in the matrix (skip text-only questions)
-            if question.question_type != 'rating':
-                continue
-                
-            processed_question_texts.add(question.question_text)
-            
-            question_row = {
-                'question': question,
-                'responses': {},
-                'average_rating': 0,
-                'response_count': 0
-            }
-            
-            total_rating = 0
-            rating_count = 0
-            responses_for_ai = []
-            
-            for reviewer_id, reviewer in reviewers.items():
-                # Find assignment for this reviewer
-                assignment = next((a for a in assignments if a.reviewer_id == reviewer_id), None)
-                if assignment:
-                    # Find response for this question in this assignment
-                    # Search by question text to match across different forms (reviewer vs self-review)
-                    try:
-                        # First try exact question ID match
-                        response = AssessmentResponse.query.filter_by(
-                            assessment_assignment_id=assignment.id,
-                            question_id=question.id
-                        ).first()
-                        
-                        # If no direct match, search for equivalent question by text
-                        if not response:
-                            equivalent_questions = AssessmentQuestion.query.filter_by(
-                                question_text=question.question_text,
-                                is_active=True
-                            ).all()
-                            
-                            for eq_question in equivalent_questions:
-                                response = AssessmentResponse.query.filter_by(
-                                    assessment_assignment_id=assignment.id,
-                                    question_id=eq_question.id
-                                ).first()
-                                if response:
-                                    break
-                                    
-                    except Exception as db_error:
-                        print(f"Database error: {db_error}")
-                        response = None
-                    
-                    if response:
-                        response_data = response.get_response_data()
-                        rating = None
-                        comment = ""
-                        
-                        # Handle different response types
-                        if question.question_type == 'rating' and response.response_number is not None:
-                            rating = int(response.response_number)
-                            comment = response.response_text or ""
-                        elif question.question_type in ['text', 'textarea']:
-                            comment = response.response_text or ""
-                        else:
-                            comment = str(response_data) if response_data else ""
-                        
-                        # Store response data
-                        question_row['responses'][reviewer.name] = {
-                            'rating': rating,
-                            'comment': comment,
-                            'text_response': comment,
-                            'reviewer': reviewer,
-                            'response_data': response_data
-                        }
-                        
-                        # Only include external reviewer ratings in average (exclude self-assessment)
-                        if rating and reviewer.id != officer.id:
-                            total_rating += rating
-                            rating_count += 1
-                            
-                        # Collect for AI analysis (only valid responses with content)
-                        if rating or comment:
-                            responses_for_ai.append({
-                                'reviewer': reviewer.name,
-                                'rating': rating,
-                                'comment': comment,
-                                'reviewer_role': reviewer.role
-                            })
-                    else:
-                        question_row['responses'][reviewer.name] = None
-                else:
-                    question_row['responses'][reviewer.name] = None
-            
-            # Calculate average rating for this question
-            if rating_count > 0:
-                question_row['average_rating'] = round(total_rating / rating_count, 2)
-                question_row['response_count'] = rating_count
-            
-            # No AI analysis during matrix display - matrix should load instantly
+        # No AI analysis during matrix display - matrix should load instantly
+        for question_row in matrix_data:
             question_row['ai_analysis'] = {
                 "summary": "Use Generate AI Summary button for analysis",
                 "key_themes": [],
                 "sentiment": "neutral"
             }
-            
-            # Add question to matrix if it has any responses or we want to show all
-            matrix_data.append(question_row)
         
-        # Calculate overall statistics
-        total_reviewers = len(reviewers)  # Count ALL assigned reviewers
-        completed_assignments = len([a for a in assignments if a.is_completed])
-        completion_rate = round((completed_assignments / total_reviewers) * 100, 1) if total_reviewers > 0 else 0
-        
-        # Calculate overall average across all questions with ratings (exclude self-assessment)
-        all_ratings = []
-        for question_data in matrix_data:
-            for reviewer_name, response in question_data['responses'].items():
-                if response and response.get('rating'):
-                    # Exclude self-assessment scores from overall average
-                    reviewer = response.get('reviewer')
-                    if reviewer and reviewer.id != officer.id:
-                        all_ratings.append(response['rating'])
-        
-        overall_matrix_average = round(sum(all_ratings) / len(all_ratings), 2) if all_ratings else 0
-        
-        # Collect text responses for summary (non-numerical questions)
-        text_responses = []
-        try:
-            for assignment in assignments:
-                # Get all non-rating responses for this assignment
-                text_questions = AssessmentResponse.query.join(AssessmentQuestion).filter(
-                    AssessmentResponse.assessment_assignment_id == assignment.id,
-                    AssessmentQuestion.question_type.in_(['text', 'textarea']),
-                    AssessmentQuestion.question_name.notin_(['signature', 'date', 'name']),  # Skip signature fields
-                    AssessmentResponse.response_text.isnot(None),
-                    AssessmentResponse.response_text != ''
-                ).all()
-                
-                for response in text_questions:
-                    if response.response_text and response.response_text.strip():
-                        text_responses.append({
-                            'question_name': response.question.question_name,
-                            'question_text': response.question.question_text,
-                            'response': response.response_text,
-                            'reviewer': assignment.reviewer.name,
-                            'reviewer_role': assignment.reviewer.role
-                        })
-        except Exception as db_error:
-            print(f"Database error collecting text responses: {db_error}")
-            # Continue without text responses if there's a database issue
-            text_responses = []
+        total_reviewers = matrix['total_reviewers']
+        completed_assignments = matrix['completed_assignments']
+        completion_rate = matrix['completion_rate']
+        overall_matrix_average = matrix['overall_average']
         
         # Generate AI summaries for text responses with timeout handling
         text_summaries = {}
-        if text_responses:
+        if matrix['text_responses']:
             # Group by question name
             questions_grouped = {}
-            for response in text_responses:
-                question_name = response['question_name']
-                if question_name not in questions_grouped:
-                    questions_grouped[question_name] = []
-                questions_grouped[question_name].append(response)
+            for response in matrix['text_responses']:
+                questions_grouped.setdefault(response['question_name'], []).append(response)
             
             # Generate simple summaries for text responses (skip AI to prevent timeouts)
             for question_name, responses in questions_grouped.items():
@@ -801,65 +613,7 @@ def officer_reviews(officer_id):
                 }
         
         # Generate immediate performance summary (avoid AI to prevent worker timeouts)
-        performance_level = "excellent" if overall_matrix_average >= 4 else "good" if overall_matrix_average >= 3 else "satisfactory"
-        overall_ai_summary = {
-            "executive_summary": f"Performance evaluation shows {officer.name} achieving {overall_matrix_average}/5.0 overall rating across {len(matrix_data)} assessment categories. {len(reviewers)} reviewers provided comprehensive feedback indicating {performance_level} leadership performance.",
-            "major_themes": ["Multi-reviewer assessment", "Comprehensive evaluation", "Professional leadership", "Strategic performance"],
-            "overall_sentiment": performance_level
-        }
-    
-
-        
-        # Save calculated data to simple file cache for Excel export
-        import json
-        import os
-        cache_file = f"matrix_cache_{officer_id}.json"
-        try:
-            cache_data = {
-                'officer_name': officer.name,
-                'overall_average': overall_matrix_average,
-                'overall_ai_summary': overall_ai_summary,
-                'matrix_rows': []
-            }
-            
-            # Convert matrix data to simple structure for Excel with AI insights
-            for question_data in matrix_data:
-                row = {
-                    'question_text': question_data['question'].question_text if hasattr(question_data['question'], 'question_text') else str(question_data['question']),
-                    'average_rating': question_data.get('average_rating', 0),
-                    'reviewer_ratings': {},
-                    'ai_analysis': {}
-                }
-                
-                # Extract simple rating data
-                for reviewer_name, response in question_data.get('responses', {}).items():
-                    if response and isinstance(response, dict):
-                        rating = response.get('rating')
-                        comment = response.get('comment', '')
-                    else:
-                        rating = None
-                        comment = ''
-                    
-                    row['reviewer_ratings'][reviewer_name] = {
-                        'rating': rating,
-                        'comment': comment
-                    }
-                
-                # No AI analysis in cache - removed for performance
-                row['ai_analysis'] = {
-                    'summary': 'Use Generate AI Summary button for comprehensive analysis',
-                    'key_themes': [],
-                    'sentiment': 'neutral'
-                }
-                
-                cache_data['matrix_rows'].append(row)
-            
-            # Save to file
-            with open(cache_file, 'w') as f:
-                json.dump(cache_data, f)
-                
-        except Exception as e:
-            print(f"Cache save error: {e}")
+        overall_ai_summary = build_overall_summary(officer, matrix)
         
         return render_template('officer_reviews_matrix.html',
                              officer=officer,
@@ -1051,6 +805,7 @@ def evaluate_officer(officer_id):
             assignment.assessment = assessment
         
         db.session.commit()
+        clear_analysis_cache_for_officer(officer.id, assignment.period_id if assignment else None)
         flash(f'Assessment for {officer.name} has been submitted successfully.', 'success')
         return redirect(url_for('dashboard'))
     
@@ -1295,6 +1050,8 @@ def edit_assessment_new(assignment_id):
             flash('Draft saved successfully. You can continue editing later.', 'info')
         
         db.session.commit()
+        if action == 'submit':
+            clear_analysis_cache_for_officer(assignment.officer_id, assignment.period_id)
         return redirect(url_for('my_tasks'))
     
     log_activity(current_user.id, 'edit_assessment_new', f'User accessed assessment edit for assignment #{assignment_id}')
@@ -1344,36 +1101,8 @@ def reports():
     officers = User.query.filter_by(role='officer').all()
     categories = Category.query.order_by(Category.order).all()
     
-    officer_reports = []
-    for officer in officers:
-        assessments = Assessment.query.filter_by(officer_id=officer.id, year=current_year).all()
-        
-        if assessments:
-            # Calculate category averages
-            category_data = {}
-            for category in categories:
-                ratings = []
-                for assessment in assessments:
-                    rating = CategoryRating.query.filter_by(
-                        assessment_id=assessment.id,
-                        category_id=category.id
-                    ).first()
-                    if rating:
-                        ratings.append(rating.rating)
-                
-                if ratings:
-                    category_data[category.id] = round(sum(ratings) / len(ratings), 2)
-                else:
-                    category_data[category.id] = 0
-            
-            overall_avg = round(sum(assessment.overall_rating for assessment in assessments if assessment.overall_rating) / len(assessments), 2)
-            
-            officer_reports.append({
-                'officer': officer,
-                'assessments_count': len(assessments),
-                'overall_average': overall_avg,
-                'category_averages': category_data
-            })
+    # One query for the year's ratings, averaged per officer and category with pandas
+    officer_reports = officer_category_report(current_year, officers, categories)
     
     return render_template('reports.html', officer_reports=officer_reports, categories=categories)
 
@@ -1414,133 +1143,35 @@ def export_matrix_pdf(officer_id):
             flash('No active assessment project found.', 'warning')
             return redirect(url_for('admin_dashboard'))
         
-        # Get all assignments for this officer in the current period
-        assignments = AssessmentAssignment.query.filter_by(
-            officer_id=officer_id,
-            period_id=current_period.id
-        ).all()
+        # Build matrix data from reviewer forms: every question type, self-assessment included in averages
+        matrix = build_review_matrix(officer, current_period,
+                                     form_types=('reviewer',),
+                                     question_types=None,
+                                     merge_equivalent=False,
+                                     exclude_self_from_average=False)
         
-        if not assignments:
+        if not matrix['assignments']:
             flash(f'No assessment assignments found for {officer.name} in the current period.', 'warning')
             return redirect(url_for('admin_dashboard'))
         
-        # Create reviewers list from ALL ASSIGNMENTS
-        reviewers = {}
-        for assignment in assignments:
-            reviewers[assignment.reviewer.id] = assignment.reviewer
-        
-        # Get all assessment forms assigned to this period for reviewers
-        reviewer_forms = db.session.query(AssessmentForm).join(PeriodFormAssignment).filter(
-            PeriodFormAssignment.period_id == current_period.id,
-            PeriodFormAssignment.form_type == 'reviewer',
-            PeriodFormAssignment.is_active == True,
-            AssessmentForm.is_active == True
-        ).all()
-        
-        # Build matrix data: questions in rows, reviewers in columns
-        matrix_data = []
-        processed_question_ids = set()
-        
-        # Get all questions from all reviewer forms
-        all_questions = []
-        for form in reviewer_forms:
-            form_questions = AssessmentQuestion.query.filter_by(
-                form_id=form.id,
-                is_active=True
-            ).order_by(AssessmentQuestion.order.asc()).all()
-            all_questions.extend(form_questions)
-        
-        for question in all_questions:
-            if question.id in processed_question_ids:
-                continue
-            processed_question_ids.add(question.id)
-            
-            question_row = {
-                'question': question,
-                'responses': {},
-                'average_rating': 0,
-                'response_count': 0
-            }
-            
-            total_rating = 0
-            rating_count = 0
-            responses_for_ai = []
-            
-            for reviewer_id, reviewer in reviewers.items():
-                assignment = next((a for a in assignments if a.reviewer_id == reviewer_id), None)
-                if assignment:
-                    response = AssessmentResponse.query.filter_by(
-                        assessment_assignment_id=assignment.id,
-                        question_id=question.id
-                    ).first()
-                    
-                    if response:
-                        response_data = response.get_response_data()
-                        rating = None
-                        comment = ""
-                        
-                        if question.question_type == 'rating' and response.response_number is not None:
-                            rating = int(response.response_number)
-                            comment = response.response_text or ""
-                        elif question.question_type in ['text', 'textarea']:
-                            comment = response.response_text or ""
-                        else:
-                            comment = str(response_data) if response_data else ""
-                        
-                        question_row['responses'][reviewer.name] = {
-                            'rating': rating,
-                            'comment': comment,
-                            'text_response': comment,
-                            'reviewer': reviewer,
-                            'response_data': response_data
-                        }
-                        
-                        if rating:
-                            total_rating += rating
-                            rating_count += 1
-                            
-                        if rating or comment:
-                            responses_for_ai.append({
-                                'reviewer': reviewer.name,
-                                'rating': rating,
-                                'comment': comment,
-                                'reviewer_role': reviewer.role
-                            })
-                    else:
-                        question_row['responses'][reviewer.name] = None
-                else:
-                    question_row['responses'][reviewer.name] = None
-            
-            if rating_count > 0:
-                question_row['average_rating'] = round(total_rating / rating_count, 2)
-                question_row['response_count'] = rating_count
-            
-            try:
-                from ai_analysis import generate_feedback_summary
-                ai_analysis = generate_feedback_summary(question.question_text, responses_for_ai)
-                question_row['ai_analysis'] = ai_analysis
-            except Exception as e:
-                question_row['ai_analysis'] = {
-                    "summary": "AI analysis temporarily unavailable.",
-                    "key_themes": ["Manual review required"],
-                    "sentiment": "neutral"
-                }
-            
-            matrix_data.append(question_row)
-        
-        # Calculate overall average
-        all_ratings = []
-        for question_data in matrix_data:
-            for reviewer_name, response in question_data['responses'].items():
-                if response and response.get('rating'):
-                    all_ratings.append(response['rating'])
+        reviewers = matrix['reviewers']
+        matrix_data = matrix['matrix_data']
+        
+        # Per-question AI summaries: cached ones are reused, the rest are generated concurrently
+        from ai_analysis_cached import get_or_create_question_analyses, get_or_create_overall_analysis
+        ai_analyses = get_or_create_question_analyses(officer.id, current_period.id, [{
+            'question_id': question_row['question'].id,
+            'question_text': question_row['question'].question_text,
+            'responses_data': question_row['responses_for_ai']
+        } for question_row in matrix_data])
+        for question_row, ai_analysis in zip(matrix_data, ai_analyses):
+            question_row['ai_analysis'] = ai_analysis
         
-        overall_matrix_average = round(sum(all_ratings) / len(all_ratings), 2) if all_ratings else 0
+        overall_matrix_average = matrix['overall_average']
         
         # Generate comprehensive AI summary
         try:
-            from ai_analysis import generate_overall_performance_summary
-            overall_ai_summary = generate_overall_performance_summary(officer.name, matrix_data)
+            overall_ai_summary = get_or_create_overall_analysis(officer.id, current_period.id, officer.name, matrix_data)
         except Exception as e:
             overall_ai_summary = {
                 "executive_summary": "Comprehensive performance analysis available with detailed reviewer feedback.",
@@ -1562,125 +1193,30 @@ def export_matrix_pdf(officer_id):
         print(f"Error generating matrix PDF: {e}")
         flash('Error generating PDF export. Please try again.', 'error')
         return redirect(url_for('admin_dashboard'))
-        question_row = {
-            'question': question,
-            'responses': {},
-            'average_rating': 0,
-            'response_count': 0
-        }
-        
-        total_rating = 0
-        rating_count = 0
-        responses_for_ai = []
-        
-        for reviewer_id, reviewer in reviewers.items():
-            # Find assessment for this reviewer
-            assessment = next((a for a in assessments if a.reviewer_id == reviewer_id), None)
-            if assessment:
-                # Find the FIRST response for this question in this assessment (avoid duplicates)
-                response = QuestionResponse.query.filter_by(
-                    assessment_id=assessment.id,
-                    question_id=question.id
-                ).first()
-                
-                if response:
-                    # Store only one response per reviewer per question
-                    question_row['responses'][reviewer.name] = {
-                        'rating': response.response_rating,
-                        'comment': response.comment,
-                        'text_response': response.response_text,
-                        'reviewer': reviewer
-                    }
-                    
-                    if response.response_rating:
-                        total_rating += response.response_rating
-                        rating_count += 1
-                        
-                    # Collect for AI analysis (only valid responses with content)
-                    if response.response_rating or response.comment or response.response_text:
-                        responses_for_ai.append({
-                            'reviewer': reviewer.name,
-                            'rating': response.response_rating,
-                            'comment': response.comment or response.response_text,
-                            'reviewer_role': reviewer.role
-                        })
-                else:
-                    question_row['responses'][reviewer.name] = None
-            else:
-                question_row['responses'][reviewer.name] = None
-        
-        # Calculate average rating for this question
-        if rating_count > 0:
-            question_row['average_rating'] = round(total_rating / rating_count, 2)
-            question_row['response_count'] = rating_count
-        
-        # Generate AI-powered analysis for this question - EXACT SAME LOGIC
-        try:
-            from ai_analysis import generate_feedback_summary
-            ai_analysis = generate_feedback_summary(question.text, responses_for_ai)
-            question_row['ai_analysis'] = ai_analysis
-        except Exception as e:
-            question_row['ai_analysis'] = {
-                "summary": "AI analysis temporarily unavailable.",
-                "key_themes": ["Manual review required"],
-                "sentiment": "neutral"
-            }
-        
-        # Add ALL questions to the matrix (show empty cells for pending reviews) - SAME AS WEB
-        matrix_data.append(question_row)
-    
-    # Calculate overall average across all questions - EXACT SAME LOGIC
-    all_ratings = []
-    for question_data in matrix_data:
-        for reviewer_name, response in question_data['responses'].items():
-            if response and response.get('rating'):
-                all_ratings.append(response['rating'])
-    
-    overall_matrix_average = round(sum(all_ratings) / len(all_ratings), 2) if all_ratings else 0
-    
-    # Generate comprehensive AI summary - EXACT SAME LOGIC AS WEB
-    try:
-        from ai_analysis import generate_overall_performance_summary
-        overall_ai_summary = generate_overall_performance_summary(officer.name, matrix_data)
-    except Exception as e:
-        overall_ai_summary = {
-            "executive_summary": "Comprehensive performance analysis available with detailed reviewer feedback.",
-            "major_themes": ["Multi-reviewer assessment", "Comprehensive evaluation"],
-            "overall_sentiment": "satisfactory"
-        }
-    
-    pdf_buffer = generate_matrix_pdf_report(officer, matrix_data, reviewers, overall_matrix_average, overall_ai_summary)
-    
-    response = make_response(pdf_buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename="{officer.name}_matrix_report.pdf"'
-    
-    log_activity(current_user.id, 'export_matrix_pdf', f'Exported matrix PDF report for {officer.name}')
-    
-    return response
 
 @app.route('/admin/export_matrix_excel/<int:officer_id>')
 @login_required
 @admin_required  
 def export_matrix_excel(officer_id):
-    """Use cached matrix data from file for Excel export"""
+    """Export the review matrix to Excel, built with the same matrix builder as the web view"""
     try:
         officer = User.query.get_or_404(officer_id)
         if officer.role != 'officer':
             flash('Invalid officer selection.', 'error')
             return redirect(url_for('admin_dashboard'))
         
-        # Load cached data from file
-        import json
-        import os
-        cache_file = f"matrix_cache_{officer_id}.json"
+        # Get current active assessment project
+        current_period = AssessmentPeriod.query.filter_by(is_active=True).first()
+        if not current_period:
+            flash('No active assessment project found.', 'warning')
+            return redirect(url_for('admin_dashboard'))
         
-        if not os.path.exists(cache_file):
-            flash('Please view the matrix first to generate Excel data.', 'info')
-            return redirect(url_for('officer_reviews', officer_id=officer_id))
+        matrix = build_review_matrix(officer, current_period)
+        if not matrix['assignments']:
+            flash(f'No assessment assignments found for {officer.name} in the current period.', 'warning')
+            return redirect(url_for('admin_dashboard'))
         
-        with open(cache_file, 'r') as f:
-            cached_data = json.load(f)
+        export_data = serialize_matrix(officer, matrix, build_overall_summary(officer, matrix))
         
         # Create comprehensive Excel matching web format exactly
         from io import BytesIO
@@ -1690,11 +1226,11 @@ def export_matrix_excel(officer_id):
         
         wb = Workbook()
         ws = wb.active
-        ws.title = f"{cached_data['officer_name']} Performance Matrix"
+        ws.title = f"{export_data['officer_name']} Performance Matrix"
         
         # Get reviewers list
         reviewers = set()
-        for row in cached_data['matrix_rows']:
+        for row in export_data['matrix_rows']:
             for reviewer in row['reviewer_ratings'].keys():
                 reviewers.add(reviewer)
         reviewers = sorted(reviewers)
@@ -1709,7 +1245,7 @@ def export_matrix_excel(officer_id):
         
         # Data rows with color coding for ratings
         current_row = 2
-        for question_row in cached_data['matrix_rows']:
+        for question_row in export_data['matrix_rows']:
             # Question text (column A)
             ws.cell(row=current_row, column=1, value=question_row['question_text'])
             
@@ -1752,7 +1288,7 @@ def export_matrix_excel(officer_id):
         for col in range(2, len(reviewers) + 2):
             ws.cell(row=current_row, column=col, value="—")
         
-        avg_cell = ws.cell(row=current_row, column=len(reviewers) + 2, value=cached_data['overall_average'])
+        avg_cell = ws.cell(row=current_row, column=len(reviewers) + 2, value=export_data['overall_average'])
         avg_cell.font = Font(bold=True, size=12)
         avg_cell.alignment = Alignment(horizontal="center", vertical="center")
         
@@ -1773,8 +1309,8 @@ def export_matrix_excel(officer_id):
         current_row += 1
         
         # Add AI summary content
-        if 'overall_ai_summary' in cached_data:
-            ai_summary = cached_data['overall_ai_summary']
+        if 'overall_ai_summary' in export_data:
+            ai_summary = export_data['overall_ai_summary']
             
             # Executive summary
             ws.cell(row=current_row, column=1, value=ai_summary.get('executive_summary', 'Performance analysis complete.'))
@@ -1811,14 +1347,14 @@ def export_matrix_excel(officer_id):
         
         response = make_response(excel_buffer.getvalue())
         response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename="{cached_data["officer_name"]}_matrix_report.xlsx"'
+        response.headers['Content-Disposition'] = f'attachment; filename="{export_data["officer_name"]}_matrix_report.xlsx"'
         
-        log_activity(current_user.id, 'export_matrix_excel', f'Exported cached matrix Excel for {cached_data["officer_name"]}')
+        log_activity(current_user.id, 'export_matrix_excel', f'Exported matrix Excel for {export_data["officer_name"]}')
         return response
         
     except Exception as e:
         print(f"Error in export_matrix_excel: {e}")
-        flash('Error generating Excel export. Please view matrix first.', 'error')
+        flash('Error generating Excel export. Please try again.', 'error')
         return redirect(url_for('admin_dashboard'))
 
 @app.route('/export_csv')
@@ -1926,10 +1462,11 @@ def assessment_activity_logs():
     event_type = request.args.get('event_type', '')
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
-    page = request.args.get('page', 1, type=int)
+    page = request.args.get('page', type=int)
     per_page = 50
     
     # Use regular ActivityLog since we have assessment-related activity logs there
+    flush_log_buffer()
     query = ActivityLog.query
     
     # Apply filters for assessment-related activities
@@ -1976,9 +1513,20 @@ def assessment_activity_logs():
         except ValueError:
             pass
     
-    # Order by timestamp and paginate
-    query = query.order_by(ActivityLog.timestamp.desc())
-    logs = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Legacy ?page=N links use offset pagination; otherwise page by (timestamp, id) cursor
+    if page:
+        query = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc())
+        logs = query.paginate(page=page, per_page=per_page, error_out=False)
+        filtered_total = logs.total
+    else:
+        logs = keyset_page(query, ActivityLog, after=request.args.get('after'), before=request.args.get('before'),
+                           per_page=per_page, options=(joinedload(ActivityLog.user),))
+        # The counters can total action and date filters, but not user or officer filters
+        filtered_total = None if (user_id or officer_id) else count_activities(
+            actions=[event_type] if event_type else assessment_actions,
+            date_from=parse_filter_day(date_from),
+            date_to=parse_filter_day(date_to)
+        )
     
     # Get filter data
     periods = AssessmentPeriod.query.filter_by(is_active=True).order_by(AssessmentPeriod.name).all()
@@ -1987,6 +1535,8 @@ def assessment_activity_logs():
     
     return render_template('assessment_activity_logs.html',
                          logs=logs,
+                         keyset=not page,
+                         filtered_total=filtered_total,
                          periods=periods,
                          users=users,
                          event_types=event_types,
@@ -1997,6 +1547,48 @@ def assessment_activity_logs():
                          date_from=date_from,
                          date_to=date_to)
 
+@app.route('/admin/assessment_activity_logs/export')
+@login_required
+@admin_required
+def export_assessment_activity_logs():
+    """Stream assessment workflow events (AssessmentActivityLog) as CSV"""
+    officer_id = request.args.get('officer_id', type=int)
+    period_id = request.args.get('period_id', type=int)
+    user_id = request.args.get('user_id', type=int)
+    event_type = request.args.get('event_type', '')
+    date_from = request.args.get('date_from', '')
+    date_to = request.args.get('date_to', '')
+    
+    flush_log_buffer()
+    query = AssessmentActivityLog.query
+    
+    if officer_id:
+        query = query.filter(AssessmentActivityLog.officer_id == officer_id)
+    if period_id:
+        query = query.filter(AssessmentActivityLog.period_id == period_id)
+    if user_id:
+        query = query.filter(AssessmentActivityLog.actor_id == user_id)
+    if event_type:
+        query = query.filter(AssessmentActivityLog.event_type == event_type)
+    
+    if date_from:
+        try:
+            from_date = datetime.strptime(date_from, '%Y-%m-%d')
+            query = query.filter(AssessmentActivityLog.timestamp >= from_date)
+        except ValueError:
+            pass
+    
+    if date_to:
+        try:
+            to_date = datetime.strptime(date_to, '%Y-%m-%d')
+            to_date = to_date.replace(hour=23, minute=59, second=59)
+            query = query.filter(AssessmentActivityLog.timestamp <= to_date)
+        except ValueError:
+            pass
+    
+    log_activity(current_user.id, 'export_assessment_activity_logs', 'Admin exported assessment activity logs to CSV')
+    return stream_assessment_activity_logs_csv(query)
+
 @app.route('/admin/activity_logs')
 @login_required
 @admin_required
@@ -2008,10 +1600,11 @@ def admin_activity_logs():
     action_filter = request.args.get('action', '')
     date_from = request.args.get('date_from', '')
     date_to = request.args.get('date_to', '')
-    page = request.args.get('page', 1, type=int)
+    page = request.args.get('page', type=int)
     per_page = 50
     
-    # Build query
+    # Build query (write buffered log rows first so this page includes them)
+    flush_log_buffer()
     query = ActivityLog.query
     
     # Apply filters
@@ -2037,72 +1630,45 @@ def admin_activity_logs():
         except ValueError:
             pass
     
-    # Order by timestamp and paginate
-    query = query.order_by(ActivityLog.timestamp.desc())
-    logs = query.paginate(page=page, per_page=per_page, error_out=False)
+    # Handle CSV export - streamed in keyset-paginated chunks
+    if request.args.get('export') == 'csv':
+        log_activity(current_user.id, 'export_activity_logs', 'Admin exported activity logs to CSV')
+        return stream_activity_logs_csv(query)
+    
+    # Legacy ?page=N links use offset pagination; otherwise page by (timestamp, id) cursor
+    if page:
+        query = query.order_by(ActivityLog.timestamp.desc(), ActivityLog.id.desc())
+        logs = query.paginate(page=page, per_page=per_page, error_out=False)
+        filtered_total = logs.total
+    else:
+        logs = keyset_page(query, ActivityLog, after=request.args.get('after'), before=request.args.get('before'),
+                           per_page=per_page, options=(joinedload(ActivityLog.user),))
+        # The counters can total action and date filters, but not a per-user filter
+        filtered_total = None if user_filter else count_activities(
+            action_like=action_filter or None,
+            date_from=parse_filter_day(date_from),
+            date_to=parse_filter_day(date_to)
+        )
     
     # Get all users for filter dropdown
     users = User.query.order_by(User.name).all()
     
-    # Get unique action types for filter
-    action_types = db.session.query(ActivityLog.action).distinct().order_by(ActivityLog.action).all()
-    action_types = [action[0] for action in action_types]
-    
-    # Get summary statistics
-    total_activities = ActivityLog.query.count()
-    today_activities = ActivityLog.query.filter(
-        ActivityLog.timestamp >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    ).count()
-    
-    unique_users_today = db.session.query(ActivityLog.user_id).filter(
-        ActivityLog.timestamp >= datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-    ).distinct().count()
-    
-    # Handle CSV export
-    if request.args.get('export') == 'csv':
-        log_activity(current_user.id, 'export_activity_logs', 'Admin exported activity logs to CSV')
-        
-        # Get all matching records (not paginated)
-        all_logs = query.all()
-        
-        output = io.StringIO()
-        writer = csv.writer(output)
-        
-        # Write CSV headers
-        writer.writerow(['Timestamp', 'User Name', 'User Role', 'Action', 'Description', 'IP Address', 'User Agent'])
-        
-        # Write data rows
-        for log in all_logs:
-            writer.writerow([
-                log.timestamp.strftime('%Y-%m-%d %H:%M:%S'),
-                log.user.name,
-                log.user.role,
-                log.action,
-                log.description,
-                log.ip_address or '',
-                log.user_agent or ''
-            ])
-        
-        output.seek(0)
-        
-        # Create response
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'text/csv'
-        response.headers['Content-Disposition'] = f'attachment; filename=activity_logs_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv'
-        
-        return response
+    # Totals, today's figures and the action list come from the activity counters
+    summary = get_activity_summary()
     
     return render_template('admin_activity_logs.html',
                          logs=logs,
+                         keyset=not page,
+                         filtered_total=filtered_total,
                          users=users,
-                         action_types=action_types,
+                         action_types=summary['action_types'],
                          user_filter=user_filter,
                          action_filter=action_filter,
                          date_from=date_from,
                          date_to=date_to,
-                         total_activities=total_activities,
-                         today_activities=today_activities,
-                         unique_users_today=unique_users_today)
+                         total_activities=summary['total_activities'],
+                         today_activities=summary['today_activities'],
+                         unique_users_today=summary['unique_users_today'])
 
 @app.route('/admin/assessments')
 @login_required
@@ -2254,7 +1820,8 @@ def create_user():
 @admin_required
 def assessment_periods():
     log_activity(current_user.id, 'view_assessment_periods', f'Admin accessed assessment projects page')
-    periods = AssessmentPeriod.query.order_by(AssessmentPeriod.created_at.desc()).all()
+    periods = AssessmentPeriod.query.options(joinedload(AssessmentPeriod.creator)).order_by(AssessmentPeriod.created_at.desc()).all()
+    load_completion_rates(periods)
     return render_template('assessment_periods.html', periods=periods)
 
 @app.route('/create_assessment_period', methods=['GET', 'POST'])
@@ -2608,89 +2175,25 @@ def manage_assignments(period_id):
     
     if request.method == 'POST':
         try:
-            # Smart assignment management - preserve assignments with existing responses
-            assignments_with_responses = set()  # Track assignments that have responses
-            assignments_to_keep = set()  # Track assignments requested by form
-            assignments_deleted = 0
-            
-            existing_assignments_query = AssessmentAssignment.query.filter_by(period_id=period_id).all()
-            
-            # Build a set of requested assignments from the form
-            for reviewee in reviewees:
-                # Add self-assessment for officers
-                if reviewee.role == 'officer':
-                    assignments_to_keep.add(f"{reviewee.id}_{reviewee.id}")
-                
-                # Add checked assignments from matrix
-                for reviewer in reviewers:
-                    checkbox_name = f"assignment_{reviewee.id}_{reviewer.id}"
-                    if request.form.get(checkbox_name):
-                        assignments_to_keep.add(f"{reviewee.id}_{reviewer.id}")
-            
-            # Check existing assignments for responses
-            for assignment in existing_assignments_query:
-                assignment_key = f"{assignment.officer_id}_{assignment.reviewer_id}"
-                has_responses = AssessmentResponse.query.filter_by(assessment_assignment_id=assignment.id).first() is not None
-                
-                if has_responses:
-                    assignments_with_responses.add(assignment_key)
-                
-                # Delete assignment if:
-                # 1. It's not requested in the form AND
-                # 2. It doesn't have any assessment responses
-                if assignment_key not in assignments_to_keep and not has_responses:
-                    db.session.delete(assignment)
-                    assignments_deleted += 1
-            
-            assignments_created = 0
-            assignments_preserved = len(assignments_with_responses)
-            
-            # First, create self-assessment assignments for all officers being reviewed
+            # Requested pairs from the form: officer self-assessments plus checked matrix cells
+            create_pairs = set()
+            checked_pairs = set()
             for reviewee in reviewees:
                 if reviewee.role == 'officer':  # Only officers need self-assessments, not admins or board members
-                    # Check if self-assessment already exists to avoid duplicates
-                    existing_self = AssessmentAssignment.query.filter_by(
-                        period_id=period_id,
-                        officer_id=reviewee.id,
-                        reviewer_id=reviewee.id
-                    ).first()
-                    
-                    if not existing_self:
-                        self_assignment = AssessmentAssignment(
-                            period_id=period_id,
-                            officer_id=reviewee.id,
-                            reviewer_id=reviewee.id  # Self-assessment: officer reviews themselves
-                        )
-                        db.session.add(self_assignment)
-                        assignments_created += 1
-            
-            # Then, process matrix checkboxes for external reviews
-            for reviewee in reviewees:
+                    create_pairs.add((reviewee.id, reviewee.id))
                 for reviewer in reviewers:
-                    checkbox_name = f"assignment_{reviewee.id}_{reviewer.id}"
-                    if request.form.get(checkbox_name):
-                        # Skip if this would be a duplicate self-assessment
-                        if reviewee.id == reviewer.id:
-                            continue  # Already created above
-                        
-                        # Check if this assignment already exists to prevent duplicates
-                        existing_assignment = AssessmentAssignment.query.filter_by(
-                            period_id=period_id,
-                            officer_id=reviewee.id,
-                            reviewer_id=reviewer.id
-                        ).first()
-                        
-                        if not existing_assignment:
-                            assignment = AssessmentAssignment(
-                                period_id=period_id,
-                                officer_id=reviewee.id,
-                                reviewer_id=reviewer.id
-                            )
-                            db.session.add(assignment)
-                            assignments_created += 1
+                    if request.form.get(f"assignment_{reviewee.id}_{reviewer.id}"):
+                        checked_pairs.add((reviewee.id, reviewer.id))
+            create_pairs |= {pair for pair in checked_pairs if pair[0] != pair[1]}
+            
+            # Apply the difference in bulk, preserving assignments with existing responses
+            sync = sync_period_assignments(period_id, create_pairs, keep_pairs=checked_pairs)
+            assignments_created = sync['created']
+            assignments_preserved = sync['preserved']
+            assignments_deleted = sync['deleted']
             
             db.session.commit()
-            log_activity(current_user.id, 'create_assignments', f'Created {assignments_created} review assignments for period: {period.name}. Preserved {assignments_preserved} existing assignments with responses.')
+            log_activity(current_user.id, 'create_assignments', f'Created {assignments_created} review assignments for period: {period.name}. Removed {assignments_deleted}. Preserved {assignments_preserved} existing assignments with responses.')
             
             # Build success message
             success_message = f'Successfully created {assignments_created} new review assignments.'
@@ -2722,71 +2225,106 @@ def manage_assignments(period_id):
 def period_progress(period_id):
     period = AssessmentPeriod.query.get_or_404(period_id)
     
-    # Get all assignments for this period
-    assignments = AssessmentAssignment.query.filter_by(period_id=period_id).all()
-    
     # Calculate days remaining
     days_remaining = (period.end_date - date.today()).days
     
-    # Group assignments by officer
-    officer_progress = {}
-    for assignment in assignments:
-        officer_id = assignment.officer_id
-        if officer_id not in officer_progress:
-            officer_progress[officer_id] = {
-                'officer': assignment.officer,
-                'total_reviewers': 0,
-                'completed_reviews': 0,
-                'pending_reviewers': [],
-                'completed_reviewers': []
-            }
-        
-        officer_progress[officer_id]['total_reviewers'] += 1
-        
-        if assignment.is_completed:
-            officer_progress[officer_id]['completed_reviews'] += 1
-            officer_progress[officer_id]['completed_reviewers'].append(assignment.reviewer)
-        else:
-            officer_progress[officer_id]['pending_reviewers'].append(assignment.reviewer)
-    
-    # Calculate completion percentages
-    for officer_id in officer_progress:
-        total = officer_progress[officer_id]['total_reviewers']
-        completed = officer_progress[officer_id]['completed_reviews']
-        officer_progress[officer_id]['completion_rate'] = round((completed / total * 100), 1) if total > 0 else 0
+    # Per-officer progress from one query with officers and reviewers eager-loaded
+    progress = get_period_progress(period)
     
     return render_template('period_progress.html', 
                          period=period, 
-                         officer_progress=officer_progress,
-                         assignments=assignments,
+                         officer_progress=progress['officer_progress'],
+                         assignments=progress['assignments'],
                          days_remaining=days_remaining)
 
+@app.route('/generate_period_ai_reports/<int:period_id>', methods=['POST'])
+@login_required
+@admin_required
+def generate_period_ai_reports(period_id):
+    """Queue AI reports for every officer in a period; officers with unchanged data are skipped"""
+    from report_jobs import enqueue_period_reports
+    
+    period = AssessmentPeriod.query.get_or_404(period_id)
+    force = request.form.get('force') == 'true' or bool((request.get_json(silent=True) or {}).get('force'))
+    
+    try:
+        batch = enqueue_period_reports(period.id, current_user.id, force=force)
+        
+        log_activity(current_user.id, 
+                    'queue_period_ai_reports', 
+                    f'Queued AI reports for {batch.total_jobs} officers in {period.name}')
+        
+        return jsonify({
+            'success': True,
+            'batch_id': batch.id,
+            'total': batch.total_jobs,
+            'status_url': url_for('report_batch_status', batch_id=batch.id)
+        }), 202
+    except Exception as e:
+        db.session.rollback()
+        print(f"Period AI Reports Error: {e}")
+        return jsonify({'success': False, 'error': f'Error queuing AI reports: {str(e)}'}), 500
+
+@app.route('/report_batch_status/<int:batch_id>')
+@login_required
+@admin_required
+def report_batch_status(batch_id):
+    """Progress, throughput and failures of a period AI report batch"""
+    from report_jobs import get_batch_summary
+    
+    summary = get_batch_summary(batch_id)
+    if summary is None:
+        return jsonify({'success': False, 'error': 'Report batch not found'}), 404
+    return jsonify(summary)
+
+@app.route('/admin/advance_period_projects/<int:period_id>', methods=['GET', 'POST'])
+@login_required
+@admin_required
+def advance_period_projects_route(period_id):
+    """Preview (GET, or POST with dry_run) or apply every eligible project workflow transition in a period"""
+    period = AssessmentPeriod.query.get_or_404(period_id)
+    options = request.get_json(silent=True) or request.form
+    dry_run = request.method == 'GET' or str(options.get('dry_run', '')).lower() in ('1', 'true')
+    # Admin-gated steps (admin review, final approval, results release) only move when explicitly approved
+    approve = str(request.values.get('approve') or options.get('approve', '')).lower() in ('1', 'true')
+    try:
+        max_steps = int(request.values.get('max_steps') or options.get('max_steps') or 1)
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'max_steps must be a positive integer'}), 400
+    if max_steps < 1:
+        return jsonify({'success': False, 'error': 'max_steps must be a positive integer'}), 400
+
+    try:
+        result = advance_period_projects(period.id,
+                                         admin_user_id=current_user.id if approve else None,
+                                         dry_run=dry_run,
+                                         max_steps=max_steps)
+        if not dry_run:
+            db.session.commit()
+            log_activity(current_user.id,
+                        'advance_period_projects',
+                        f'Advanced {result["advanced"]} of {result["checked"]} assessment projects in {period.name}')
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        db.session.rollback()
+        print(f"Advance Period Projects Error: {e}")
+        return jsonify({'success': False, 'error': f'Error advancing assessment projects: {str(e)}'}), 500
+
 @app.route('/send_reminders/<int:period_id>')
 @login_required
 @admin_required
 def send_reminders(period_id):
     period = AssessmentPeriod.query.get_or_404(period_id)
     
-    # Get pending assignments
-    pending_assignments = AssessmentAssignment.query.filter_by(
-        period_id=period_id, 
-        is_completed=False
-    ).all()
+    # Queue one digest per reviewer; the outbox dispatcher sends them in the background
+    queued = queue_reminder_digests(period, created_by=current_user.id)
+    db.session.commit()
+    wake_dispatcher()
     
-    emails_sent = 0
-    days_remaining = (period.end_date - date.today()).days
-    
-    for assignment in pending_assignments:
-        if email_service.send_reminder_email(
-            assignment.reviewer.email,
-            assignment.reviewer.name,
-            assignment.officer.name,
-            period.name,
-            days_remaining
-        ):
-            emails_sent += 1
-    
-    flash(f'Sent {emails_sent} reminder emails.', 'success')
+    message = f"Queued {queued['emails']} reminder emails covering {queued['assignments']} pending assessments."
+    if queued['skipped']:
+        message += f" {queued['skipped']} reviewers already have a reminder waiting to be sent."
+    flash(message, 'success')
     return redirect(url_for('period_progress', period_id=period_id))
 
 # Admin Questions Management Routes - Redirected to Assessment Forms
@@ -2924,7 +2462,9 @@ def delete_user(user_id):
                 (AssessmentAssignment.officer_id == user_id) | (AssessmentAssignment.reviewer_id == user_id)
             ).delete()
         
-        # Delete activity logs for this user
+        # Delete activity logs for this user (including any still buffered)
+        flush_log_buffer()
+        remove_user_activity_counts(user_id)
         ActivityLog.query.filter_by(user_id=user_id).delete()
         
         # Finally delete the user
@@ -3400,49 +2940,16 @@ def import_questions():
 def approve_reviewer_assessment(assignment_id):
     """Approve a submitted reviewer assessment"""
     try:
-        assignment = AssessmentAssignment.query.get_or_404(assignment_id)
-        release_to_reviewers = request.args.get('release') == 'true'
-        
-        # Verify it's submitted and not already approved
-        if not assignment.is_submitted:
-            flash('Assignment has not been submitted yet.', 'error')
-            return redirect(url_for('my_tasks'))
-            
-        if assignment.is_admin_approved:
-            flash('Assignment is already approved.', 'info')
-            return redirect(url_for('my_tasks'))
-        
-        # Approve the assignment
-        assignment.is_admin_approved = True
-        assignment.admin_approved_at = datetime.utcnow()
-        assignment.admin_approved_by = current_user.id
-        assignment.is_completed = True  # Mark as completed when approved
-        
-        # If this is a self-assessment approval with release, activate external reviewer assignments
-        if release_to_reviewers and assignment.officer_id == assignment.reviewer_id:
-            # Find all external reviewer assignments for this officer in this period
-            external_assignments = AssessmentAssignment.query.filter_by(
-                officer_id=assignment.officer_id,
-                period_id=assignment.period_id
-            ).filter(AssessmentAssignment.reviewer_id != assignment.officer_id).all()
-            
-            activated_count = 0
-            for ext_assignment in external_assignments:
-                if not ext_assignment.is_completed and not ext_assignment.is_submitted:
-                    activated_count += 1
-            
-            log_activity(current_user.id, 'release_to_reviewers', 
-                        f'Released {assignment.officer.name} for external review by {activated_count} reviewers after self-assessment approval')
-            
-            flash(f'Self-assessment approved and released to {activated_count} external reviewers.', 'success')
-        else:
-            flash(f'Assessment by {assignment.reviewer.name} has been approved.', 'success')
+        AssessmentAssignment.query.get_or_404(assignment_id)
+        action = 'release' if request.args.get('release') == 'true' else 'approve'
         
+        result = review_assignments([assignment_id], action, current_user.id)['results'][0]
         db.session.commit()
         
-        # Log the approval
-        log_activity(current_user.id, 'approve_reviewer_assessment', 
-                    f'Approved assessment by {assignment.reviewer.name} for {assignment.officer.name}')
+        if result['success']:
+            flash(result['message'], 'success')
+        else:
+            flash(result['message'], 'info' if result['outcome'] == 'already_approved' else 'error')
         
     except Exception as e:
         db.session.rollback()
@@ -3456,32 +2963,14 @@ def approve_reviewer_assessment(assignment_id):
 def reject_reviewer_assessment(assignment_id):
     """Reject a submitted reviewer assessment and send back for revision"""
     try:
-        assignment = AssessmentAssignment.query.get_or_404(assignment_id)
-        
-        # Verify it's submitted and not already approved
-        if not assignment.is_submitted:
-            flash('Assignment has not been submitted yet.', 'error')
-            return redirect(url_for('my_assignments'))
-            
-        if assignment.is_admin_approved:
-            flash('Assignment is already approved and cannot be rejected.', 'error')
-            return redirect(url_for('my_assignments'))
+        AssessmentAssignment.query.get_or_404(assignment_id)
         
-        # Get admin notes from form
+        # Reset submission status to send back for revision, with the admin's notes
         admin_notes = request.form.get('admin_notes', '').strip()
-        
-        # Reset submission status to send back for revision
-        assignment.is_submitted = False
-        assignment.submitted_at = None
-        assignment.admin_notes = admin_notes
-        
+        result = review_assignments([assignment_id], 'reject', current_user.id, admin_notes=admin_notes)['results'][0]
         db.session.commit()
         
-        # Log the rejection
-        log_activity(current_user.id, 'reject_reviewer_assessment', 
-                    f'Sent back assessment by {assignment.reviewer.name} for {assignment.officer.name} for revision')
-        
-        flash(f'Assessment by {assignment.reviewer.name} has been sent back for revision.', 'warning')
+        flash(result['message'], 'warning' if result['success'] else 'error')
         
     except Exception as e:
         db.session.rollback()
@@ -3489,6 +2978,39 @@ def reject_reviewer_assessment(assignment_id):
     
     return redirect(url_for('my_assignments'))
 
+@app.route('/admin/review_assignments', methods=['POST'])
+@login_required
+@admin_required
+def bulk_review_assignments():
+    """Approve, approve and release, or send back many submitted assignments at once"""
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {
+            'assignment_ids': request.form.getlist('assignment_ids'),
+            'action': request.form.get('action'),
+            'admin_notes': request.form.get('admin_notes')
+        }
+    
+    action = data.get('action')
+    if action not in REVIEW_ACTIONS:
+        return jsonify({'success': False, 'error': f'Action must be one of: {", ".join(REVIEW_ACTIONS)}'}), 400
+    try:
+        assignment_ids = [int(assignment_id) for assignment_id in data.get('assignment_ids') or []]
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'assignment_ids must be a list of integers'}), 400
+    if not assignment_ids:
+        return jsonify({'success': False, 'error': 'No assignments selected'}), 400
+    
+    try:
+        admin_notes = (data.get('admin_notes') or '').strip()
+        result = review_assignments(assignment_ids, action, current_user.id, admin_notes=admin_notes)
+        db.session.commit()
+        return jsonify({'success': True, **result})
+    except Exception as e:
+        db.session.rollback()
+        print(f"Bulk Review Error: {e}")
+        return jsonify({'success': False, 'error': f'Error reviewing assignments: {str(e)}'}), 500
+
 # Assessment Form Builder Routes
 @app.route('/admin/assessment_forms')
 @login_required
@@ -3667,6 +3189,8 @@ def edit_assessment_question(question_id):
             question.is_required = form.is_required.data
             question.set_settings(settings)
             
+            db.session.flush()
+            index_questions([question])
             db.session.commit()
             
             flash(f'Question updated successfully in "{assessment_form.title}".', 'success')
@@ -3724,6 +3248,8 @@ def add_assessment_question(form_id):
             )
             
             db.session.add(question)
+            db.session.flush()
+            index_questions([question])
             db.session.commit()
             
             flash(f'Question added successfully to "{assessment_form.title}".', 'success')
@@ -3828,6 +3354,8 @@ def clone_assessment_question(question_id):
             )
             
             db.session.add(question)
+            db.session.flush()
+            index_questions([question])
             db.session.commit()
             
             # Log the activity
@@ -3935,6 +3463,8 @@ def duplicate_assessment_form(form_id):
                 )
                 db.session.add(new_question)
             
+            db.session.flush()
+            index_form_questions(new_form.id)
             db.session.commit()
             
             flash(f'Survey form duplicated successfully as "{new_form.title}".', 'success')
@@ -4049,11 +3579,9 @@ def preview_assessment_form(form_id):
 @login_required
 @admin_required
 def generate_ai_summary(officer_id):
-    """Generate AI summary directly - simplified approach"""
-    import os
-    import json
-    from datetime import datetime
+    """Queue AI summary and PDF generation; progress is polled from ai_summary_status"""
     from activity_logger import log_activity
+    from report_jobs import enqueue_ai_report
     
     try:
         officer = User.query.get_or_404(officer_id)
@@ -4070,213 +3598,27 @@ def generate_ai_summary(officer_id):
         if not current_period:
             return jsonify({'success': False, 'error': 'No assessment project found'}), 400
         
-        # Build matrix data directly using same logic as web interface
-        from collections import defaultdict
-        
-        # Get all assignments for this officer in the current period
-        assignments = AssessmentAssignment.query.filter_by(
+        has_assignments = db.session.query(AssessmentAssignment.query.filter_by(
             officer_id=officer_id,
             period_id=current_period.id
-        ).all()
+        ).exists()).scalar()
         
-        if not assignments:
+        if not has_assignments:
             return jsonify({'success': False, 'error': 'No assignments found for this officer in the current period.'}), 400
         
-        # Get all possible questions from forms assigned to this period
-        reviewer_form_assignments = PeriodFormAssignment.query.filter_by(
-            period_id=current_period.id,
-            form_type='reviewer'
-        ).all()
+        job = enqueue_ai_report(officer.id, current_period.id, current_user.id)
         
-        self_review_form_assignments = PeriodFormAssignment.query.filter_by(
-            period_id=current_period.id,
-            form_type='self_review'
-        ).all()
+        log_activity(current_user.id, 
+                    'queue_ai_summary', 
+                    f'Queued AI summary and PDF generation for {officer.name}')
         
-        reviewer_form_ids = [pfa.form_id for pfa in reviewer_form_assignments]
-        self_review_form_ids = [pfa.form_id for pfa in self_review_form_assignments]
-        
-        all_form_ids = reviewer_form_ids + self_review_form_ids
-        
-        if not all_form_ids:
-            return jsonify({'success': False, 'error': 'No forms assigned to this assessment project.'}), 400
-        
-        # Get all questions from assigned forms - only rating questions for matrix
-        questions = AssessmentQuestion.query.filter(
-            AssessmentQuestion.form_id.in_(all_form_ids),
-            AssessmentQuestion.question_type == 'rating',
-            AssessmentQuestion.is_active == True
-        ).order_by(AssessmentQuestion.form_id, AssessmentQuestion.order).all()
-        
-        if not questions:
-            return jsonify({'success': False, 'error': 'No rating questions found in assigned forms.'}), 400
-        
-        # Build matrix data
-        matrix_data = []
-        text_responses = defaultdict(list)
-        
-        # Group questions by text content to handle cross-form question matching
-        questions_by_text = defaultdict(list)
-        for q in questions:
-            questions_by_text[q.question_text].append(q)
-        
-        for question_text, question_group in questions_by_text.items():
-            question_id = question_group[0].id  # Use first question as primary
-            question_data = {
-                'question_id': question_id,
-                'question_text': question_text,
-                'category': 'Performance',  # Default category
-                'responses': {},
-                'scores': []
-            }
-            
-            # Get responses for this question from all reviewers
-            all_question_ids = [q.id for q in question_group]
-            assignment_ids = [a.id for a in assignments]
-            responses = AssessmentResponse.query.filter(
-                AssessmentResponse.question_id.in_(all_question_ids),
-                AssessmentResponse.assessment_assignment_id.in_(assignment_ids)
-            ).all()
-            
-            for response in responses:
-                assignment = next(a for a in assignments if a.id == response.assessment_assignment_id)
-                reviewer = assignment.reviewer
-                
-                # Use response_number for ratings (numeric responses)
-                if response.response_number is not None:
-                    score = int(response.response_number)
-                    question_data['responses'][reviewer.name] = score
-                    question_data['scores'].append(score)
-            
-            if question_data['scores']:  # Only include questions with responses
-                matrix_data.append(question_data)
-        
-        # Get text responses for comprehensive analysis
-        text_questions = AssessmentQuestion.query.filter(
-            AssessmentQuestion.form_id.in_(all_form_ids),
-            AssessmentQuestion.question_type.in_(['text', 'textarea']),
-            AssessmentQuestion.is_active == True
-        ).all()
-        
-        for question in text_questions:
-            assignment_ids = [a.id for a in assignments]
-            responses = AssessmentResponse.query.filter(
-                AssessmentResponse.question_id == question.id,
-                AssessmentResponse.assessment_assignment_id.in_(assignment_ids)
-            ).all()
-            
-            question_responses = []
-            for response in responses:
-                if response.response_text and response.response_text.strip():
-                    assignment = next(a for a in assignments if a.id == response.assessment_assignment_id)
-                    question_responses.append({
-                        'reviewer': assignment.reviewer.name,
-                        'response': response.response_text
-                    })
-            
-            if question_responses:
-                text_responses[question.question_name] = question_responses
-        
-        # Calculate comprehensive statistics
-        total_scores = sum(len(q['scores']) for q in matrix_data)
-        overall_ratings = [score for q in matrix_data for score in q['scores']]
-        overall_average = sum(overall_ratings) / len(overall_ratings) if overall_ratings else 0
-        
-        # Convert to format expected by AI analysis
-        ai_compatible_matrix_data = []
-        for question_data in matrix_data:
-            ai_question = {
-                'question': question_data['question_text'],
-                'category': question_data.get('category', 'Performance'),
-                'reviewer_data': {},
-                'officer_name': officer.name  # Pass officer name to identify self-assessment
-            }
-            
-            # Convert responses to expected format
-            for reviewer_name, score in question_data['responses'].items():
-                ai_question['reviewer_data'][reviewer_name] = {
-                    'score': score,
-                    'rating': score,
-                    'is_self_assessment': reviewer_name == officer.name
-                }
-            
-            ai_compatible_matrix_data.append(ai_question)
-        
-        # Convert text responses to expected format with full content
-        ai_compatible_text_responses = {}
-        for question_name, responses in text_responses.items():
-            ai_compatible_text_responses[question_name] = {
-                'question_text': question_name,
-                'responses': [
-                    {
-                        'reviewer': resp['reviewer'],
-                        'reviewer_role': 'Board Member' if resp['reviewer'] != officer.name else 'Self-Assessment',
-                        'response': resp['response']  # Full response content
-                    } for resp in responses
-                ]
-            }
-        
-        # Generate comprehensive AI report with PDF
-        from ai_comprehensive_analysis import generate_comprehensive_report
-        report_result = generate_comprehensive_report(
-            officer_name=officer.name,
-            matrix_data=ai_compatible_matrix_data,
-            text_responses=ai_compatible_text_responses,
-            period_name=current_period.name
-        )
-        
-        if report_result['success']:
-            # Store or update AI report in database
-            from models import AIGeneratedReport
-            existing_report = AIGeneratedReport.query.filter_by(
-                officer_id=officer_id,
-                period_id=current_period.id
-            ).first()
-            
-            report_title = f"AI Performance Analysis - {officer.name} - {current_period.name}"
-            summary_text = json.dumps(report_result['ai_summary'])
-            
-            if existing_report:
-                # Replace existing report
-                existing_report.summary_text = summary_text
-                existing_report.pdf_data = report_result['pdf_data']
-                existing_report.pdf_filename = f"{officer.name}_{current_period.name}_AI_Report.pdf"
-                existing_report.total_reviewers = report_result['statistics']['total_reviewers']
-                existing_report.average_rating = report_result['statistics'].get('overall_average', 0)
-                existing_report.total_questions = report_result['statistics']['total_numerical_questions']
-                existing_report.created_by = current_user.id
-                existing_report.created_at = datetime.utcnow()
-            else:
-                # Create new report
-                new_report = AIGeneratedReport(
-                    officer_id=officer_id,
-                    period_id=current_period.id,
-                    report_title=report_title,
-                    summary_text=summary_text,
-                    pdf_data=report_result['pdf_data'],
-                    pdf_filename=f"{officer.name}_{current_period.name}_AI_Report.pdf",
-                    total_reviewers=report_result['statistics']['total_reviewers'],
-                    average_rating=report_result['statistics'].get('overall_average', 0),
-                    total_questions=report_result['statistics']['total_numerical_questions'],
-                    created_by=current_user.id
-                )
-                db.session.add(new_report)
-            
-            db.session.commit()
-            
-            log_activity(current_user.id, 
-                        'generate_ai_summary', 
-                        f'Generated AI summary and PDF for {officer.name}')
-            
-            return jsonify({
-                'success': True,
-                'message': 'AI summary and PDF generated successfully'
-            })
-        else:
-            return jsonify({
-                'success': False,
-                'error': report_result.get('error', 'AI analysis failed')
-            })
+        return jsonify({
+            'success': True,
+            'queued': True,
+            'job_id': job.id,
+            'status_url': url_for('ai_summary_status', officer_id=officer_id),
+            'message': 'AI summary generation started'
+        }), 202
             
     except Exception as e:
         print(f"AI Analysis Error: {e}")
@@ -4302,6 +3644,9 @@ def ai_summary_status(officer_id):
     if not current_period:
         return jsonify({'status': 'no_period'})
     
+    from models import AISummaryStatus
+    from report_jobs import get_active_job
+    
     status_record = AISummaryStatus.query.filter_by(
         officer_id=officer_id,
         period_id=current_period.id
@@ -4310,9 +3655,13 @@ def ai_summary_status(officer_id):
     if not status_record:
         return jsonify({'status': 'not_started'})
     
+    job = get_active_job(officer_id, current_period.id)
+    
     return jsonify({
         'status': status_record.status,
         'progress': status_record.progress,
+        'phase': job.phase if job else None,
+        'attempts': job.attempts if job else None,
         'error_message': status_record.error_message,
         'started_at': status_record.started_at.isoformat() if status_record.started_at else None,
         'completed_at': status_record.completed_at.isoformat() if status_record.completed_at else None
@@ -4322,9 +3671,7 @@ def ai_summary_status(officer_id):
 @login_required
 @admin_required
 def download_ai_report(officer_id):
-    """Download AI-generated PDF report"""
-    import io
-    from flask import send_file
+    """Download AI-generated PDF report, streamed from the blob store with Range and ETag support"""
     from models import AIGeneratedReport
     from activity_logger import log_activity
     
@@ -4347,22 +3694,21 @@ def download_ai_report(officer_id):
         period_id=current_period.id
     ).first()
     
-    if not ai_report or not ai_report.pdf_data:
+    pdf = get_report_pdf(ai_report.id) if ai_report else None
+    if not pdf:
         flash('AI report not found or not yet generated.', 'error')
         return redirect(url_for('officer_reviews', officer_id=officer_id))
     
-    # Log the download
-    officer = User.query.get(officer_id)
-    log_activity(current_user.id, 
-                'download_ai_report', 
-                f'Downloaded AI report for {officer.name}')
-    
-    return send_file(
-        io.BytesIO(ai_report.pdf_data),
-        as_attachment=True,
-        download_name=ai_report.pdf_filename,
-        mimetype='application/pdf'
-    )
+    response = send_blob(pdf, ai_report.pdf_filename or f'AI_Report_{officer_id}.pdf')
+    
+    # Log full downloads only, not revalidations or resumed ranges
+    if response.status_code == 200:
+        officer = User.query.get(officer_id)
+        log_activity(current_user.id, 
+                    'download_ai_report', 
+                    f'Downloaded AI report for {officer.name}')
+    
+    return response
 
 @app.route('/admin/officer_reviews/<int:officer_id>/check_ai_report')
 @login_required
@@ -4389,13 +3735,73 @@ def check_ai_report(officer_id):
         period_id=current_period.id
     ).first()
     
+    pdf = get_report_pdf(ai_report.id) if ai_report else None
+    
     return jsonify({
         'exists': ai_report is not None,
-        'has_pdf': ai_report.pdf_data is not None if ai_report else False,
+        'has_pdf': pdf is not None,
+        'pdf_size': pdf['size'] if pdf else None,
         'created_at': ai_report.created_at.isoformat() if ai_report else None,
         'report_title': ai_report.report_title if ai_report else None
     })
 
+@app.route('/admin/ai_cache_stats')
+@login_required
+@admin_required
+def ai_cache_stats():
+    """AI analysis cache size and hit/miss counters"""
+    from ai_analysis_cached import get_cached_analysis_stats
+    return jsonify(get_cached_analysis_stats())
+
+@app.route('/admin/performance')
+@login_required
+@admin_required
+def admin_performance():
+    """SQL statement counts, database time and suspected N+1 statements per endpoint"""
+    performance = get_endpoint_performance()
+    if request.args.get('format') == 'json':
+        performance['since'] = performance['since'].isoformat()
+        return jsonify(performance)
+    return render_template('admin_performance.html', **performance)
+
+@app.route('/admin/performance/reset', methods=['POST'])
+@login_required
+@admin_required
+def reset_admin_performance():
+    """Start the per-endpoint SQL totals over"""
+    reset_endpoint_performance()
+    flash('Performance statistics have been reset.', 'success')
+    return redirect(url_for('admin_performance'))
+
+@app.route('/admin/profiles')
+@login_required
+@admin_required
+def admin_profiles():
+    """Recently stored request profiles"""
+    profiles = RequestProfile.query.options(
+        defer(RequestProfile.collapsed_stacks)
+    ).order_by(RequestProfile.created_at.desc()).limit(100).all()
+    return render_template('admin_profiles.html', profiles=profiles)
+
+@app.route('/admin/profiles/<profile_id>')
+@login_required
+@admin_required
+def admin_profile_detail(profile_id):
+    """Component breakdown and call tree of one request profile"""
+    profile = RequestProfile.query.get_or_404(profile_id)
+    return render_template('admin_profile.html', profile=profile, **summarize_profile(profile))
+
+@app.route('/admin/profiles/<profile_id>/collapsed')
+@login_required
+@admin_required
+def admin_profile_collapsed(profile_id):
+    """Collapsed stacks for flamegraph.pl or speedscope"""
+    profile = RequestProfile.query.get_or_404(profile_id)
+    response = make_response(profile.collapsed_stacks)
+    response.headers['Content-Type'] = 'text/plain; charset=utf-8'
+    response.headers['Content-Disposition'] = f'attachment; filename=profile_{profile.id}.txt'
+    return response
+
 @app.route('/admin/chatbot', methods=['POST'])
 @login_required
 @admin_required
@@ -4768,6 +4174,8 @@ def import_assessment_form():
                         error_count += 1
                         continue
         
+        db.session.flush()
+        index_form_questions(form.id)
         db.session.commit()
         
         # Log the import
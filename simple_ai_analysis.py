@@ -6,6 +6,7 @@ Creates comprehensive reports from all submitted reviews
 import os
 import json
 from openai import OpenAI
+from metrics import observe_openai_call
 from datetime import datetime
 import logging
 
@@ -164,7 +165,7 @@ Provide analysis in JSON format:
 
 Focus on actionable insights."""
 
-        response = openai_client.chat.completions.create(
+        response = observe_openai_call('simple_ai_analysis', openai_client.chat.completions.create,
             model="gpt-4o",
             messages=[{"role": "user", "content": prompt}],
             response_format={"type": "json_object"},
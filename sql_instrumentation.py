@@ -0,0 +1,210 @@
+"""
+SQL Instrumentation
+Profiles the SQL issued by a sample of requests (SQL_PROFILE_SAMPLE_RATE) from the
+per-statement timings unit_of_work already takes: statement count, total database
+time, the slowest statements, and statement fingerprints repeated
+SQL_N_PLUS_ONE_THRESHOLD or more times, which is what an N+1 loop looks like. Each profiled request is written as one JSON log line, optionally
+returned in response headers (QUERY_COUNT_HEADERS) and folded into per-endpoint totals
+shown on /admin/performance.
+
+Unsampled requests pay only for one g lookup per statement. Totals are kept per
+process since the last restart or reset.
+"""
+import json
+import heapq
+import logging
+import random
+import re
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from flask import g, request
+from app import app
+from unit_of_work import observe_statements
+
+logger = logging.getLogger('sql_profile')
+
+SLOWEST_KEPT = 5  # Slowest statements kept per request and per endpoint
+STATEMENT_PREVIEW_CHARS = 500
+
+_PARAM_RE = re.compile(r"%\([^)]*\)s|:\w+|\$\d+|'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_SPACE_RE = re.compile(r"\s+")
+
+_endpoint_stats = {}
+_stats_lock = threading.Lock()
+_stats_since = {'time': time.time()}
+
+
+def fingerprint(statement):
+    """Reduce a statement to its shape: parameters and literals become ?, IN lists collapse"""
+    shape = _PARAM_RE.sub('?', statement)
+    shape = _IN_LIST_RE.sub('(?)', shape)
+    return _SPACE_RE.sub(' ', shape).strip()
+
+
+def _new_endpoint_stats():
+    return {
+        'requests': 0,
+        'queries': 0,
+        'max_queries': 0,
+        'db_ms': 0.0,
+        'max_db_ms': 0.0,
+        'request_ms': 0.0,
+        'n_plus_one_requests': 0,
+        'repeated': {},  # fingerprint -> {'requests': n, 'max_repeats': n}
+        'slowest': []    # heap of (ms, statement)
+    }
+
+
+@app.before_request
+def _start_sql_profile():
+    """Decide whether this request is profiled"""
+    if request.endpoint == 'static':
+        return
+    rate = app.config.get('SQL_PROFILE_SAMPLE_RATE', 0)
+    if app.config.get('QUERY_COUNT_HEADERS') or (rate > 0 and random.random() < rate):
+        g._sql_profile = {
+            'started': time.perf_counter(),
+            'queries': 0,
+            'db_ms': 0.0,
+            'fingerprints': Counter(),
+            'slowest': []
+        }
+
+
+@observe_statements
+def _profile_statement(statement, seconds):
+    """Add one statement, timed by unit_of_work, to the request's profile if it is sampled"""
+    profile = g.get('_sql_profile')
+    if profile is None:
+        return
+
+    elapsed_ms = seconds * 1000
+    profile['queries'] += 1
+    profile['db_ms'] += elapsed_ms
+    profile['fingerprints'][fingerprint(statement)] += 1
+
+    entry = (elapsed_ms, statement[:STATEMENT_PREVIEW_CHARS])
+    if len(profile['slowest']) < SLOWEST_KEPT:
+        heapq.heappush(profile['slowest'], entry)
+    else:
+        heapq.heappushpop(profile['slowest'], entry)
+
+
+def _summarize(profile):
+    threshold = app.config.get('SQL_N_PLUS_ONE_THRESHOLD', 5)
+    repeated = sorted(
+        ((shape, count) for shape, count in profile['fingerprints'].items()
+         if count >= threshold and shape.upper().startswith('SELECT')),
+        key=lambda item: -item[1]
+    )
+    return {
+        'endpoint': request.endpoint,
+        'method': request.method,
+        'path': request.path,
+        'queries': profile['queries'],
+        'db_ms': round(profile['db_ms'], 2),
+        'request_ms': round((time.perf_counter() - profile['started']) * 1000, 2),
+        'n_plus_one': [{'fingerprint': shape, 'count': count} for shape, count in repeated],
+        'slowest': [{'ms': round(ms, 2), 'statement': statement}
+                    for ms, statement in sorted(profile['slowest'], reverse=True)]
+    }
+
+
+def _record(summary):
+    """Fold one profiled request into its endpoint's totals"""
+    key = summary['endpoint'] or 'unknown'
+    with _stats_lock:
+        stats = _endpoint_stats.setdefault(key, _new_endpoint_stats())
+        stats['requests'] += 1
+        stats['queries'] += summary['queries']
+        stats['max_queries'] = max(stats['max_queries'], summary['queries'])
+        stats['db_ms'] += summary['db_ms']
+        stats['max_db_ms'] = max(stats['max_db_ms'], summary['db_ms'])
+        stats['request_ms'] += summary['request_ms']
+        if summary['n_plus_one']:
+            stats['n_plus_one_requests'] += 1
+        for item in summary['n_plus_one']:
+            seen = stats['repeated'].setdefault(item['fingerprint'], {'requests': 0, 'max_repeats': 0})
+            seen['requests'] += 1
+            seen['max_repeats'] = max(seen['max_repeats'], item['count'])
+        for item in summary['slowest']:
+            entry = (item['ms'], item['statement'])
+            if entry in stats['slowest']:
+                continue
+            if len(stats['slowest']) < SLOWEST_KEPT:
+                heapq.heappush(stats['slowest'], entry)
+            else:
+                heapq.heappushpop(stats['slowest'], entry)
+
+
+@app.after_request
+def _finish_sql_profile(response):
+    """Log, aggregate and optionally expose the request's SQL profile"""
+    profile = g.pop('_sql_profile', None)
+    if profile is None:
+        return response
+
+    try:
+        summary = _summarize(profile)
+        _record(summary)
+
+        level = logging.WARNING if summary['n_plus_one'] else logging.INFO
+        logger.log(level, json.dumps({'event': 'sql_profile', 'status': response.status_code, **summary}))
+
+        if app.config.get('QUERY_COUNT_HEADERS'):
+            response.headers['X-DB-Time-Ms'] = str(summary['db_ms'])
+            response.headers['X-DB-Repeated-Statements'] = str(len(summary['n_plus_one']))
+    except Exception as e:
+        print(f"Error recording SQL profile: {e}")
+    return response
+
+
+def get_endpoint_performance():
+    """
+    Per-endpoint SQL totals for the profiled requests
+
+    Returns:
+        Dictionary with since (datetime the totals started), sample_rate and endpoints
+        (list sorted by average queries, each with averages, maxima, the repeated
+        statement fingerprints and the slowest statements)
+    """
+    with _stats_lock:
+        snapshot = [(endpoint, dict(
+            stats,
+            repeated={shape: dict(seen) for shape, seen in stats['repeated'].items()},
+            slowest=list(stats['slowest'])
+        )) for endpoint, stats in _endpoint_stats.items()]
+
+    endpoints = []
+    for endpoint, stats in snapshot:
+        requests = stats['requests'] or 1
+        endpoints.append({
+            'endpoint': endpoint,
+            'requests': stats['requests'],
+            'avg_queries': round(stats['queries'] / requests, 1),
+            'max_queries': stats['max_queries'],
+            'avg_db_ms': round(stats['db_ms'] / requests, 2),
+            'max_db_ms': round(stats['max_db_ms'], 2),
+            'avg_request_ms': round(stats['request_ms'] / requests, 2),
+            'n_plus_one_requests': stats['n_plus_one_requests'],
+            'repeated': sorted(({'fingerprint': shape, **seen} for shape, seen in stats['repeated'].items()),
+                               key=lambda item: -item['max_repeats']),
+            'slowest': [{'ms': ms, 'statement': statement} for ms, statement in sorted(stats['slowest'], reverse=True)]
+        })
+    endpoints.sort(key=lambda item: -item['avg_queries'])
+
+    return {
+        'since': datetime.fromtimestamp(_stats_since['time']),
+        'sample_rate': app.config.get('SQL_PROFILE_SAMPLE_RATE', 0),
+        'endpoints': endpoints
+    }
+
+
+def reset_endpoint_performance():
+    """Start the per-endpoint totals over"""
+    with _stats_lock:
+        _endpoint_stats.clear()
+        _stats_since['time'] = time.time()
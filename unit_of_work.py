@@ -0,0 +1,119 @@
+"""
+Request Unit of Work
+Helpers that write to the database while a request is being handled (AI cache saves and
+invalidation, and the like) wrap their writes in deferred_write() instead of calling
+db.session.commit(). The writes run in a SAVEPOINT, so a failing helper rolls back only
+its own changes and never the route's pending work. Inside a request the commit is left
+to a single commit after the view returns; outside a request (background workers,
+scripts) it happens at once.
+
+The request's own session is also switched to expire_on_commit=False, so a route's
+business commit leaves current_user and the objects it loaded usable for the rest of
+the request (flash messages, activity logging, rendering) without reloading each one.
+The session is discarded when the request ends, so nothing stale outlives it. Activity
+logging never touches the session; rows go through the log buffer (log_buffer.py).
+
+Per-request statement counts, database time and commit counts are kept in g (the
+metrics module reports them) and, with QUERY_COUNT_HEADERS enabled, returned as
+X-DB-Queries / X-DB-Commits response headers.
+"""
+import time
+from contextlib import contextmanager
+from flask import g, request, has_request_context
+from werkzeug.exceptions import InternalServerError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import app, db
+
+
+@app.before_request
+def _keep_loaded_objects_on_commit():
+    """Stop commits made by this request from expiring what it has already loaded"""
+    db.session().expire_on_commit = False
+
+
+@contextmanager
+def deferred_write():
+    """
+    Run a helper's writes in a SAVEPOINT and commit them now, or at the end of the
+    current request if there is one. On error only the savepoint is rolled back and
+    the exception propagates; the session's other pending work is left alone.
+    """
+    with db.session.begin_nested():
+        yield
+    if has_request_context():
+        g._unit_of_work_pending = True
+    else:
+        db.session.commit()
+
+
+def request_db_stats():
+    """Statements executed, seconds spent in them and commits issued so far by the current request"""
+    return {
+        'queries': g.get('_db_queries', 0),
+        'seconds': g.get('_db_seconds', 0.0),
+        'commits': g.get('_db_commits', 0)
+    }
+
+
+@app.after_request
+def _commit_unit_of_work(response):
+    """Commit the writes deferred during the request in one transaction"""
+    if g.pop('_unit_of_work_pending', False):
+        try:
+            db.session.commit()
+        except Exception as e:
+            app.logger.error(f"Error committing deferred request writes for {request.endpoint}: {e}")
+            db.session.rollback()
+            return InternalServerError('The changes could not be saved.').get_response()
+
+    if app.config.get('QUERY_COUNT_HEADERS'):
+        stats = request_db_stats()
+        response.headers['X-DB-Queries'] = str(stats['queries'])
+        response.headers['X-DB-Commits'] = str(stats['commits'])
+    return response
+
+
+_QUERY_STARTED = '_request_query_started'  # conn.info stack of statement start times
+_statement_observers = []
+
+
+def observe_statements(callback):
+    """
+    Register a callback(statement, seconds) run after every statement issued by a request
+
+    The per-statement timer here is the only one; other instrumentation (the SQL
+    profiler) reads its measurements through this hook instead of timing again.
+    """
+    _statement_observers.append(callback)
+    return callback
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g._db_queries = g.get('_db_queries', 0) + 1
+        conn.info.setdefault(_QUERY_STARTED, []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _time_query(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info.get(_QUERY_STARTED)
+    if started and has_request_context():
+        seconds = time.perf_counter() - started.pop()
+        g._db_seconds = g.get('_db_seconds', 0.0) + seconds
+        for observer in _statement_observers:
+            observer(statement, seconds)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _drop_failed_query_timer(context):
+    """A failed statement never reaches after_cursor_execute; drop its start time from the pooled connection"""
+    if context.connection is not None:
+        context.connection.info.pop(_QUERY_STARTED, None)
+
+
+@event.listens_for(Engine, 'commit')
+def _count_commit(conn):
+    if has_request_context():
+        g._db_commits = g.get('_db_commits', 0) + 1
@@ -3,6 +3,8 @@ from flask import flash, redirect, url_for
 from flask_login import current_user
 from app import db
 from models import User, Category, Assessment, CategoryRating
+from category_reports import load_year_ratings, assessment_category_matrix
+from metrics import PDF_RENDER_SECONDS
 from werkzeug.security import generate_password_hash
 from reportlab.lib.pagesizes import letter, landscape
 from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
@@ -185,7 +187,8 @@ def generate_pdf_report(officer, assessments):
         story.append(Spacer(1, 20))
     
     # Build PDF
-    doc.build(story)
+    with PDF_RENDER_SECONDS.labels('officer_report').time():
+        doc.build(story)
     buffer.seek(0)
     return buffer.read()
 
@@ -201,8 +204,12 @@ def export_csv_data(year):
     
     rows = [header]
     
-    # Get all assessments for the year
-    assessments = Assessment.query.filter_by(year=year).order_by(Assessment.officer_id, Assessment.submitted_at).all()
+    # Get all assessments for the year, and all their category ratings as one matrix
+    assessments = Assessment.query.options(
+        db.joinedload(Assessment.officer), db.joinedload(Assessment.reviewer)
+    ).filter_by(year=year).order_by(Assessment.officer_id, Assessment.submitted_at).all()
+    ratings = assessment_category_matrix(load_year_ratings(year), [category.id for category in categories])
+    rating_rows = ratings.astype(object).where(ratings.notna(), None).to_dict('index')
     
     for assessment in assessments:
         row = [
@@ -213,12 +220,10 @@ def export_csv_data(year):
         ]
         
         # Add category ratings
+        assessment_ratings = rating_rows.get(assessment.id, {})
         for category in categories:
-            rating = CategoryRating.query.filter_by(
-                assessment_id=assessment.id,
-                category_id=category.id
-            ).first()
-            row.append(str(rating.rating) if rating else '')
+            rating = assessment_ratings.get(category.id)
+            row.append(str(int(rating)) if rating is not None else '')
         
         # Add text feedback
         row.extend([
@@ -429,6 +434,8 @@ def generate_matrix_pdf_report(officer, matrix_data, reviewers, overall_matrix_a
     )
     
     story.append(Paragraph("Overall Performance Analysis", summary_title_style))
+    if isinstance(overall_ai_summary, dict):
+        overall_ai_summary = overall_ai_summary.get('executive_summary')
     story.append(Paragraph(overall_ai_summary or "Overall analysis pending...", summary_text_style))
     
     # Legend - matching web format
@@ -443,7 +450,8 @@ def generate_matrix_pdf_report(officer, matrix_data, reviewers, overall_matrix_a
     legend = Paragraph("Rating Scale: 5=Outstanding • 4=Exceeds Expectations • 3=Meets Expectations • 2=Below Expectations • 1=Unsatisfactory", legend_style)
     story.append(legend)
     
-    doc.build(story)
+    with PDF_RENDER_SECONDS.labels('review_matrix').time():
+        doc.build(story)
     buffer.seek(0)
     return buffer
 
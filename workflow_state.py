@@ -0,0 +1,223 @@
+"""
+Assessment Workflow State
+Keeps one assessment_workflow_state row per (officer, period) with the current stage, the
+time each stage was first reached and every reviewer's progress. The log buffer applies
+stage events to it in the same transaction that inserts the AssessmentActivityLog rows,
+so the workflow table, the timeline chart and dashboards read one row instead of
+replaying the event history.
+"""
+import json
+from datetime import datetime
+from sqlalchemy import select, update
+from app import db
+from models import AssessmentActivityLog, AssessmentWorkflowState
+
+STATE_TABLE = AssessmentWorkflowState.__table__
+
+# Event type -> column holding the first time the stage was reached
+STAGE_COLUMNS = {
+    'self_assessment_assigned': 'assigned_at',
+    'reviewer_assignment_created': 'assigned_at',
+    'self_assessment_draft_saved': 'self_draft_saved_at',
+    'self_assessment_submitted': 'self_submitted_at',
+    'self_assessment_approved': 'self_approved_at',
+    'reviewers_released': 'reviewers_released_at',
+    'reviewer_assessment_started': 'reviewer_activity_at',
+    'reviewer_assessment_submitted': 'reviewer_activity_at',
+    'all_reviewers_completed': 'all_reviewers_completed_at',
+    'assessment_approved_final': 'final_approved_at',
+    'results_released_to_reviewee': 'results_released_at',
+    'reviewee_acknowledged_results': 'acknowledged_at',
+    'assessment_closed': 'closed_at',
+}
+
+# Reviewer event type -> reviewer status it implies; statuses only move forward
+REVIEWER_EVENTS = {
+    'reviewer_assignment_created': 'assigned',
+    'reviewer_notified': 'assigned',
+    'reviewer_assessment_started': 'in_progress',
+    'reviewer_draft_saved': 'in_progress',
+    'reviewer_assessment_submitted': 'submitted',
+}
+REVIEWER_STATUS_ORDER = ['assigned', 'in_progress', 'submitted']
+
+STAGE_EVENTS = set(STAGE_COLUMNS) | set(REVIEWER_EVENTS) | {'self_assessment_rejected'}
+
+
+def derive_stage(state):
+    """Name of the furthest stage reached, from a state's stage timestamps"""
+    if state['closed_at']:
+        return 'closed'
+    if state['acknowledged_at']:
+        return 'acknowledged'
+    if state['results_released_at']:
+        return 'results_released'
+    if state['final_approved_at']:
+        return 'final_approved'
+    if state['all_reviewers_completed_at']:
+        return 'reviews_completed'
+    if state['reviewers_released_at'] or state['reviewer_activity_at']:
+        return 'reviewer_review'
+    if state['self_approved_at']:
+        return 'ready_to_release'
+    if state['self_submitted_at']:
+        return 'pending_admin_review'
+    if state['self_draft_saved_at']:
+        return 'self_assessment_in_progress'
+    if state['assigned_at']:
+        return 'assigned'
+    return 'not_started'
+
+
+def _apply_event(state, seen, reviewers, row):
+    """Fold one log row into a state dictionary and its decoded seen/reviewer collections"""
+    event_type = row['event_type']
+    timestamp = row.get('timestamp') or datetime.utcnow()
+
+    column = STAGE_COLUMNS.get(event_type)
+    if column and state[column] is None:
+        state[column] = timestamp
+    seen.add(event_type)
+
+    reviewer_status = REVIEWER_EVENTS.get(event_type)
+    reviewer_id = row.get('reviewer_id')
+    if reviewer_id is None and reviewer_status in ('in_progress', 'submitted'):
+        reviewer_id = row.get('actor_id')  # Progress events are logged by the reviewer, without reviewer_id
+    if reviewer_status and reviewer_id:
+        entry = reviewers.setdefault(str(reviewer_id), {'status': reviewer_status, 'events': []})
+        if REVIEWER_STATUS_ORDER.index(reviewer_status) > REVIEWER_STATUS_ORDER.index(entry['status']):
+            entry['status'] = reviewer_status
+        if event_type not in entry['events']:
+            entry['events'].append(event_type)
+        entry['updated_at'] = timestamp.isoformat()
+
+    state['event_count'] = (state['event_count'] or 0) + 1
+    if state['last_event_at'] is None or timestamp > state['last_event_at']:
+        state['last_event_at'] = timestamp
+
+
+def _dialect_insert(connection):
+    dialect_name = connection.dialect.name
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(STATE_TABLE)
+    if dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(STATE_TABLE)
+    return None
+
+
+def apply_workflow_events(connection, rows):
+    """
+    Update the workflow states for AssessmentActivityLog rows inserted on this connection
+
+    Called by the log buffer inside the insert transaction. Missing state rows are created
+    first, then the affected rows are locked (on PostgreSQL), merged and written back.
+
+    Args:
+        connection: Connection with an open transaction
+        rows: AssessmentActivityLog column dictionaries that were just inserted, oldest first
+
+    Returns:
+        Number of state rows updated
+    """
+    by_key = {}
+    for row in rows:
+        if row['event_type'] in STAGE_EVENTS:
+            by_key.setdefault((row['officer_id'], row['period_id']), []).append(row)
+    if not by_key:
+        return 0
+
+    now = datetime.utcnow()
+    blanks = [{'officer_id': officer_id, 'period_id': period_id, 'current_stage': 'not_started',
+               'seen_events': '[]', 'reviewer_status': '{}', 'event_count': 0, 'updated_at': now}
+              for officer_id, period_id in by_key]
+    insert = _dialect_insert(connection)
+    if insert is not None:
+        connection.execute(insert.on_conflict_do_nothing(index_elements=['officer_id', 'period_id']), blanks)
+    else:
+        existing = {(r.officer_id, r.period_id) for r in connection.execute(
+            select(STATE_TABLE.c.officer_id, STATE_TABLE.c.period_id).where(
+                STATE_TABLE.c.officer_id.in_(list({key[0] for key in by_key})),
+                STATE_TABLE.c.period_id.in_(list({key[1] for key in by_key}))
+            )
+        )}
+        missing = [blank for blank in blanks if (blank['officer_id'], blank['period_id']) not in existing]
+        if missing:
+            connection.execute(STATE_TABLE.insert(), missing)
+
+    states = connection.execute(
+        select(STATE_TABLE).where(
+            STATE_TABLE.c.officer_id.in_(list({key[0] for key in by_key})),
+            STATE_TABLE.c.period_id.in_(list({key[1] for key in by_key}))
+        ).with_for_update()
+    ).mappings().all()
+
+    updated = 0
+    for current in states:
+        events = by_key.get((current['officer_id'], current['period_id']))
+        if not events:
+            continue
+        state = dict(current)
+        seen = set(json.loads(state['seen_events'] or '[]'))
+        reviewers = json.loads(state['reviewer_status'] or '{}')
+        for row in events:
+            _apply_event(state, seen, reviewers, row)
+
+        state['seen_events'] = json.dumps(sorted(seen))
+        state['reviewer_status'] = json.dumps(reviewers, sort_keys=True)
+        state['current_stage'] = derive_stage(state)
+        state['updated_at'] = now
+        connection.execute(
+            update(STATE_TABLE).where(STATE_TABLE.c.id == state['id']).values(
+                {key: value for key, value in state.items() if key != 'id'}
+            )
+        )
+        updated += 1
+    return updated
+
+
+def rebuild_workflow_states():
+    """Recompute every workflow state by replaying assessment_activity_log once, oldest first"""
+    log = AssessmentActivityLog.__table__
+    columns = [log.c.officer_id, log.c.period_id, log.c.reviewer_id, log.c.actor_id,
+               log.c.event_type, log.c.timestamp]
+    rows = [dict(row) for row in db.session.execute(
+        select(*columns).where(log.c.event_type.in_(sorted(STAGE_EVENTS))).order_by(log.c.timestamp, log.c.id)
+    ).mappings()]
+
+    db.session.execute(STATE_TABLE.delete())
+    updated = apply_workflow_events(db.session.connection(), rows)
+    db.session.commit()
+    return updated
+
+
+def ensure_workflow_states():
+    """Backfill the workflow states once for databases that have events but no states yet"""
+    if AssessmentWorkflowState.query.first() is not None or AssessmentActivityLog.query.first() is None:
+        return 0
+    return rebuild_workflow_states()
+
+
+def get_workflow_state(officer_id, period_id):
+    """
+    Current workflow state for one officer's assessment in a period
+
+    Returns:
+        AssessmentWorkflowState, or None if no stage event has been logged for it
+    """
+    from log_buffer import flush_log_buffer  # log_buffer imports this module
+    flush_log_buffer()
+    return AssessmentWorkflowState.query.filter_by(officer_id=officer_id, period_id=period_id).first()
+
+
+def get_period_workflow_states(period_id):
+    """
+    Workflow states of every officer in a period
+
+    Returns:
+        Dictionary mapping officer ID to AssessmentWorkflowState
+    """
+    from log_buffer import flush_log_buffer
+    flush_log_buffer()
+    return {state.officer_id: state for state in AssessmentWorkflowState.query.filter_by(period_id=period_id).all()}
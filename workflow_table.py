@@ -6,15 +6,18 @@ Creates a clean table showing workflow stages as columns and reviewers as rows
 def create_workflow_table(officer_id, period_id):
     """Create a simple table showing workflow stages as columns and reviewers as rows"""
     try:
+        from sqlalchemy.orm import joinedload
         from models import AssessmentAssignment, User, AssessmentPeriod
-        from assessment_activity_logger import get_assessment_timeline
+        from workflow_state import get_workflow_state
         
-        # Get timeline data and assessment assignments
-        timeline = get_assessment_timeline(officer_id, period_id)
-        completed_events = [item['event_type'] for item in timeline] if timeline else []
+        # Stage events recorded so far, from the materialized workflow state
+        state = get_workflow_state(officer_id, period_id)
+        completed_events = state.seen_event_types if state else set()
         
         # Get all assignments for this officer/period
-        assignments = AssessmentAssignment.query.filter_by(
+        assignments = AssessmentAssignment.query.options(
+            joinedload(AssessmentAssignment.reviewer)
+        ).filter_by(
             officer_id=officer_id,
             period_id=period_id
         ).all()
@@ -165,17 +168,7 @@ def create_workflow_table(officer_id, period_id):
                         cell_html = ''  # Empty for non-relevant stages
                 else:
                     # External reviewer row - check individual reviewer status
-                    # Get events specific to this reviewer by checking assignments
-                    reviewer_events = []
-                    for event in timeline:
-                        # Check if this event is related to this specific reviewer
-                        if event.get('reviewer') == reviewer.name or (
-                            'reviewer_assessment' in event.get('event_type', '') and 
-                            event.get('assignment_id') == assignment.id
-                        ):
-                            reviewer_events.append(event)
-                    
-                    reviewer_event_types = [event['event_type'] for event in reviewer_events]
+                    reviewer_event_types = state.reviewer_events(reviewer.id) if state else set()
                     
                     if stage['id'] == 'assignment':
                         cell_html = '<span class="badge bg-success">✓ Assigned</span>' if get_stage_status('assignment') == 'completed' else ''